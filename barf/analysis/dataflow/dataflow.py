@@ -0,0 +1,515 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements a generic worklist-based dataflow framework over
+the REIL instructions of the basic blocks of a CFG, and three instances
+of it (over REIL registers): liveness, reaching definitions and
+constant propagation.
+
+Set-based analyses (liveness and reaching definitions) represent their
+values as bit vectors (Python integers) where each bit stands for an
+element (a register or a definition) of the analysis domain.
+
+REIL instructions that follow a JCC within the translation of a native
+instruction (for example, CMOVcc) might not be executed. Therefore, they
+are regarded as conditional, that is, they do not kill previous values.
+Writes to sub-registers (for example, 'al') are regarded as conditional
+writes to their base register (for example, 'eax').
+
+"""
+
+import logging
+import re
+
+from collections import deque
+
+from barf.core.reil import ReilImmediateOperand
+from barf.core.reil import ReilMnemonic
+from barf.core.reil import ReilRegisterOperand
+from barf.core.reil.helpers import evaluate
+from barf.core.reil.helpers import read_registers
+from barf.core.reil.helpers import written_registers
+
+logger = logging.getLogger(__name__)
+
+temporary_register_regex = r"^t\d+$"
+
+class DataflowAnalysis(object):
+
+    """Base class of dataflow analyses.
+    """
+
+    # Direction of the analysis.
+    forward = True
+
+    def __init__(self, cfg, arch_info=None):
+
+        # Control flow graph to analyze.
+        self._cfg = cfg
+
+        # Architecture information (used to map sub-registers to their
+        # base register).
+        self._arch_info = arch_info
+
+        # Values at the start and at the end of each basic block (by
+        # address).
+        self._bb_in = {}
+        self._bb_out = {}
+
+        self._solved = False
+
+    # Lattice and transfer functions
+    # ======================================================================== #
+    def boundary(self):
+        """Return the value at the entry (exit, for backward analyses)
+        of the CFG.
+        """
+        raise NotImplementedError()
+
+    def meet(self, values):
+        """Return the meet of a non-empty list of values.
+        """
+        raise NotImplementedError()
+
+    def transfer(self, instr, value, conditional):
+        """Return the value after (before, for backward analyses)
+        executing a REIL instruction.
+        """
+        raise NotImplementedError()
+
+    # Solver
+    # ======================================================================== #
+    def solve(self):
+        """Compute the values at the start and at the end of every
+        basic block.
+        """
+        if self.forward:
+            order = self._cfg.reverse_post_order()
+            get_preds, get_succs = self._cfg.predecessors, self._cfg.successors
+            bb_in, bb_out = self._bb_in, self._bb_out
+        else:
+            order = list(reversed(self._cfg.reverse_post_order()))
+            get_preds, get_succs = self._cfg.successors, self._cfg.predecessors
+            bb_in, bb_out = self._bb_out, self._bb_in
+
+        # Unreachable basic blocks are analyzed as well.
+        order_addrs = set([bb.address for bb in order])
+        order += [bb for bb in self._cfg.basic_blocks if bb.address not in order_addrs]
+
+        # Boundary basic blocks: entries (exits, for backward analyses).
+        boundary = set([bb.address for bb in self._cfg.basic_blocks if not get_preds(bb.address)])
+
+        if order:
+            boundary.add(order[0].address)
+
+        worklist = deque(order)
+        in_worklist = set([bb.address for bb in order])
+
+        while worklist:
+            bb = worklist.popleft()
+            in_worklist.remove(bb.address)
+
+            # Values of predecessors not yet computed are ignored.
+            values = [bb_out[pred.address] for pred in get_preds(bb.address) if pred.address in bb_out]
+
+            if bb.address in boundary:
+                values.append(self.boundary())
+
+            value = self.meet(values)
+
+            bb_in[bb.address] = value
+
+            for instr, conditional in self._get_instrs(bb):
+                value = self.transfer(instr, value, conditional)
+
+            if bb_out.get(bb.address, None) != value or bb.address not in bb_out:
+                bb_out[bb.address] = value
+
+                for succ in get_succs(bb.address):
+                    if succ.address not in in_worklist:
+                        worklist.append(succ)
+                        in_worklist.add(succ.address)
+
+        self._solved = True
+
+    def block_in(self, address):
+        """Return the value at the start of a basic block.
+        """
+        self._check_solved()
+
+        return self._bb_in[address]
+
+    def block_out(self, address):
+        """Return the value at the end of a basic block.
+        """
+        self._check_solved()
+
+        return self._bb_out[address]
+
+    def instr_values(self, address):
+        """Return a list of (REIL instruction, value) of a basic block,
+        where value holds before (after, for backward analyses) the
+        instruction.
+        """
+        self._check_solved()
+
+        bb = self._cfg.get_basic_block(address)
+
+        if self.forward:
+            value = self._bb_in[address]
+        else:
+            value = self._bb_out[address]
+
+        values = []
+
+        for instr, conditional in self._get_instrs(bb):
+            values.append((instr, value))
+
+            value = self.transfer(instr, value, conditional)
+
+        if not self.forward:
+            values.reverse()
+
+        return values
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _check_solved(self):
+        if not self._solved:
+            self.solve()
+
+    def _get_instrs(self, bb):
+        """Return the REIL instructions of a basic block (in analysis
+        order), each one along with whether it is conditional or not.
+        """
+        instrs = []
+
+        for asm_instr in bb:
+            conditional = False
+
+            for instr in asm_instr.ir_instrs:
+                instrs.append((instr, conditional))
+
+                if instr.mnemonic == ReilMnemonic.JCC:
+                    conditional = True
+
+        if not self.forward:
+            instrs.reverse()
+
+        return instrs
+
+    def _get_register(self, name):
+        """Return the base register of a register and whether it is a
+        sub-register. Flags are tracked on their own.
+        """
+        if self._arch_info and name in self._arch_info.alias_mapper:
+            base, _ = self._arch_info.alias_mapper[name]
+
+            size = self._arch_info.registers_size.get(name, None)
+
+            if size > 1 and size < self._arch_info.registers_size.get(base, 0):
+                return base, True
+
+        return name, False
+
+
+class BitVectorDomain(object):
+
+    """Domain of a set-based analysis. It maps elements to bits.
+    """
+
+    def __init__(self):
+        self._elements = []
+        self._bits = {}
+
+    def bit(self, element):
+        """Return the bit (as a mask) that stands for an element.
+        """
+        if element not in self._bits:
+            self._bits[element] = 1 << len(self._elements)
+            self._elements.append(element)
+
+        return self._bits[element]
+
+    def elements(self, bits):
+        """Return the set of elements of a bit vector.
+        """
+        elements = set()
+        index = 0
+
+        while bits:
+            if bits & 0x1:
+                elements.add(self._elements[index])
+
+            bits >>= 1
+            index += 1
+
+        return elements
+
+    def __len__(self):
+        return len(self._elements)
+
+
+class LivenessAnalysis(DataflowAnalysis):
+
+    """Liveness analysis (backward, may). By default, registers that are
+    not temporaries are live at the exits of the CFG.
+    """
+
+    forward = False
+
+    def __init__(self, cfg, arch_info=None, live_out=None):
+        super(LivenessAnalysis, self).__init__(cfg, arch_info)
+
+        self._domain = BitVectorDomain()
+
+        # Compute uses and definitions of each instruction.
+        self._uses = {}
+        self._defs = {}
+
+        registers = set()
+
+        for bb in cfg.basic_blocks:
+            for instr, _ in self._get_instrs(bb):
+                uses = 0
+                defs = 0
+
+                for name in read_registers(instr):
+                    uses |= self._domain.bit(self._get_register(name)[0])
+
+                    registers.add(name)
+
+                for name in written_registers(instr):
+                    base, partial = self._get_register(name)
+
+                    # Partial writes keep the rest of the register.
+                    if partial:
+                        uses |= self._domain.bit(base)
+                    else:
+                        defs |= self._domain.bit(base)
+
+                    registers.add(name)
+
+                self._uses[id(instr)] = uses
+                self._defs[id(instr)] = defs
+
+        if live_out is None:
+            live_out = [name for name in registers if not re.match(temporary_register_regex, name)]
+
+        self._live_out = 0
+
+        for name in live_out:
+            self._live_out |= self._domain.bit(self._get_register(name)[0])
+
+    def boundary(self):
+        return self._live_out
+
+    def meet(self, values):
+        return reduce(lambda a, b: a | b, values, 0)
+
+    def transfer(self, instr, value, conditional):
+        if not conditional:
+            value &= ~self._defs[id(instr)]
+
+        return value | self._uses[id(instr)]
+
+    def live_in(self, address):
+        """Return the registers live at the start of a basic block.
+        """
+        return self._domain.elements(self.block_in(address))
+
+    def live_out(self, address):
+        """Return the registers live at the end of a basic block.
+        """
+        return self._domain.elements(self.block_out(address))
+
+    def dead_instructions(self):
+        """Return the REIL instructions that only write registers which
+        are not live afterwards (memory accesses and branches are never
+        dead).
+        """
+        dead = []
+
+        for bb in self._cfg.basic_blocks:
+            for instr, live in self.instr_values(bb.address):
+                defs = self._defs[id(instr)]
+
+                if defs and not defs & live and \
+                   instr.mnemonic not in [ReilMnemonic.STM, ReilMnemonic.JCC, ReilMnemonic.LDM]:
+                    dead.append(instr)
+
+        return dead
+
+
+class ReachingDefinitionsAnalysis(DataflowAnalysis):
+
+    """Reaching definitions analysis (forward, may). Definitions are
+    identified by the address of the REIL instruction and the register
+    it defines.
+    """
+
+    def __init__(self, cfg, arch_info=None):
+        super(ReachingDefinitionsAnalysis, self).__init__(cfg, arch_info)
+
+        self._domain = BitVectorDomain()
+
+        # Definitions by register, and generated definition by
+        # instruction.
+        self._defs_by_reg = {}
+        self._gen = {}
+
+        for bb in cfg.basic_blocks:
+            for instr, _ in self._get_instrs(bb):
+                self._gen[id(instr)] = (0, None)
+
+                for name in written_registers(instr):
+                    base, _ = self._get_register(name)
+
+                    bit = self._domain.bit((instr.address, base))
+
+                    self._defs_by_reg[base] = self._defs_by_reg.get(base, 0) | bit
+
+                    self._gen[id(instr)] = (bit, name)
+
+    def boundary(self):
+        return 0
+
+    def meet(self, values):
+        return reduce(lambda a, b: a | b, values, 0)
+
+    def transfer(self, instr, value, conditional):
+        gen, name = self._gen[id(instr)]
+
+        if not gen:
+            return value
+
+        base, partial = self._get_register(name)
+
+        if not conditional and not partial:
+            value &= ~self._defs_by_reg[base]
+
+        return value | gen
+
+    def reaching_in(self, address):
+        """Return the definitions, as (REIL address, register) tuples,
+        that reach the start of a basic block.
+        """
+        return self._domain.elements(self.block_in(address))
+
+    def reaching_out(self, address):
+        """Return the definitions, as (REIL address, register) tuples,
+        that reach the end of a basic block.
+        """
+        return self._domain.elements(self.block_out(address))
+
+
+class ConstantPropagationAnalysis(DataflowAnalysis):
+
+    """Constant propagation analysis (forward, must). Values are
+    dictionaries that map registers to constants. Registers not in a
+    dictionary are not constant.
+    """
+
+    def __init__(self, cfg, arch_info=None):
+        super(ConstantPropagationAnalysis, self).__init__(cfg, arch_info)
+
+    def boundary(self):
+        return {}
+
+    def meet(self, values):
+        if not values:
+            return {}
+
+        value = dict(values[0])
+
+        for other in values[1:]:
+            for name in value.keys():
+                if other.get(name, None) != value[name]:
+                    del value[name]
+
+        return value
+
+    def transfer(self, instr, value, conditional):
+        written = written_registers(instr)
+
+        if not written:
+            return value
+
+        base, partial = self._get_register(written[0])
+
+        result = None if conditional or partial else self._evaluate(instr, value)
+
+        value = dict(value)
+
+        if result is None:
+            value.pop(base, None)
+        else:
+            value[base] = result
+
+        return value
+
+    def constants_in(self, address):
+        """Return the constant registers at the start of a basic block.
+        """
+        return self.block_in(address)
+
+    def constants_out(self, address):
+        """Return the constant registers at the end of a basic block.
+        """
+        return self.block_out(address)
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _read_operand(self, oprnd, value):
+        if isinstance(oprnd, ReilImmediateOperand):
+            return oprnd.immediate
+
+        if isinstance(oprnd, ReilRegisterOperand):
+            base, partial = self._get_register(oprnd.name)
+
+            if partial or base not in value:
+                return None
+
+            return value[base] & (2**oprnd.size - 1)
+
+        return None
+
+    def _evaluate(self, instr, value):
+        """Evaluate a REIL instruction. Return None if the result is not
+        constant.
+        """
+        if instr.mnemonic in [ReilMnemonic.LDM, ReilMnemonic.UNDEF]:
+            return None
+
+        op0_val = self._read_operand(instr.operands[0], value)
+        op1_val = self._read_operand(instr.operands[1], value)
+
+        if op0_val is None:
+            return None
+
+        if op1_val is None and instr.mnemonic not in [ReilMnemonic.STR, ReilMnemonic.BISZ, ReilMnemonic.SEXT]:
+            return None
+
+        return evaluate(instr, op0_val, op1_val)
@@ -31,3 +31,7 @@ from classifier import GadgetClassifier
 from finder import GadgetFinder
 
 from verifier import GadgetVerifier
+
+from database import GadgetDatabase
+
+from index import GadgetIndex
@@ -42,6 +42,8 @@ from barf.analysis.gadgets import TypedGadget
 from barf.core.reil import ReilEmptyOperand
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilRegisterOperand
+from barf.core.reil.emulator import ReilVectorEmulator
+from barf.core.reil.emulator import ReilVectorEmulatorNotAvailable
 
 
 class GadgetClassifier(object):
@@ -54,6 +56,13 @@ class GadgetClassifier(object):
         # An instance of a REIL emulator
         self._ir_emulator = ir_emulator
 
+        # An instance of a vectorized REIL emulator (if NumPy is
+        # available), it runs all the simulation iterations at once.
+        try:
+            self._ir_vector_emulator = ReilVectorEmulator(architecture_info)
+        except ReilVectorEmulatorNotAvailable:
+            self._ir_vector_emulator = None
+
         # Classifiers ordered by gadgets type.
         self._classifiers = {
             GadgetType.NoOperation:     self._classify_no_operation,
@@ -103,9 +112,16 @@ class GadgetClassifier(object):
         """
         typed_gadgets = []
 
+        # Emulate the gadget just once for all gadget types, if
+        # possible.
+        if self._ir_vector_emulator:
+            executions = self._emulate_vector(gadget, self._emu_iters)
+        else:
+            executions = None
+
         for g_type, g_classifier in self._classifiers.items():
             try:
-                typed_gadgets += self._classify(gadget, g_classifier, g_type, self._emu_iters)
+                typed_gadgets += self._classify(gadget, g_classifier, g_type, self._emu_iters, executions)
             except:
                 import traceback
 
@@ -533,48 +549,25 @@ class GadgetClassifier(object):
 
     # Auxiliary functions
     # ======================================================================== #
-    def _classify(self, gadget, classifier, gadget_type, iters):
+    def _classify(self, gadget, classifier, gadget_type, iters, executions=None):
         """Classify gadgets.
         """
-        # Collect REIL instructions of the gadgets.
-        instrs = [ir_instr for asm_instr in gadget.instrs for ir_instr in asm_instr.ir_instrs]
+        # Emulate the gadget (one iteration at a time) unless it was
+        # already done.
+        if executions is None:
+            executions = (self._emulate(gadget) for _ in xrange(iters))
 
         # Repeat classification.
         results = []
 
-        for _ in xrange(iters):
-            # Reset emulator.
-            self._ir_emulator.reset()
-
-            # Generate random values for registers.
-            regs_initial = self._init_regs_random()
-
-            # Emulate gadgets.
-            try:
-                regs_final, mem_final = self._ir_emulator.execute_lite(
-                    instrs,
-                    regs_initial
-                )
-            except:
-                # Catch emulator exceptions like ZeroDivisionError, etc.
+        for execution in executions:
+            # Emulation failed (ZeroDivisionError, etc.)
+            if execution is None:
                 results += [([], [])]
 
                 continue
 
-            # Compute values for all registers. For example, in x86, it
-            # computes 'al' from 'eax'.
-            regs_initial_full = self._compute_full_context(regs_initial)
-            regs_final_full = self._compute_full_context(regs_final)
-
-            # Get written and read registers.
-            regs_written = self._ir_emulator.written_registers
-            regs_read = self._ir_emulator.read_registers
-
-            # Compute modified registers.
-            mod_regs = self._compute_mod_regs(
-                regs_initial_full,
-                regs_final_full
-            )
+            regs_initial_full, regs_final_full, mem_final, regs_written, regs_read, mod_regs = execution
 
             # Classified gadgets based on initial and final context.
             matches = classifier(
@@ -601,6 +594,88 @@ class GadgetClassifier(object):
 
         return classified
 
+    def _emulate(self, gadget):
+        """Emulate a gadget using random values for registers.
+        """
+        # Collect REIL instructions of the gadgets.
+        instrs = [ir_instr for asm_instr in gadget.instrs for ir_instr in asm_instr.ir_instrs]
+
+        # Reset emulator.
+        self._ir_emulator.reset()
+
+        # Generate random values for registers.
+        regs_initial = self._init_regs_random()
+
+        # Emulate gadgets.
+        try:
+            regs_final, mem_final = self._ir_emulator.execute_lite(
+                instrs,
+                regs_initial
+            )
+        except:
+            # Catch emulator exceptions like ZeroDivisionError, etc.
+            return None
+
+        return self._build_execution(
+            regs_initial,
+            regs_final,
+            mem_final,
+            self._ir_emulator.written_registers,
+            self._ir_emulator.read_registers
+        )
+
+    def _emulate_vector(self, gadget, iters):
+        """Emulate a gadget using random values for registers. All
+        iterations are executed at once.
+        """
+        # Collect REIL instructions of the gadgets.
+        instrs = [ir_instr for asm_instr in gadget.instrs for ir_instr in asm_instr.ir_instrs]
+
+        # Generate random values for registers.
+        regs_initial = [self._init_regs_random() for _ in xrange(iters)]
+
+        # Emulate gadgets.
+        try:
+            _, mems_final = self._ir_vector_emulator.execute_lite(
+                instrs,
+                regs_initial
+            )
+        except:
+            return [None] * iters
+
+        executions = []
+
+        for lane in xrange(iters):
+            # Catch emulator exceptions like ZeroDivisionError, etc.
+            if self._ir_vector_emulator.faults[lane]:
+                executions += [None]
+
+                continue
+
+            executions += [self._build_execution(
+                regs_initial[lane],
+                self._ir_vector_emulator.get_context(lane),
+                mems_final[lane],
+                self._ir_vector_emulator.written_registers,
+                self._ir_vector_emulator.read_registers
+            )]
+
+        return executions
+
+    def _build_execution(self, regs_initial, regs_final, mem_final, regs_written, regs_read):
+        # Compute values for all registers. For example, in x86, it
+        # computes 'al' from 'eax'.
+        regs_initial_full = self._compute_full_context(regs_initial)
+        regs_final_full = self._compute_full_context(regs_final)
+
+        # Compute modified registers.
+        mod_regs = self._compute_mod_regs(
+            regs_initial_full,
+            regs_final_full
+        )
+
+        return regs_initial_full, regs_final_full, mem_final, regs_written, regs_read, mod_regs
+
     def _analyze_execution_results(self, results):
         matching_candidates, _ = results[0]
 
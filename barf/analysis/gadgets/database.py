@@ -0,0 +1,303 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements an on-disk gadget database (SQLite based). It
+stores raw gadgets as well as their classification and verification
+results, so they can be queried (by type, register and operation)
+without processing the binary again.
+
+Gadgets are stored per address range. Each range is keyed by a hash of
+its bytes (plus the bytes around it that a gadget can span) and the
+finder parameters. Therefore, when a binary is updated, only the ranges
+whose bytes changed are processed again.
+
+"""
+
+import cPickle as pickle
+import hashlib
+import sqlite3
+
+from barf.analysis.gadgets import RawGadget
+from barf.analysis.gadgets import TypedGadget
+from barf.core.reil import ReilRegisterOperand
+
+
+class GadgetDatabase(object):
+
+    """Gadget Database.
+    """
+
+    def __init__(self, filename, range_size=0x1000):
+
+        # Database connection.
+        self._conn = sqlite3.connect(filename)
+        self._conn.text_factory = str
+
+        # Size of the address ranges the binary is split into.
+        self._range_size = range_size
+
+        # Maximum instruction size (ARM instructions are shorter but
+        # this does not affect the result).
+        self._max_instr_size = 16
+
+        self._create_tables()
+
+    def close(self):
+        """Close database.
+        """
+        self._conn.commit()
+        self._conn.close()
+
+    # Find
+    # ======================================================================== #
+    def find(self, gadget_finder, start_address, end_address, byte_depth=20, instrs_depth=2, binary_hash=None):
+        """Find gadgets. Address ranges that did not change since they
+        were stored are loaded from the database.
+        """
+        candidates = []
+
+        # Number of bytes a gadget can span before its last instruction.
+        lookback = byte_depth * instrs_depth + 1
+        lookahead = self._max_instr_size - 1
+
+        for range_start in xrange(start_address, end_address + 1, self._range_size):
+            range_end = min(range_start + self._range_size - 1, end_address)
+
+            window_start = max(start_address, range_start - lookback)
+            window_end = min(end_address, range_end + lookahead)
+
+            key = self._range_key(gadget_finder, range_start, range_end, window_start, window_end, byte_depth, instrs_depth)
+
+            gadgets = self._load_range(key)
+
+            if gadgets is None:
+                gadgets = gadget_finder.find(window_start, window_end, byte_depth=byte_depth, instrs_depth=instrs_depth)
+
+                # Keep gadgets that end in the range.
+                gadgets = [g for g in gadgets if range_start <= g.instrs[-1].address <= range_end]
+
+                self._store_range(key, gadgets)
+
+            if binary_hash:
+                self._conn.execute("INSERT OR REPLACE INTO binaries VALUES (?, ?, ?, ?)",
+                                   (binary_hash, range_start, range_end, key))
+
+            candidates += gadgets
+
+        self._conn.commit()
+
+        return candidates
+
+    # Classification and verification
+    # ======================================================================== #
+    def load_classification(self, gadget):
+        """Load the classification of a raw gadget. Return None if it
+        was not classified yet.
+        """
+        row = self._conn.execute("SELECT classified FROM gadgets WHERE id = ?", (gadget.id,)).fetchone()
+
+        if not row or not row[0]:
+            return None
+
+        rows = self._conn.execute("SELECT id, type, operation, verified, valid, data FROM typed_gadgets "
+                                  "WHERE gadget_id = ? ORDER BY id", (gadget.id,))
+
+        return [self._build_typed_gadget(gadget, row) for row in rows]
+
+    def store_classification(self, gadget, typed_gadgets):
+        """Store the classification of a raw gadget.
+        """
+        for typed_gadget in typed_gadgets:
+            data = pickle.dumps((typed_gadget.sources, typed_gadget.destination, typed_gadget.modified_registers),
+                                pickle.HIGHEST_PROTOCOL)
+
+            cursor = self._conn.execute("INSERT INTO typed_gadgets VALUES (NULL, ?, ?, ?, 0, 0, ?)",
+                                        (gadget.id, typed_gadget.type, typed_gadget.operation, sqlite3.Binary(data)))
+
+            typed_gadget.id = cursor.lastrowid
+
+            registers = [(oprnd, "src") for oprnd in typed_gadget.sources] + \
+                        [(oprnd, "dst") for oprnd in typed_gadget.destination] + \
+                        [(oprnd, "mod") for oprnd in typed_gadget.modified_registers]
+
+            for oprnd, role in registers:
+                if isinstance(oprnd, ReilRegisterOperand):
+                    self._conn.execute("INSERT INTO registers VALUES (?, ?, ?)",
+                                       (typed_gadget.id, oprnd.name, role))
+
+        self._conn.execute("UPDATE gadgets SET classified = 1 WHERE id = ?", (gadget.id,))
+
+        self._conn.commit()
+
+    def store_verification(self, typed_gadget, valid):
+        """Store the verification result of a typed gadget.
+        """
+        self._conn.execute("UPDATE typed_gadgets SET verified = 1, valid = ? WHERE id = ?",
+                           (1 if valid else 0, typed_gadget.id))
+
+        self._conn.commit()
+
+    # Query
+    # ======================================================================== #
+    def query(self, gadget_type=None, register=None, operation=None, binary_hash=None, valid=None):
+        """Query classified gadgets by type, register (either source,
+        destination or modified), operation, binary and verification
+        result.
+        """
+        conditions = []
+        params = []
+
+        if gadget_type is not None:
+            conditions += ["type = ?"]
+            params += [gadget_type]
+
+        if register is not None:
+            conditions += ["id IN (SELECT typed_id FROM registers WHERE name = ?)"]
+            params += [register]
+
+        if operation is not None:
+            conditions += ["operation = ?"]
+            params += [operation]
+
+        if binary_hash is not None:
+            conditions += ["gadget_id IN (SELECT gadgets.id FROM gadgets JOIN binaries "
+                           "ON gadgets.range_key = binaries.range_key WHERE binaries.hash = ?)"]
+            params += [binary_hash]
+
+        if valid is not None:
+            conditions += ["verified = 1 AND valid = ?"]
+            params += [1 if valid else 0]
+
+        sql = "SELECT id, gadget_id, type, operation, verified, valid, data FROM typed_gadgets"
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        sql += " ORDER BY id"
+
+        gadgets = {}
+        typed_gadgets = []
+
+        for row in self._conn.execute(sql, params).fetchall():
+            gadget_id = row[1]
+
+            if gadget_id not in gadgets:
+                gadgets[gadget_id] = self._load_gadget(gadget_id)
+
+            typed_gadgets += [self._build_typed_gadget(gadgets[gadget_id], row[:1] + row[2:])]
+
+        return typed_gadgets
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _create_tables(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS binaries (
+                hash TEXT, start INTEGER, end INTEGER, range_key TEXT,
+                PRIMARY KEY (hash, start));
+            CREATE TABLE IF NOT EXISTS ranges (
+                key TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS gadgets (
+                id INTEGER PRIMARY KEY, range_key TEXT, address INTEGER,
+                fingerprint TEXT, classified INTEGER, data BLOB);
+            CREATE TABLE IF NOT EXISTS typed_gadgets (
+                id INTEGER PRIMARY KEY, gadget_id INTEGER, type INTEGER,
+                operation TEXT, verified INTEGER, valid INTEGER, data BLOB);
+            CREATE TABLE IF NOT EXISTS registers (
+                typed_id INTEGER, name TEXT, role TEXT);
+
+            CREATE INDEX IF NOT EXISTS binaries_range_key ON binaries (range_key);
+            CREATE INDEX IF NOT EXISTS gadgets_range_key ON gadgets (range_key);
+            CREATE INDEX IF NOT EXISTS typed_gadgets_gadget_id ON typed_gadgets (gadget_id);
+            CREATE INDEX IF NOT EXISTS typed_gadgets_type ON typed_gadgets (type, operation);
+            CREATE INDEX IF NOT EXISTS registers_name ON registers (name);
+        """)
+
+    def _range_key(self, gadget_finder, range_start, range_end, window_start, window_end, byte_depth, instrs_depth):
+        params = (
+            gadget_finder.architecture,
+            gadget_finder.architecture_mode,
+            byte_depth,
+            instrs_depth,
+            range_start,
+            range_end,
+            window_start,
+            window_end,
+        )
+
+        data = str(gadget_finder.memory[window_start:window_end + 1])
+
+        return hashlib.sha1(repr(params) + data).hexdigest()
+
+    def _load_range(self, key):
+        if not self._conn.execute("SELECT key FROM ranges WHERE key = ?", (key,)).fetchone():
+            return None
+
+        rows = self._conn.execute("SELECT id, data FROM gadgets WHERE range_key = ? ORDER BY id", (key,))
+
+        return [self._build_gadget(gadget_id, data) for gadget_id, data in rows]
+
+    def _store_range(self, key, gadgets):
+        for gadget in gadgets:
+            data = pickle.dumps([(instr, instr.ir_instrs) for instr in gadget.instrs], pickle.HIGHEST_PROTOCOL)
+
+            cursor = self._conn.execute("INSERT INTO gadgets VALUES (NULL, ?, ?, ?, 0, ?)",
+                                        (key, gadget.address, gadget.ir_fingerprint, sqlite3.Binary(data)))
+
+            gadget.id = cursor.lastrowid
+
+        self._conn.execute("INSERT INTO ranges VALUES (?)", (key,))
+
+    def _load_gadget(self, gadget_id):
+        data, = self._conn.execute("SELECT data FROM gadgets WHERE id = ?", (gadget_id,)).fetchone()
+
+        return self._build_gadget(gadget_id, data)
+
+    def _build_gadget(self, gadget_id, data):
+        instrs = []
+
+        for instr, ir_instrs in pickle.loads(str(data)):
+            instr.ir_instrs = ir_instrs
+
+            instrs += [instr]
+
+        gadget = RawGadget(instrs)
+        gadget.id = gadget_id
+
+        return gadget
+
+    def _build_typed_gadget(self, gadget, row):
+        typed_id, gadget_type, operation, verified, valid, data = row
+
+        typed_gadget = TypedGadget(gadget, gadget_type, gadget.instrs)
+
+        typed_gadget.id = typed_id
+        typed_gadget.operation = operation
+        typed_gadget.sources, typed_gadget.destination, typed_gadget.modified_registers = pickle.loads(str(data))
+
+        if verified:
+            typed_gadget.is_valid = bool(valid)
+
+        return typed_gadget
@@ -82,6 +82,26 @@ class GadgetFinder(object):
 
         return candidates
 
+    # Properties
+    # ======================================================================== #
+    @property
+    def architecture(self):
+        """Get finder architecture.
+        """
+        return self._architecture
+
+    @property
+    def architecture_mode(self):
+        """Get finder architecture mode.
+        """
+        return self._architecture_mode
+
+    @property
+    def memory(self):
+        """Get finder memory.
+        """
+        return self._mem
+
     # Auxiliary functions
     # ======================================================================== #
     def _find_x86_candidates(self, start_address, end_address):
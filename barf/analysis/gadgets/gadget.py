@@ -33,8 +33,16 @@ each classified type and the RawGadget object is associated with them.
 
 """
 
+import hashlib
+import re
+
 from barf.core.reil import ReilEmptyOperand
 from barf.core.reil import ReilImmediateOperand
+from barf.core.reil import ReilMnemonic
+from barf.core.reil import ReilRegisterOperand
+
+# Temporary registers names (generated during translation).
+temporary_register_regex = re.compile(r"^t\d+$")
 
 
 class RawGadget(object):
@@ -78,6 +86,14 @@ class RawGadget(object):
 
         return ir_instrs
 
+    @property
+    def ir_fingerprint(self):
+        """Get a hash of the gadgets normalized IR instructions. Two
+        gadgets with the same semantics but different encodings (or
+        addresses) have the same fingerprint.
+        """
+        return ir_fingerprint(self.ir_instrs)
+
     @property
     def id(self):
         """Get gadgets validity status.
@@ -246,6 +262,29 @@ class TypedGadget(RawGadget):
 
         return strings[self._gadget_type](self)
 
+    @property
+    def fingerprint(self):
+        """Get gadgets canonical fingerprint, i.e., its type, operation,
+        sources, destination, set of modified registers and the
+        fingerprint of its IR instructions.
+        """
+        return (
+            self._gadget_type,
+            self._operation,
+            tuple(operand_key(oprnd) for oprnd in self._sources),
+            tuple(operand_key(oprnd) for oprnd in self._destination),
+            tuple(sorted(operand_key(oprnd) for oprnd in self._modified_regs)),
+            self.ir_fingerprint,
+        )
+
+    def __hash__(self):
+        return hash((
+            self._operation,
+            tuple(operand_key(oprnd) for oprnd in self._sources),
+            tuple(operand_key(oprnd) for oprnd in self._destination),
+            tuple(operand_key(oprnd) for oprnd in self._modified_regs),
+        ))
+
     def __eq__(self, other):
         """Return self == other."""
         if type(other) is type(self):
@@ -303,6 +342,44 @@ class GadgetType(object):
         return strings[gadget_type]
 
 
+# Gadget fingerprint functions
+# ============================================================================ #
+def operand_key(oprnd):
+    """Return a hashable representation of a REIL operand.
+    """
+    if isinstance(oprnd, ReilEmptyOperand):
+        return (type(oprnd).__name__,)
+
+    return (type(oprnd).__name__, str(oprnd), oprnd.size)
+
+
+def ir_fingerprint(ir_instrs):
+    """Return a hash of a list of REIL instructions. Instructions
+    addresses are dropped and temporary registers are renamed in order of
+    appearance.
+    """
+    temps = {}
+    lines = []
+
+    for instr in ir_instrs:
+        oprnds = []
+
+        for oprnd in instr.operands:
+            if isinstance(oprnd, ReilRegisterOperand) and \
+                temporary_register_regex.match(oprnd.name):
+                name = temps.setdefault(oprnd.name, "t%d" % len(temps))
+
+                oprnds += ["%s:%d" % (name, oprnd.size)]
+            elif isinstance(oprnd, ReilEmptyOperand):
+                oprnds += [str(oprnd)]
+            else:
+                oprnds += ["%s:%d" % (str(oprnd), oprnd.size)]
+
+        lines += ["%s %s" % (ReilMnemonic.to_string(instr.mnemonic), ", ".join(oprnds))]
+
+    return hashlib.sha1("\n".join(lines)).hexdigest()
+
+
 # Gadget dump functions
 # ============================================================================ #
 def dump_no_operation(gadget):
@@ -0,0 +1,132 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements an in-memory index over classified gadgets
+(TypedGadget objects). Gadgets are indexed by type, destination
+register, source registers, operation and modified (clobbered)
+registers, so queries such as "load a constant into rdi without
+clobbering rsi" do not require a linear scan of all gadgets.
+
+"""
+
+from barf.core.reil import ReilRegisterOperand
+
+
+class GadgetIndex(object):
+
+    """Gadget Index.
+    """
+
+    def __init__(self, gadgets=None, architecture_info=None):
+
+        # Architecture information (used to resolve register aliases).
+        self._arch_info = architecture_info
+
+        # Indexed gadgets.
+        self._gadgets = []
+
+        # Indexes (key -> set of gadgets indices).
+        self._by_type = {}
+        self._by_operation = {}
+        self._by_destination = {}
+        self._by_source = {}
+        self._by_modified = {}
+
+        for gadget in gadgets if gadgets else []:
+            self.add(gadget)
+
+    def add(self, gadget):
+        """Add a gadget to the index.
+        """
+        idx = len(self._gadgets)
+
+        self._gadgets.append(gadget)
+
+        self._by_type.setdefault(gadget.type, set()).add(idx)
+        self._by_operation.setdefault(gadget.operation, set()).add(idx)
+
+        for reg in self._registers(gadget.destination):
+            self._by_destination.setdefault(reg, set()).add(idx)
+
+        for reg in self._registers(gadget.sources):
+            self._by_source.setdefault(reg, set()).add(idx)
+
+        # Modified registers are indexed by base register, so a gadget
+        # that modifies 'esi' clobbers 'rsi' and 'si' as well.
+        for reg in self._registers(gadget.modified_registers):
+            self._by_modified.setdefault(self._base_register(reg), set()).add(idx)
+
+    def query(self, gadget_type=None, destination=None, sources=None, operation=None, preserve=None):
+        """Return gadgets of a given type, that write a destination
+        register, read all source registers, compute an operation and do
+        not modify any of the registers to preserve. Gadgets are returned
+        in the order they were added.
+        """
+        candidates = []
+
+        if gadget_type is not None:
+            candidates += [self._by_type.get(gadget_type, set())]
+
+        if operation is not None:
+            candidates += [self._by_operation.get(operation, set())]
+
+        if destination is not None:
+            candidates += [self._by_destination.get(destination, set())]
+
+        for reg in sources if sources else []:
+            candidates += [self._by_source.get(reg, set())]
+
+        if candidates:
+            # Intersect starting from the smallest set.
+            candidates.sort(key=len)
+
+            result = set(candidates[0])
+
+            for indices in candidates[1:]:
+                result &= indices
+        else:
+            result = set(xrange(len(self._gadgets)))
+
+        for reg in preserve if preserve else []:
+            result -= self._by_modified.get(self._base_register(reg), set())
+
+        return [self._gadgets[idx] for idx in sorted(result)]
+
+    def __len__(self):
+        return len(self._gadgets)
+
+    def __iter__(self):
+        return iter(self._gadgets)
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _registers(self, operands):
+        return [oprnd.name for oprnd in operands if isinstance(oprnd, ReilRegisterOperand)]
+
+    def _base_register(self, register):
+        if self._arch_info and register in self._arch_info.alias_mapper:
+            return self._arch_info.alias_mapper[register][0]
+
+        return register
@@ -32,6 +32,11 @@ validity.
 
 This algorithm is architecture agnostic since it operates on the IR
 representation of the underlying assembly code.
+
+Optionally, before building the formula, the gadget is emulated on a set
+of adversarial concrete contexts (zeros, all ones, boundary values, a
+repeated byte pattern and distinct values). If any of them satisfies the constraints, the
+classification is wrong and the solver is not called at all.
 """
 
 import logging
@@ -49,7 +54,7 @@ class GadgetVerifier(object):
     """Gadget Verifier.
     """
 
-    def __init__(self, code_analyzer, architecture_info):
+    def __init__(self, code_analyzer, architecture_info, ir_emulator=None):
 
         # An instance of a Code Analyzer.
         self.analyzer = code_analyzer
@@ -57,6 +62,24 @@ class GadgetVerifier(object):
         # Architecture information.
         self._arch_info = architecture_info
 
+        # An instance of a REIL emulator (optional, used to falsify
+        # classifications before calling the solver).
+        self._ir_emulator = ir_emulator
+
+        # Concrete constraints checkers ordered by gadgets type.
+        self._concrete_checkers = {
+            GadgetType.NoOperation:     self._check_no_operation,
+            GadgetType.MoveRegister:    self._check_move_register,
+            GadgetType.LoadConstant:    self._check_load_constant,
+            GadgetType.Arithmetic:      self._check_arithmetic,
+            GadgetType.LoadMemory:      self._check_load_memory,
+            GadgetType.StoreMemory:     self._check_store_memory,
+            GadgetType.ArithmeticLoad:  self._check_arithmetic_load,
+        }
+
+        # Adversarial contexts for the falsification stage.
+        self._contexts = self._build_adversarial_contexts()
+
         # Constraints generators ordered by gadgets type.
         self._constraints_generators = {
             GadgetType.NoOperation:     self._get_constrs_no_operation,
@@ -94,6 +117,10 @@ class GadgetVerifier(object):
     def verify(self, gadget):
         """Verify gadgets.
         """
+        # Try to disprove the classification using concrete values.
+        if self._ir_emulator and self._falsify(gadget):
+            return False
+
         # Add instructions to the analyzer
         self.analyzer.reset()
 
@@ -112,6 +139,163 @@ class GadgetVerifier(object):
 
         return self.analyzer.check() == 'unsat'
 
+    # Falsification
+    # ======================================================================== #
+    def _falsify(self, gadget):
+        """Return True if a concrete context satisfies the constraints of
+        the gadget, i.e., the classification is not valid.
+        """
+        checker = self._concrete_checkers.get(gadget.type)
+
+        if not checker:
+            return False
+
+        instrs = gadget.ir_instrs
+
+        for regs_initial in self._contexts:
+            self._ir_emulator.reset()
+
+            try:
+                regs_final, mem_final = self._ir_emulator.execute_lite(instrs, dict(regs_initial))
+            except:
+                # Emulator exceptions (ZeroDivisionError, etc.) are
+                # inconclusive.
+                continue
+
+            constrs = checker(gadget, regs_initial, regs_final, mem_final)
+
+            # Constraints are added to the solver one by one, so all of
+            # them have to hold.
+            if constrs and all(constrs):
+                return True
+
+        return False
+
+    def _build_adversarial_contexts(self):
+        """Build concrete contexts that are likely to disprove a wrong
+        classification.
+        """
+        regs = self._arch_info.registers_gp_base
+        size = self._arch_info.operand_size
+
+        values = [
+            0x0,                            # zeros
+            2**size - 1,                    # all ones
+            0x1,                            # boundary values
+            2**(size - 1),
+            2**(size - 1) - 1,
+            0x41 * (2**size - 1) / 0xff,    # repeated byte pattern
+        ]
+
+        contexts = []
+
+        for value in values:
+            contexts += [dict((reg, value & (2**self._arch_info.registers_size[reg] - 1)) for reg in regs)]
+
+        # Distinct values (no aliasing).
+        contexts += [dict((reg, (0x10 * (idx + 1)) & (2**self._arch_info.registers_size[reg] - 1)) for idx, reg in enumerate(regs))]
+
+        return contexts
+
+    def _check_no_operation(self, gadget, regs_init, regs_fini, mem_fini):
+        # Memory changes are not taken into account so the result is
+        # inconclusive unless a register or flag changed.
+        names = self._arch_info.registers_gp_base + self._arch_info.registers_flags
+
+        if any(self._get_value(regs_init, name) != self._get_value(regs_fini, name) for name in names):
+            return [True]
+
+        return None
+
+    def _check_move_register(self, gadget, regs_init, regs_fini, mem_fini):
+        dst = self._get_value(regs_fini, gadget.destination[0].name)
+        src = self._get_value(regs_init, gadget.sources[0].name)
+
+        return [dst != src] + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_load_constant(self, gadget, regs_init, regs_fini, mem_fini):
+        dst = self._get_value(regs_fini, gadget.destination[0].name)
+        src = gadget.sources[0].immediate
+
+        return [dst != src] + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_arithmetic(self, gadget, regs_init, regs_fini, mem_fini):
+        dst = self._get_value(regs_fini, gadget.destination[0].name)
+        src1 = self._get_value(regs_init, gadget.sources[0].name)
+        src2 = self._get_value(regs_init, gadget.sources[1].name)
+        op = self._arithmetic_ops[gadget.operation]
+
+        result = op(src1, src2) & (2**gadget.destination[0].size - 1)
+
+        return [dst != result] + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_load_memory(self, gadget, regs_init, regs_fini, mem_fini):
+        dst = self._get_value(regs_fini, gadget.destination[0].name)
+        size = gadget.destination[0].size
+        addr = self._get_address(regs_init, gadget.sources[0], gadget.sources[1])
+
+        constrs = []
+
+        for i in reversed(xrange(0, size, 8)):
+            constrs += [mem_fini.read(addr + i/8, 1) != (dst >> i) & 0xff]
+
+        return constrs + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_store_memory(self, gadget, regs_init, regs_fini, mem_fini):
+        src = self._get_value(regs_init, gadget.sources[0].name)
+        size = gadget.sources[0].size
+        addr = self._get_address(regs_init, gadget.destination[0], gadget.destination[1])
+
+        constrs = []
+
+        for i in reversed(xrange(0, size, 8)):
+            constrs += [mem_fini.read(addr + i/8, 1) != (src >> i) & 0xff]
+
+        return constrs + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_arithmetic_load(self, gadget, regs_init, regs_fini, mem_fini):
+        op = self._arithmetic_ops[gadget.operation]
+        dst = self._get_value(regs_fini, gadget.destination[0].name)
+        size = gadget.destination[0].size
+        addr = self._get_address(regs_init, gadget.sources[1], gadget.sources[2])
+
+        src1 = self._get_value(regs_init, gadget.sources[0].name)
+        src2 = mem_fini.read(addr, size/8)
+
+        result = op(src1, src2) & (2**size - 1)
+
+        constrs = []
+
+        for i in reversed(xrange(0, size, 8)):
+            constrs += [(result >> i) & 0xff != (dst >> i) & 0xff]
+
+        return constrs + self._check_modified(gadget, regs_init, regs_fini)
+
+    def _check_modified(self, gadget, regs_init, regs_fini):
+        """Check if a non-modified register changed.
+        """
+        mod_regs = [r.name for r in gadget.modified_registers]
+
+        names = [name for name in self._arch_info.registers_gp_base if name not in mod_regs]
+
+        if not names:
+            return []
+
+        return [any(self._get_value(regs_init, name) != self._get_value(regs_fini, name) for name in names)]
+
+    def _get_value(self, regs, name):
+        base_name, offset = self._arch_info.alias_mapper.get(name, (name, 0))
+
+        return (regs[base_name] >> offset) & (2**self._arch_info.registers_size[name] - 1)
+
+    def _get_address(self, regs, base, offset):
+        if isinstance(base, ReilRegisterOperand):
+            addr = self._get_value(regs, base.name) + offset.immediate
+        else:
+            addr = offset.immediate
+
+        return addr & (2**self._arch_info.address_size - 1)
+
     # Verifiers
     # ======================================================================== #
     def _get_constrs_no_operation(self, gadget):
@@ -24,3 +24,4 @@
 
 from basicblock import BasicBlock
 from barf.analysis.graphs.controlflowgraph import ControlFlowGraph, RecursiveDescent, CFGRecoverer
+from cache import AnalysisCache
@@ -82,6 +82,12 @@ class BasicBlock(object):
 
         self._is_exit = False
 
+        # Function that loads the instructions of the basic block on
+        # demand, and its start and end addresses (until loaded).
+        self._instrs_loader = None
+
+        self._bounds = None
+
     @property
     def label(self):
         """Get basic block label.
@@ -122,12 +128,29 @@ class BasicBlock(object):
     def instrs(self):
         """Get basic block instructions.
         """
+        if self._instrs_loader:
+            self._instrs = self._instrs_loader()
+
+            self._instrs_loader = None
+            self._bounds = None
+
         return self._instrs
 
+    def set_instrs_loader(self, start_address, end_address, loader):
+        """Set a function that loads the instructions of the basic
+        block on first access.
+        """
+        self._instrs = []
+        self._instrs_loader = loader
+        self._bounds = (start_address, end_address)
+
     @property
     def address(self):
         """Get basic block start address.
         """
+        if self._bounds:
+            return self._bounds[0]
+
         if len(self._instrs) == 0:
             return None
 
@@ -137,6 +160,9 @@ class BasicBlock(object):
     def start_address(self):
         """Get basic block start address.
         """
+        if self._bounds:
+            return self._bounds[0]
+
         if self._instrs is []:
             return None
 
@@ -146,6 +172,9 @@ class BasicBlock(object):
     def end_address(self):
         """Get basic block end address.
         """
+        if self._bounds:
+            return self._bounds[1]
+
         if self._instrs is []:
             return None
 
@@ -155,6 +184,9 @@ class BasicBlock(object):
     def size(self):
         """Get basic block size.
         """
+        if self._bounds:
+            return self._bounds[1] - self._bounds[0] + 1
+
         if self._instrs is []:
             return None
 
@@ -221,6 +253,9 @@ class BasicBlock(object):
     def empty(self):
         """Check if a basic block is empty.
         """
+        if self._bounds:
+            return False
+
         return len(self._instrs) == 0
 
     def __str__(self):
@@ -229,7 +264,7 @@ class BasicBlock(object):
         asm_fmt = "{:#x}    {}"
         reil_fmt = "{:#x}:{:02d} {}"
 
-        for asm_instr in self._instrs:
+        for asm_instr in self.instrs:
             lines += [asm_fmt.format(asm_instr.address, asm_instr)]
 
             for reil_instr in asm_instr.ir_instrs:
@@ -245,15 +280,15 @@ class BasicBlock(object):
         return not self.__eq__(other)
 
     def __iter__(self):
-        for instr in self._instrs:
+        for instr in self.instrs:
             yield instr
 
     def __len__(self):
-        return len(self._instrs)
+        return len(self.instrs)
 
     def __getstate__(self):
         state = {
-            '_instrs': self._instrs,
+            '_instrs': self.instrs,
             '_address': self._address,
             '_taken_branch': self._taken_branch,
             '_not_taken_branch': self._not_taken_branch,
@@ -264,6 +299,8 @@ class BasicBlock(object):
 
     def __setstate__(self, state):
         self._instrs = state['_instrs']
+        self._instrs_loader = None
+        self._bounds = None
         self._address = state['_address']
         self._taken_branch = state['_taken_branch']
         self._not_taken_branch = state['_not_taken_branch']
@@ -0,0 +1,141 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements an on-disk analysis cache (SQLite based). It
+stores the basic blocks recovered for each function of a binary, so the
+CFGs (and, therefore, the call graph) of an unchanged binary do not need
+to be recovered again.
+
+Entries are keyed by the hash of the binary, the start address of the
+function and the recovery options. Basic blocks are stored in a compact
+format, that is, their layout (start and end addresses) and
+branches. Instructions are decoded again, on demand, the first time
+the instructions of a basic block are accessed.
+
+"""
+
+import marshal
+import sqlite3
+import zlib
+
+from barf.analysis.graphs.basicblock import BasicBlock
+
+
+class AnalysisCache(object):
+
+    """Analysis Cache.
+    """
+
+    def __init__(self, filename):
+
+        # Database connection.
+        self._conn = sqlite3.connect(filename)
+        self._conn.text_factory = str
+
+        self._create_tables()
+
+    def close(self):
+        """Close cache.
+        """
+        self._conn.commit()
+        self._conn.close()
+
+    def load(self, binary_hash, start, options, disassemble):
+        """Load the basic blocks and call targets of a function. Return
+        None if the function is not in the cache. Instructions are
+        decoded by calling `disassemble` with their address and the end
+        address of their basic block.
+        """
+        row = self._conn.execute("SELECT data FROM cfgs WHERE hash = ? AND start = ? AND options = ?",
+                                 (binary_hash, start, options)).fetchone()
+
+        if not row:
+            return None
+
+        layout, calls = marshal.loads(zlib.decompress(row[0]))
+
+        bbs = [self._build_bb(bb_layout, disassemble) for bb_layout in layout]
+
+        return bbs, list(calls)
+
+    def store(self, binary_hash, start, options, bbs, calls):
+        """Store the basic blocks and call targets of a function.
+        """
+        layout = [self._get_bb_layout(bb) for bb in bbs]
+
+        data = zlib.compress(marshal.dumps((layout, list(calls))))
+
+        self._conn.execute("INSERT OR REPLACE INTO cfgs VALUES (?, ?, ?, ?)",
+                           (binary_hash, start, options, sqlite3.Binary(data)))
+
+        self._conn.commit()
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _create_tables(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cfgs (
+                hash TEXT, start INTEGER, options TEXT, data BLOB,
+                PRIMARY KEY (hash, start, options));
+        """)
+
+    def _get_bb_layout(self, bb):
+        return (
+            bb.start_address,
+            bb.end_address + 1,
+            bb.is_entry,
+            bb.is_exit,
+            bb.taken_branch,
+            bb.not_taken_branch,
+            bb.direct_branch,
+        )
+
+    def _build_bb(self, bb_layout, disassemble):
+        start, end, is_entry, is_exit, taken, not_taken, direct = bb_layout
+
+        def load_instrs():
+            instrs = []
+            address = start
+
+            # Instructions of a basic block are contiguous.
+            while address < end:
+                instr = disassemble(address, end)
+
+                instrs.append(instr)
+
+                address += instr.size
+
+            return instrs
+
+        bb = BasicBlock()
+
+        bb.set_instrs_loader(start, end - 1, load_instrs)
+        bb.is_entry = is_entry
+        bb.is_exit = is_exit
+        bb.taken_branch = taken
+        bb.not_taken_branch = not_taken
+        bb.direct_branch = direct
+
+        return bb
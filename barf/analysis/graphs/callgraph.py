@@ -47,10 +47,11 @@ class CallGraph(object):
         # CFGs accessed by address
         self._cfg_by_addr = dict([(cfg.start_address, cfg) for cfg in cfgs])
 
-        self._edges = {}
+        # Call targets of each CFG
+        self._edges = self._build_edges()
 
-        # Basic block graph
-        self._graph = self._build_graph()
+        # Call graph (networkx), built on demand.
+        self._graph = None
 
     @property
     def cfgs(self):
@@ -73,7 +74,7 @@ class CallGraph(object):
         start_address = cfg_start.start_address
         end_address = cfg_end.start_address
 
-        paths = networkx.all_simple_paths(self._graph, source=start_address, target=end_address)
+        paths = networkx.all_simple_paths(self._get_graph(), source=start_address, target=end_address)
 
         return (map(lambda addr: self._cfg_by_addr[addr], path) for path in paths)
 
@@ -89,7 +90,7 @@ class CallGraph(object):
         start_address = cfg_start.start_address
         end_address = cfg_end.start_address
 
-        paths = networkx.all_simple_paths(self._graph, source=start_address, target=end_address)
+        paths = networkx.all_simple_paths(self._get_graph(), source=start_address, target=end_address)
 
         return (map(lambda addr: self._cfg_by_addr[addr], path) for path in paths)
 
@@ -115,34 +116,43 @@ class CallGraph(object):
 
     # Auxiliary functions
     # ======================================================================== #
-    def _build_graph(self):
-        graph = networkx.DiGraph()
-
-        # add nodes
-        for cfg in self._cfgs:
-            graph.add_node(cfg.start_address, address=cfg.start_address)
+    def _build_edges(self):
+        edges = {}
 
-        graph.add_node("unknown", address="unknown")
-
-        # add edges
         for cfg in self._cfgs:
-            edges = self._edges.get(cfg.start_address, set())
+            targets = edges.setdefault(cfg.start_address, set())
 
             for bb in cfg.basic_blocks:
                 for instr in bb:
                     if instr.mnemonic == "call":
                         if isinstance(instr.operands[0], X86ImmediateOperand):
-                            target_addr = instr.operands[0].immediate
+                            targets.add(instr.operands[0].immediate)
+                        else:
+                            targets.add("unknown")
 
-                            edges.add(target_addr)
+        return edges
 
-                            graph.add_edge(cfg.start_address, target_addr, branch_type="direct")
-                        else:
-                            edges.add("unknown")
+    def _get_graph(self):
+        if self._graph is None:
+            self._graph = self._build_graph()
+
+        return self._graph
 
-                            graph.add_edge(cfg.start_address, "unknown", branch_type="indirect")
+    def _build_graph(self):
+        graph = networkx.DiGraph()
+
+        # add nodes
+        for cfg in self._cfgs:
+            graph.add_node(cfg.start_address, address=cfg.start_address)
 
-            self._edges[cfg.start_address] = edges
+        graph.add_node("unknown", address="unknown")
+
+        # add edges
+        for cfg_addr in sorted(self._edges.keys()):
+            for target_addr in self._edges[cfg_addr]:
+                branch_type = "indirect" if target_addr == "unknown" else "direct"
+
+                graph.add_edge(cfg_addr, target_addr, branch_type=branch_type)
 
         return graph
 
@@ -162,6 +172,12 @@ class CallGraph(object):
         # CFGs accessed by address
         self._cfg_by_addr = dict([(cfg.start_address, cfg) for cfg in cfgs])
 
+        # Call targets of each CFG
+        self._edges = self._build_edges()
+
+        # Call graph (networkx), built on demand.
+        self._graph = None
+
     def __iter__(self):
         for cfg in self._cfgs:
             yield cfg
@@ -228,13 +244,13 @@ class CGSimpleRenderer(CGRenderer):
 
             # add nodes
             nodes = {}
-            for cfg_addr in cf._graph.node.keys():
+            for cfg_addr in cf._get_graph().node.keys():
                 nodes[cfg_addr] = self._create_node(cfg_addr, cf)
 
                 dot_graph.add_node(nodes[cfg_addr])
 
             # add edges
-            for cfg_src_addr in cf._graph.node.keys():
+            for cfg_src_addr in cf._get_graph().node.keys():
                 for cfg_dst_addr in cf._edges.get(cfg_src_addr, []):
                     edge = self._create_edge(nodes, cfg_src_addr, cfg_dst_addr)
 
@@ -1,3 +1,4 @@
+import array
 import bisect
 import logging
 
@@ -25,27 +26,54 @@ from barf.core.binary import InvalidAddressError
 logger = logging.getLogger(__name__)
 
 
-class ControlFlowGraph(object):
+class NaturalLoop(object):
 
-    """Basic block graph representation.
+    """Natural loop representation.
     """
 
-    def __init__(self, basic_blocks, name=None):
+    def __init__(self, header, basic_blocks):
 
-        # List of basic blocks sorted by address.
-        self._basic_blocks = sorted(basic_blocks, key=lambda bb: bb.address)
+        # Header basic block (it dominates all the basic blocks of the
+        # loop).
+        self._header = header
 
-        # Basic block accessed by address
-        self._bb_by_addr = dict([(bb.address, bb) for bb in basic_blocks])
+        # Basic blocks of the loop (including the ones of nested loops).
+        self._basic_blocks = basic_blocks
 
-        # Basic block graph
-        self._graph = self._build_graph()
+        # Innermost enclosing loop.
+        self._parent = None
 
-        # List of entry basic blocks
-        self._entry_blocks = [bb.address for bb in basic_blocks if len(self._graph.in_edges(bb.address)) == 0]
+        # Nesting depth (outermost loops have depth 1).
+        self._depth = 1
 
-        # List of exit basic blocks
-        self._exit_blocks = [bb.address for bb in basic_blocks if len(self._graph.out_edges(bb.address)) == 0]
+    @property
+    def header(self):
+        return self._header
+
+    @property
+    def basic_blocks(self):
+        return self._basic_blocks
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def __contains__(self, bb):
+        return bb in self._basic_blocks
+
+
+class ControlFlowGraph(object):
+
+    """Basic block graph representation.
+    """
+
+    def __init__(self, basic_blocks, name=None):
+
+        self._build(basic_blocks)
 
         self._name = name
 
@@ -88,25 +116,113 @@ class ControlFlowGraph(object):
 
         return max(ends)
 
+    def successors(self, address):
+        """Return the basic blocks a basic block branches to (within
+        the graph).
+        """
+        bb_id = self._bb_ids[address]
+
+        return [self._basic_blocks[i] for i in self._succs[self._succs_idx[bb_id]:self._succs_idx[bb_id + 1]]]
+
+    def predecessors(self, address):
+        """Return the basic blocks that branch to a basic block.
+        """
+        bb_id = self._bb_ids[address]
+
+        return [self._basic_blocks[i] for i in self._preds[self._preds_idx[bb_id]:self._preds_idx[bb_id + 1]]]
+
     def all_simple_bb_paths(self, start_address, end_address):
         """Return a list of path between start and end address.
         """
         bb_start = self._find_basic_block(start_address)
         bb_end = self._find_basic_block(end_address)
 
-        paths = networkx.all_simple_paths(self._graph, source=bb_start.address, target=bb_end.address)
+        paths = networkx.all_simple_paths(self._get_graph(), source=bb_start.address, target=bb_end.address)
 
         return (map(lambda addr: self._bb_by_addr[addr], path) for path in paths)
 
+    def reverse_post_order(self):
+        """Return the basic blocks (reachable from the entry basic
+        blocks) in reverse post-order.
+        """
+        if 'rpo' not in self._analyses:
+            post_order = self._dfs_post_order(self._get_roots(), self._get_succs)
+
+            self._analyses['rpo'] = [self._basic_blocks[i] for i in reversed(post_order)]
+
+        return self._analyses['rpo']
+
+    def immediate_dominator(self, address):
+        """Return the immediate dominator of a basic block (None for
+        entry and unreachable basic blocks).
+        """
+        if 'idom' not in self._analyses:
+            self._analyses['idom'] = self._compute_dominators(post=False)
+
+        return self._get_bb_by_id(self._analyses['idom'][self._bb_ids[address]])
+
+    def immediate_post_dominator(self, address):
+        """Return the immediate post-dominator of a basic block (None
+        for exit basic blocks and basic blocks that do not reach one).
+        """
+        if 'ipdom' not in self._analyses:
+            self._analyses['ipdom'] = self._compute_dominators(post=True)
+
+        return self._get_bb_by_id(self._analyses['ipdom'][self._bb_ids[address]])
+
+    def dominates(self, address_a, address_b):
+        """Check whether basic block a dominates basic block b.
+        """
+        return self._dominates(address_a, address_b, self.immediate_dominator)
+
+    def post_dominates(self, address_a, address_b):
+        """Check whether basic block a post-dominates basic block b.
+        """
+        return self._dominates(address_a, address_b, self.immediate_post_dominator)
+
+    def natural_loops(self):
+        """Return the natural loops of the graph, sorted from the
+        outermost to the innermost.
+        """
+        if 'loops' not in self._analyses:
+            self._analyses['loops'] = self._compute_natural_loops()
+
+        return self._analyses['loops']
+
+    def loop_depth(self, address):
+        """Return the loop nesting depth of a basic block (0 if it is
+        not in a loop).
+        """
+        if 'loop_depth' not in self._analyses:
+            depths = {}
+
+            # Loops are sorted from the outermost to the innermost.
+            for loop in self.natural_loops():
+                for bb in loop.basic_blocks:
+                    depths[bb.address] = loop.depth
+
+            self._analyses['loop_depth'] = depths
+
+        return self._analyses['loop_depth'].get(address, 0)
+
+    def strongly_connected_components(self):
+        """Return the strongly connected components of the graph (as
+        lists of basic blocks) in reverse topological order.
+        """
+        if 'sccs' not in self._analyses:
+            sccs = self._compute_sccs()
+
+            self._analyses['sccs'] = [[self._basic_blocks[i] for i in scc] for scc in sccs]
+
+        return self._analyses['sccs']
+
     def find_basic_block(self, start):
-        bb_rv = None
+        index = bisect.bisect_left(self._bb_addrs, start)
 
-        for bb in self._basic_blocks:
-            if bb.address == start:
-                bb_rv = bb
-                break
+        if index < len(self._bb_addrs) and self._bb_addrs[index] == start:
+            return self._basic_blocks[index]
 
-        return bb_rv
+        return None
 
     def save(self, filename, print_ir=False, format='dot', options=None):
         # renderer = CFGSimpleRenderer()
@@ -116,6 +232,294 @@ class ControlFlowGraph(object):
 
     # Auxiliary functions
     # ======================================================================== #
+    def _build(self, basic_blocks):
+        # List of basic blocks sorted by address. The position of a
+        # basic block in the list is its id.
+        self._basic_blocks = sorted(basic_blocks, key=lambda bb: bb.address)
+
+        # Start addresses of the basic blocks (sorted).
+        self._bb_addrs = [bb.address for bb in self._basic_blocks]
+
+        # Basic block accessed by address
+        self._bb_by_addr = dict([(bb.address, bb) for bb in self._basic_blocks])
+
+        # Basic block id accessed by address
+        self._bb_ids = dict([(bb.address, i) for i, bb in enumerate(self._basic_blocks)])
+
+        # Successors and predecessors of each basic block (in CSR
+        # format), that is, the successors of basic block i are
+        # succs[succs_idx[i]:succs_idx[i+1]]. Only branches to basic
+        # blocks of the graph are included.
+        self._succs_idx, self._succs, self._preds_idx, self._preds = self._build_adjacency()
+
+        # List of entry basic blocks
+        self._entry_blocks = [bb.address for i, bb in enumerate(self._basic_blocks)
+                              if self._preds_idx[i] == self._preds_idx[i + 1]]
+
+        # List of exit basic blocks
+        self._exit_blocks = [bb.address for bb in self._basic_blocks if len(bb.branches) == 0]
+
+        # Basic block graph (networkx), built on demand.
+        self._graph = None
+
+        # Results of the analyses (dominators, loops, etc.), computed on
+        # demand.
+        self._analyses = {}
+
+    def _build_adjacency(self):
+        bbs_count = len(self._basic_blocks)
+
+        succs_idx = array.array('l', [0])
+        succs = array.array('l')
+
+        preds_count = [0] * bbs_count
+
+        for bb in self._basic_blocks:
+            dsts = set([self._bb_ids[addr] for addr, _ in bb.branches if addr in self._bb_ids])
+
+            for dst in sorted(dsts):
+                succs.append(dst)
+
+                preds_count[dst] += 1
+
+            succs_idx.append(len(succs))
+
+        preds_idx = array.array('l', [0])
+
+        for count in preds_count:
+            preds_idx.append(preds_idx[-1] + count)
+
+        preds = array.array('l', [0] * len(succs))
+        preds_next = array.array('l', preds_idx[:-1])
+
+        for src in xrange(bbs_count):
+            for dst in succs[succs_idx[src]:succs_idx[src + 1]]:
+                preds[preds_next[dst]] = src
+
+                preds_next[dst] += 1
+
+        return succs_idx, succs, preds_idx, preds
+
+    def _get_succs(self, bb_id):
+        return self._succs[self._succs_idx[bb_id]:self._succs_idx[bb_id + 1]]
+
+    def _get_preds(self, bb_id):
+        return self._preds[self._preds_idx[bb_id]:self._preds_idx[bb_id + 1]]
+
+    def _get_bb_by_id(self, bb_id):
+        return self._basic_blocks[bb_id] if bb_id is not None else None
+
+    def _get_roots(self):
+        roots = [i for i, bb in enumerate(self._basic_blocks)
+                 if bb.is_entry or self._preds_idx[i] == self._preds_idx[i + 1]]
+
+        # The entry basic block can be the header of a loop.
+        if not roots and self._basic_blocks:
+            roots = [0]
+
+        return roots
+
+    def _get_leaves(self):
+        return [i for i in xrange(len(self._basic_blocks)) if self._succs_idx[i] == self._succs_idx[i + 1]]
+
+    def _dfs_post_order(self, roots, get_succs):
+        visited = set()
+        post_order = []
+
+        for root in roots:
+            if root in visited:
+                continue
+
+            visited.add(root)
+
+            stack = [(root, iter(get_succs(root)))]
+
+            while stack:
+                node, succs = stack[-1]
+
+                for succ in succs:
+                    if succ not in visited:
+                        visited.add(succ)
+                        stack.append((succ, iter(get_succs(succ))))
+                        break
+                else:
+                    stack.pop()
+                    post_order.append(node)
+
+        return post_order
+
+    def _compute_dominators(self, post):
+        """Compute immediate (post-)dominators using the algorithm of
+        Cooper, Harvey and Kennedy. A virtual node (the root) is
+        connected to the entry (exit) basic blocks.
+        """
+        root = len(self._basic_blocks)
+
+        if not post:
+            roots = self._get_roots()
+            succs, preds = self._get_succs, self._get_preds
+        else:
+            roots = self._get_leaves()
+            succs, preds = self._get_preds, self._get_succs
+
+        roots_set = set(roots)
+
+        get_succs = lambda i: roots if i == root else succs(i)
+        get_preds = lambda i: list(preds(i)) + ([root] if i in roots_set else [])
+
+        post_order = self._dfs_post_order([root], get_succs)
+        post_order_index = dict([(node, i) for i, node in enumerate(post_order)])
+
+        idoms = {root: root}
+
+        def intersect(a, b):
+            while a != b:
+                while post_order_index[a] < post_order_index[b]:
+                    a = idoms[a]
+
+                while post_order_index[b] < post_order_index[a]:
+                    b = idoms[b]
+
+            return a
+
+        changed = True
+
+        while changed:
+            changed = False
+
+            for node in reversed(post_order[:-1]):
+                idom = None
+
+                for pred in get_preds(node):
+                    if pred in idoms:
+                        idom = pred if idom is None else intersect(pred, idom)
+
+                if idoms.get(node) != idom:
+                    idoms[node] = idom
+                    changed = True
+
+        # The virtual root is not a basic block.
+        return [idoms.get(i) if idoms.get(i) != root else None for i in xrange(len(self._basic_blocks))]
+
+    def _dominates(self, address_a, address_b, get_idom):
+        bb = self._bb_by_addr[address_b]
+
+        while bb is not None:
+            if bb.address == address_a:
+                return True
+
+            bb = get_idom(bb.address)
+
+        return False
+
+    def _compute_natural_loops(self):
+        # Basic blocks of the loops by header. Back edges sharing a
+        # header are merged into a single loop.
+        loops_bbs = {}
+
+        # Unreachable basic blocks do not belong to any loop.
+        reachable = set([self._bb_ids[bb.address] for bb in self.reverse_post_order()])
+
+        for src in xrange(len(self._basic_blocks)):
+            for header in self._get_succs(src):
+                if not self.dominates(self._bb_addrs[header], self._bb_addrs[src]):
+                    continue
+
+                body = loops_bbs.setdefault(header, set([header]))
+
+                worklist = [src]
+
+                while worklist:
+                    node = worklist.pop()
+
+                    if node not in body and node in reachable:
+                        body.add(node)
+                        worklist.extend(self._get_preds(node))
+
+        # Sort loops from the outermost to the innermost.
+        headers = sorted(loops_bbs.keys(), key=lambda h: (-len(loops_bbs[h]), h))
+
+        loops = []
+        loop_by_header = {}
+
+        for header in headers:
+            loop = NaturalLoop(self._basic_blocks[header], [self._basic_blocks[i] for i in sorted(loops_bbs[header])])
+
+            # The parent is the smallest enclosing loop.
+            for parent_header in reversed(headers[:len(loops)]):
+                if header in loops_bbs[parent_header]:
+                    loop._parent = loop_by_header[parent_header]
+                    loop._depth = loop._parent.depth + 1
+                    break
+
+            loops.append(loop)
+            loop_by_header[header] = loop
+
+        return loops
+
+    def _compute_sccs(self):
+        """Compute strongly connected components using (an iterative
+        version of) Tarjan's algorithm.
+        """
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        sccs = []
+        counter = 0
+
+        for root in xrange(len(self._basic_blocks)):
+            if root in index:
+                continue
+
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            dfs_stack = [(root, iter(self._get_succs(root)))]
+
+            while dfs_stack:
+                node, succs = dfs_stack[-1]
+
+                for succ in succs:
+                    if succ not in index:
+                        index[succ] = lowlink[succ] = counter
+                        counter += 1
+                        stack.append(succ)
+                        on_stack.add(succ)
+                        dfs_stack.append((succ, iter(self._get_succs(succ))))
+                        break
+                    elif succ in on_stack:
+                        lowlink[node] = min(lowlink[node], index[succ])
+                else:
+                    dfs_stack.pop()
+
+                    if dfs_stack:
+                        parent = dfs_stack[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                    if lowlink[node] == index[node]:
+                        scc = []
+
+                        while True:
+                            member = stack.pop()
+                            on_stack.remove(member)
+                            scc.append(member)
+
+                            if member == node:
+                                break
+
+                        sccs.append(sorted(scc))
+
+        return sccs
+
+    def _get_graph(self):
+        if self._graph is None:
+            self._graph = self._build_graph()
+
+        return self._graph
+
     def _build_graph(self):
         graph = networkx.DiGraph()
 
@@ -131,14 +535,12 @@ class ControlFlowGraph(object):
         return graph
 
     def _find_basic_block(self, address):
-        bb_rv = None
+        index = bisect.bisect_right(self._bb_addrs, address) - 1
 
-        for bb in self._basic_blocks:
-            if bb.address <= address <= bb.end_address:
-                bb_rv = bb
-                break
+        if index >= 0 and address <= self._basic_blocks[index].end_address:
+            return self._basic_blocks[index]
 
-        return bb_rv
+        return None
 
     def __getstate__(self):
         state = {
@@ -148,27 +550,12 @@ class ControlFlowGraph(object):
         return state
 
     def __setstate__(self, state):
-        basic_blocks = state['_basic_blocks']
-
-        # List of basic blocks sorted by address.
-        self._basic_blocks = sorted(basic_blocks, key=lambda bb: bb.address)
-
-        # Basic block accessed by address
-        self._bb_by_addr = dict([(bb.address, bb) for bb in basic_blocks])
-
-        # Basic block graph
-        self._graph = self._build_graph()
-
-        # List of entry basic blocks
-        self._entry_blocks = [bb.address for bb in basic_blocks if len(self._graph.in_edges(bb.address)) == 0]
-
-        # List of exit basic blocks
-        self._exit_blocks = [bb.address for bb in basic_blocks if len(self._graph.out_edges(bb.address)) == 0]
+        self._build(state['_basic_blocks'])
 
 
 class CFGRecover(object):
 
-    def __init__(self, disassembler, memory, translator, arch_info):
+    def __init__(self, disassembler, memory, translator, arch_info, instr_cache=None):
 
         # An instance of a disassembler.
         self._disasm = disassembler
@@ -182,30 +569,52 @@ class CFGRecover(object):
         # Architecture information of the binary.
         self._arch_info = arch_info
 
-    def build(self, start, end, symbols=None):
+        # Decoded instructions (address -> instruction), shared by all
+        # the functions of the binary (and, optionally, by several
+        # recovery strategies).
+        self._instr_cache = instr_cache if instr_cache is not None else {}
+
+    @property
+    def instr_cache(self):
+        return self._instr_cache
+
+    def build(self, start, end, symbols=None, translate=True):
         """Return the list of basic blocks.
 
         :int start: Start address of the disassembling process.
         :int end: End address of the disassembling process.
+        :bool translate: Whether instructions are translated to REIL
+            (lazily, on first access to their IR) or not at all.
 
         """
         symbols = {} if not symbols else symbols
 
         # First pass: Recover BBs.
-        bbs = self._recover_bbs(start, end, symbols)
+        bbs = self._recover_bbs(start, end, symbols, translate)
 
         # Second pass: Split overlapping basic blocks introduced by back edges.
-        bbs = self._split_bbs(bbs, symbols)
+        bbs = self._split_bbs(bbs, symbols, translate)
 
         # Third pass: Extract call targets for further analysis.
         call_targets = self._extract_call_targets(bbs)
 
         return bbs, call_targets
 
-    def _recover_bbs(self, start, end, symbols):
+    def disassemble_instr(self, address, end, translate=True):
+        """Return the instruction at a given address.
+
+        :int address: Address of the instruction.
+        :int end: Address where the code (at most) ends.
+        :bool translate: Whether the instruction is translated to REIL
+            (lazily, on first access to its IR) or not.
+
+        """
+        return self._disassemble_instr(address, end, translate)
+
+    def _recover_bbs(self, start, end, symbols, translate):
         raise NotImplementedError()
 
-    def _split_bbs(self, bbs, symbols):
+    def _split_bbs(self, bbs, symbols, translate):
         bbs.sort(key=lambda x: x.address)
         bbs_addrs = [bb.address for bb in bbs]
 
@@ -219,7 +628,7 @@ class CFGRecover(object):
 
             for bb2 in bbs[lower:upper]:
                 if bb1.contains(bb2.address) and bb1 != bb2:
-                    bb_lower, bb_upper = self._split_bb(bb1, bb2.address, symbols)
+                    bb_lower, bb_upper = self._split_bb(bb1, bb2.address, symbols, translate)
 
                     if not bb_upper.empty() and bb_upper not in bbs_new:
                         bbs_new += [bb_upper]
@@ -248,30 +657,47 @@ class CFGRecover(object):
 
         return call_targets
 
-    def _split_bb(self, bb, address, symbols):
-        bb_upper_half = self._disassemble_bb(bb.start_address, address, symbols)
-        bb_lower_half = self._disassemble_bb(address, bb.end_address, symbols)
+    def _split_bb(self, bb, address, symbols, translate):
+        instrs_addrs = [instr.address for instr in bb.instrs]
+
+        # The split address is not aligned to an instruction of the
+        # basic block (overlapping instructions), disassemble it again.
+        if address not in instrs_addrs:
+            bb_upper_half = self._disassemble_bb(bb.start_address, address, symbols, translate)
+            bb_lower_half = self._disassemble_bb(address, bb.end_address + 0x1, symbols, translate)
+
+            bb_upper_half.direct_branch = address
 
+            return bb_lower_half, bb_upper_half
+
+        index = instrs_addrs.index(address)
+
+        bb_upper_half = BasicBlock()
+        bb_upper_half.instrs.extend(bb.instrs[:index])
+        bb_upper_half.is_entry = bb.is_entry
         bb_upper_half.direct_branch = address
 
+        bb_lower_half = BasicBlock()
+        bb_lower_half.instrs.extend(bb.instrs[index:])
+        bb_lower_half.is_exit = bb.is_exit
+        bb_lower_half.taken_branch = bb.taken_branch
+        bb_lower_half.not_taken_branch = bb.not_taken_branch
+        bb_lower_half.direct_branch = bb.direct_branch
+
         return bb_lower_half, bb_upper_half
 
-    def _disassemble_bb(self, start, end, symbols):
+    def _disassemble_bb(self, start, end, symbols, translate):
         bb = BasicBlock()
         addr = start
         taken, not_taken, direct = None, None, None
 
         while addr < end:
             try:
-                data_end = addr + self._arch_info.max_instruction_size
-                data_chunk = self._memory[addr:min(data_end, end)]
-                asm = self._disasm.disassemble(data_chunk, addr)
+                asm = self._disassemble_instr(addr, end, translate)
             except (DisassemblerError, InvalidAddressError, InvalidDisassemblerData):
                 logger.warn("Error while disassembling @ {:#x}".format(addr), exc_info=True)
                 break
 
-            asm.ir_instrs = self._translator.translate(asm)
-
             bb.instrs.append(asm)
 
             # If it is a RET or HALT instruction, break.
@@ -313,13 +739,34 @@ class CFGRecover(object):
 
         return bb
 
+    def _disassemble_instr(self, address, end, translate):
+        asm = self._instr_cache.get(address, None)
+
+        # A cached instruction is valid as long as it does not go beyond
+        # the end address.
+        if not asm or address + asm.size > end:
+            data_end = address + self._arch_info.max_instruction_size
+            data_chunk = self._memory[address:min(data_end, end)]
+
+            asm = self._disasm.disassemble(data_chunk, address)
+
+            # Decoding does not depend on the bytes after the instruction,
+            # so it can be cached even if the chunk was truncated.
+            self._instr_cache[address] = asm
+
+        # Translation is deferred until the IR is actually needed.
+        if translate and not asm.ir_translator:
+            asm.ir_translator = self._translator
+
+        return asm
+
 
 class RecursiveDescent(CFGRecover):
 
-    def __init__(self, disassembler, memory, translator, arch_info):
-        super(RecursiveDescent, self).__init__(disassembler, memory, translator, arch_info)
+    def __init__(self, disassembler, memory, translator, arch_info, instr_cache=None):
+        super(RecursiveDescent, self).__init__(disassembler, memory, translator, arch_info, instr_cache)
 
-    def _recover_bbs(self, start, end, symbols):
+    def _recover_bbs(self, start, end, symbols, translate):
         bbs = []
         addrs_to_process = Queue()
         addrs_processed = set()
@@ -335,7 +782,7 @@ class RecursiveDescent(CFGRecover):
             if addr in addrs_processed or not start <= addr <= end:
                 continue
 
-            bb = self._disassemble_bb(addr, end + 0x1, symbols)
+            bb = self._disassemble_bb(addr, end + 0x1, symbols, translate)
 
             if bb.empty():
                 continue
@@ -361,10 +808,10 @@ class RecursiveDescent(CFGRecover):
 
 class LinearSweep(CFGRecover):
 
-    def __init__(self, disassembler, memory, translator, arch_info):
-        super(LinearSweep, self).__init__(disassembler, memory, translator, arch_info)
+    def __init__(self, disassembler, memory, translator, arch_info, instr_cache=None):
+        super(LinearSweep, self).__init__(disassembler, memory, translator, arch_info, instr_cache)
 
-    def _recover_bbs(self, start, end, symbols):
+    def _recover_bbs(self, start, end, symbols, translate):
         bbs = []
         addrs_to_process = Queue()
         addrs_processed = set()
@@ -380,7 +827,7 @@ class LinearSweep(CFGRecover):
             if addr in addrs_processed or not start <= addr <= end:
                 continue
 
-            bb = self._disassemble_bb(addr, end + 0x1, symbols)
+            bb = self._disassemble_bb(addr, end + 0x1, symbols, translate)
 
             if bb.empty():
                 continue
@@ -420,8 +867,11 @@ class CFGRecoverer(object):
     def __init__(self, strategy):
         self.strategy = strategy
 
-    def build(self, start, end=None, symbols=None):
-        return self.strategy.build(start, end, symbols)
+    def build(self, start, end=None, symbols=None, translate=True):
+        return self.strategy.build(start, end, symbols, translate)
+
+    def disassemble_instr(self, address, end, translate=True):
+        return self.strategy.disassemble_instr(address, end, translate)
 
 
 class CFGRenderer(object):
@@ -98,12 +98,53 @@ class ArchitectureInformation(object):
 class AssemblyInstruction(object):
 
     def __init__(self):
-        self._ir_instrs = []
+        self._ir_instrs = None
+        self._ir_translator = None
 
     @property
     def ir_instrs(self):
+        """Get IR representation of the instruction.
+
+        It is translated on first access if a translator was set.
+        """
+        if self._ir_instrs is None:
+            if self._ir_translator is None:
+                return []
+
+            # NOTE: The translator is detached first, as translation copies
+            # the instruction.
+            translator, self._ir_translator = self._ir_translator, None
+
+            self._ir_instrs = translator.translate(self)
+
         return self._ir_instrs
 
     @ir_instrs.setter
     def ir_instrs(self, value):
         self._ir_instrs = value
+        self._ir_translator = None
+
+    @property
+    def ir_translator(self):
+        """Get the translator used to lazily compute the IR representation.
+        """
+        return self._ir_translator
+
+    @ir_translator.setter
+    def ir_translator(self, value):
+        """Set the translator used to lazily compute the IR representation.
+        """
+        self._ir_translator = value
+
+    def __getstate__(self):
+        # NOTE: The translator is not pickled, so pending IR is translated
+        # beforehand.
+        state = {
+            '_ir_instrs': self.ir_instrs if self._ir_translator is not None else self._ir_instrs,
+        }
+
+        return state
+
+    def __setstate__(self, state):
+        self._ir_instrs = state['_ir_instrs']
+        self._ir_translator = None
@@ -277,11 +277,12 @@ class ArmArchitectureInformation(ArchitectureInformation):
     def instr_is_ret(self, instruction):
         is_ret = False
 
-        # ARM: "POP reg, {reg*, pc}" instr.
-        if instruction.mnemonic == "pop" and \
-           ("pc" in str(instruction.operands[1]) or
-           "r15" in str(instruction.operands[1])):
-            is_ret = True
+        # ARM: "POP {reg*, pc}" instr.
+        if instruction.mnemonic == "pop":
+            for oprnd in instruction.operands:
+                if isinstance(oprnd, ArmRegisterListOperand) and \
+                   ("pc" in str(oprnd) or "r15" in str(oprnd)):
+                    is_ret = True
 
         # ARM: "LDR pc, *" instr.
         if instruction.mnemonic == "ldr" and \
@@ -509,6 +510,38 @@ class ArmInstruction(AssemblyInstruction):
     def prefix(self):
         return ""
 
+    def __getstate__(self):
+        state = super(ArmInstruction, self).__getstate__()
+
+        state.update({
+            '_orig_instr': self._orig_instr,
+            '_mnemonic': self._mnemonic,
+            '_operands': self._operands,
+            '_bytes': self._bytes,
+            '_size': self._size,
+            '_address': self._address,
+            '_arch_mode': self._arch_mode,
+            '_condition_code': self._condition_code,
+            '_update_flags': self._update_flags,
+            '_ldm_stm_addr_mode': self._ldm_stm_addr_mode,
+        })
+
+        return state
+
+    def __setstate__(self, state):
+        super(ArmInstruction, self).__setstate__(state)
+
+        self._orig_instr = state['_orig_instr']
+        self._mnemonic = state['_mnemonic']
+        self._operands = state['_operands']
+        self._bytes = state['_bytes']
+        self._size = state['_size']
+        self._address = state['_address']
+        self._arch_mode = state['_arch_mode']
+        self._condition_code = state['_condition_code']
+        self._update_flags = state['_update_flags']
+        self._ldm_stm_addr_mode = state['_ldm_stm_addr_mode']
+
 
 class ArmOperand(object):
     """Representation of ARM operand."""
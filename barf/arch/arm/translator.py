@@ -55,6 +55,7 @@ from barf.arch.arm import ArmRegisterListOperand
 from barf.arch.arm import ArmRegisterOperand
 from barf.arch.arm import ArmShiftedRegisterOperand
 from barf.arch.translator import TranslationBuilder
+from barf.arch.translator import TranslationCache
 from barf.arch.translator import Translator
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilRegisterOperand
@@ -63,6 +64,14 @@ from barf.utils.utils import VariableNamer
 
 logger = logging.getLogger(__name__)
 
+branch_mnemonics = [
+    "b", "bl", "bx", "blx", "bne", "beq", "bpl", "ble", "bcs", "bhs", "blt",
+    "bge", "bhi", "blo", "bls",
+]
+
+# Translation templates shared among translators.
+translation_cache = TranslationCache()
+
 
 class ArmTranslationBuilder(TranslationBuilder):
 
@@ -228,7 +237,7 @@ class ArmTranslator(Translator):
 
     """ARM to IR Translator."""
 
-    def __init__(self, architecture_mode=ARCH_ARM_MODE_THUMB):
+    def __init__(self, architecture_mode=ARCH_ARM_MODE_THUMB, translation_cache=translation_cache):
         super(ArmTranslator, self).__init__()
 
         # Set *Architecture Mode*. The translation of each instruction
@@ -258,6 +267,10 @@ class ArmTranslator(Translator):
 
             self._ws = ReilImmediateOperand(4, 32)      # word size
 
+        # Translation templates of already seen instruction encodings
+        # (None to disable it).
+        self._translation_cache = translation_cache
+
     def translate(self, instruction):
         """Return IR representation of an instruction.
         """
@@ -287,22 +300,30 @@ class ArmTranslator(Translator):
         :param instruction: a arm instruction
         :type instruction: ArmInstruction
         """
+        # TODO: Improve this.
+        if instruction.mnemonic in branch_mnemonics and instruction.condition_code is None:
+            instruction.condition_code = ARM_COND_CODE_AL  # TODO: unify translations
+
+        if self._translation_cache is None or not instruction.bytes:
+            return self.__translate_instruction(instruction)
+
+        relative = self.__is_address_relative(instruction)
+
+        return self._translation_cache.translate(self._arch_mode, instruction, relative,
+                                                 self.__translate_instruction, self._ir_name_generator)
 
+    def __translate_instruction(self, instruction):
+        """Translate a arm instruction into REIL language (bypassing the
+        translation cache).
+        """
         # Retrieve translation function.
         mnemonic = instruction.mnemonic
 
         tb = ArmTranslationBuilder(self._ir_name_generator, self._arch_mode)
 
-        # TODO: Improve this.
-        if instruction.mnemonic in ["b", "bl", "bx", "blx", "bne", "beq", "bpl",
-                                    "ble", "bcs", "bhs", "blt", "bge", "bhi",
-                                    "blo", "bls"]:
-            if instruction.condition_code is None:
-                instruction.condition_code = ARM_COND_CODE_AL  # TODO: unify translations
-        else:
-            # Pre-processing: evaluate flags
-            if instruction.condition_code is not None:
-                self._evaluate_condition_code(tb, instruction)
+        # Pre-processing: evaluate flags
+        if instruction.mnemonic not in branch_mnemonics and instruction.condition_code is not None:
+            self._evaluate_condition_code(tb, instruction)
 
         # Translate instruction.
         if mnemonic in translators.dispatcher:
@@ -312,6 +333,15 @@ class ArmTranslator(Translator):
 
         return tb.instanciate(instruction.address)
 
+    def __is_address_relative(self, instruction):
+        """Return whether the immediate operands of an instruction are
+        encoded relative to its address.
+        """
+        if instruction.mnemonic not in branch_mnemonics:
+            return False
+
+        return any(isinstance(oprnd, ArmImmediateOperand) for oprnd in instruction.operands)
+
     def __log_not_supported_instruction(self, instruction, reason="unknown"):
         bytes_str = " ".join("%02x" % ord(b) for b in instruction.bytes)
 
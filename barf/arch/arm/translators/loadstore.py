@@ -22,6 +22,8 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import copy
+
 from barf.arch.arm import ARM_LDM_STM_DA
 from barf.arch.arm import ARM_LDM_STM_DB
 from barf.arch.arm import ARM_LDM_STM_FD
@@ -216,6 +218,10 @@ def _translate_push_pop(self, tb, instruction, translate_fn):
     # (and write-back) Instructions are modified to adapt it to the
     # LDM/STM interface
 
+    # NOTE: A copy is modified, instructions are not changed by their
+    # translation.
+    instruction = copy.copy(instruction)
+
     sp_name = "r13"  # TODO: Use self._sp
     sp_size = instruction.operands[0].reg_list[0][0].size  # Infer it from the registers list
     sp_reg = ArmRegisterOperand(sp_name, sp_size)
@@ -31,7 +31,6 @@ from barf.arch import ARCH_X86_MODE_32
 from barf.arch import ARCH_X86_MODE_64
 from barf.arch.arm import ArmArchitectureInformation
 from barf.arch.x86 import X86ArchitectureInformation
-from barf.arch.x86.translator import X86Translator
 from barf.core.reil import ReilMnemonic
 from barf.core.reil.container import ReilContainer
 from barf.core.reil.container import ReilContainerInvalidAddressError
@@ -64,7 +63,7 @@ class InstructionNotImplemented(Exception):
 
 class Emulator(object):
 
-    def __init__(self, arch_info, ir_emulator, ir_translator, disassembler):
+    def __init__(self, arch_info, ir_emulator, ir_translator, disassembler, separate_temporaries=False):
         self.arch_info = arch_info
         self._arch_mode = self.arch_info.architecture_mode
         self.ir_emulator = ir_emulator
@@ -102,6 +101,15 @@ class Emulator(object):
 
         self.__instr_handler_post = None, None
 
+        # Translations of the instructions run by *execute*, by address.
+        self.__execution_cache = ExecutionCache()
+
+        # Optionally, keep temporal registers apart from the native ones
+        # (NOTE: This changes the register layout of the given REIL
+        # emulator).
+        if separate_temporaries:
+            self.ir_emulator.cpu.separate_temporaries = True
+
         self.__set_default_handlers()
 
     def set_registers(self, registers):
@@ -151,6 +159,9 @@ class Emulator(object):
         ip = to_reil_address(asm_instr.address)
         next_addr = None
 
+        # Track only the registers accessed by this instruction.
+        self.ir_emulator.cpu.clear_register_tracking()
+
         while ip:
             # Fetch instruction.
             try:
@@ -168,30 +179,33 @@ class Emulator(object):
             # Update instruction pointer.
             ip = next_ip if next_ip else instr_container.get_next_address(ip)
 
-        del instr_container
-
         # Execute post instruction handlers
         handler_fn_post, handler_param_post = self.__instr_handler_post
         handler_fn_post(self, asm_instr, handler_param_post)
 
         # delete temporal registers
-        regs = self.ir_emulator.registers.keys()
-
-        for r in regs:
-            if r.startswith("t"):
-                del self.ir_emulator.registers[r]
+        self.ir_emulator.cpu.clear_temporaries()
 
         return next_addr if next_addr else asm_instr.address + asm_instr.size
 
     def __translate(self, asm_instr):
-        reil_translator = X86Translator(self.arch_info.architecture_mode)
+        try:
+            asm_instr_cached, instr_container = self.__execution_cache.retrieve(asm_instr.address)
 
-        # Create ReilContainer
-        instr_container = ReilContainer()
-        instr_seq = ReilSequence()
-        for reil_instr in reil_translator.translate(asm_instr):
-            instr_seq.append(reil_instr)
-        instr_container.add(instr_seq)
+            # Check the instruction has not changed (self modifying
+            # code). Instructions without encoding are compared
+            # operand-wise.
+            if asm_instr_cached.bytes == asm_instr.bytes and \
+                    (asm_instr.bytes or asm_instr_cached == asm_instr):
+                return instr_container
+
+            self.__execution_cache.remove(asm_instr.address)
+        except InvalidAddressError:
+            pass
+
+        instr_container = self.__build_reil_container(asm_instr)
+
+        self.__execution_cache.add(asm_instr.address, asm_instr, instr_container)
 
         return instr_container
 
@@ -276,6 +290,8 @@ class Emulator(object):
     def __process_reil_container(self, container, ip):
         next_addr = None
 
+        self.ir_emulator.cpu.clear_register_tracking()
+
         while ip:
             # Fetch instruction.
             try:
@@ -290,12 +306,7 @@ class Emulator(object):
             ip = next_ip if next_ip else container.get_next_address(ip)
 
         # Delete temporal registers.
-        regs = self.ir_emulator.registers.keys()
-
-        for r in regs:
-            # TODO Remove None test.
-            if r and r.startswith("t"):
-                del self.ir_emulator.registers[r]
+        self.ir_emulator.cpu.clear_temporaries()
 
         return next_addr
 
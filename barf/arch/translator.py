@@ -22,11 +22,23 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import copy
+
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilInstruction
 from barf.core.reil import ReilMnemonic
 from barf.core.reil import ReilRegisterOperand
 from barf.core.reil.builder import ReilBuilder
+from barf.core.reil.helpers import is_temporal_register
+
+# Relocation kinds of a translation template operand.
+TEMPLATE_FIXED = 0
+TEMPLATE_TEMPORAL = 1
+TEMPLATE_RELATIVE = 2
+
+# Address displacement used to find address dependent operands (it has
+# a non-zero value in every byte).
+TEMPLATE_DISPLACEMENT = 0x01010101
 
 
 class Label(object):
@@ -52,6 +64,221 @@ class Translator(object):
         raise NotImplementedError()
 
 
+class TranslationTemplate(object):
+
+    """Relocatable REIL translation of an instruction. Temporal
+    registers are renumbered and address dependent immediates (REIL
+    addresses, return addresses, jump targets) are patched on
+    instantiation.
+    """
+
+    def __init__(self, instrs):
+        # A list of (mnemonic, index, operands, patches) tuples. Operands
+        # that have to be instantiated are None and described by a
+        # (position, kind, value) patch. Value is the (number, size)
+        # pair of a temporal register or the (offset, shift, size)
+        # tuple of an address dependent immediate.
+        self._instrs = instrs
+
+    @staticmethod
+    def build(instrs, address, instrs_displaced, address_displaced):
+        """Build a template from two translations of the same
+        instruction at different addresses. Return None if they differ
+        in something else than temporal registers and address dependent
+        immediates.
+        """
+        if len(instrs) != len(instrs_displaced):
+            return None
+
+        displacement = address_displaced - address
+
+        temps = {}
+        temps_displaced = {}
+
+        template_instrs = []
+
+        for instr, instr_displaced in zip(instrs, instrs_displaced):
+            index = instr.address & 0xff
+
+            if instr.mnemonic != instr_displaced.mnemonic or \
+                    index != instr_displaced.address & 0xff:
+                return None
+
+            oprnds = []
+
+            for oprnd, oprnd_displaced in zip(instr.operands, instr_displaced.operands):
+                if type(oprnd) is not type(oprnd_displaced) or oprnd.size != oprnd_displaced.size:
+                    return None
+
+                if isinstance(oprnd, ReilRegisterOperand) and is_temporal_register(oprnd.name):
+                    number = temps.setdefault(oprnd.name, len(temps))
+
+                    if temps_displaced.setdefault(oprnd_displaced.name, number) != number:
+                        return None
+
+                    oprnds.append((TEMPLATE_TEMPORAL, (number, oprnd.size)))
+                elif isinstance(oprnd, ReilImmediateOperand):
+                    if oprnd.immediate == oprnd_displaced.immediate:
+                        oprnds.append((TEMPLATE_FIXED, oprnd))
+
+                        continue
+
+                    mask = 2**oprnd.size - 1
+                    diff = (oprnd_displaced.immediate - oprnd.immediate) & mask
+
+                    for shift in [0, 8]:
+                        if diff == (displacement << shift) & mask:
+                            offset = oprnd.immediate - (address << shift)
+
+                            oprnds.append((TEMPLATE_RELATIVE, (offset, shift, oprnd.size)))
+
+                            break
+                    else:
+                        return None
+                elif oprnd == oprnd_displaced:
+                    oprnds.append((TEMPLATE_FIXED, oprnd))
+                else:
+                    return None
+
+            fixed = [value if kind == TEMPLATE_FIXED else None for kind, value in oprnds]
+            patches = [(pos, kind, value) for pos, (kind, value) in enumerate(oprnds) if kind != TEMPLATE_FIXED]
+
+            template_instrs.append((instr.mnemonic, index, fixed, patches))
+
+        return TranslationTemplate(template_instrs)
+
+    def instanciate(self, address, ir_name_generator):
+        """Return the translation of the instruction at the given
+        address.
+        """
+        temps = {}
+
+        instrs = []
+
+        for mnemonic, index, fixed, patches in self._instrs:
+            oprnds = list(fixed)
+
+            for pos, kind, value in patches:
+                if kind == TEMPLATE_TEMPORAL:
+                    number, size = value
+
+                    oprnd = temps.get(number)
+
+                    if oprnd is None:
+                        oprnd = temps[number] = ReilRegisterOperand(ir_name_generator.get_next(), size)
+                else:
+                    offset, shift, size = value
+
+                    oprnd = ReilImmediateOperand((offset + (address << shift)) & (2**size - 1), size)
+
+                oprnds[pos] = oprnd
+
+            instr = ReilInstruction()
+
+            instr.mnemonic = mnemonic
+            instr.operands = oprnds
+            instr.address = address << 8 | index
+
+            instrs.append(instr)
+
+        return instrs
+
+
+class TranslationCache(object):
+
+    """Cache of translation templates indexed by architecture mode,
+    instruction encoding and whether the instruction has address
+    relative operands.
+    """
+
+    def __init__(self, max_size=0x10000):
+        # Maximum number of templates.
+        self._max_size = max_size
+
+        # Templates by key (None for instructions that cannot be
+        # relocated).
+        self._templates = {}
+
+        # Statistics.
+        self._hits = 0
+        self._misses = 0
+
+    def translate(self, architecture_mode, instruction, relative, translate_fn, ir_name_generator):
+        """Return the translation of an instruction, reusing the
+        template of a previous instruction with the same encoding if
+        available. Function `translate_fn` is used to translate an
+        instruction from scratch. If `relative` is True, the immediate
+        operands of the instruction are regarded as address relative.
+        """
+        key = (architecture_mode, instruction.bytes, relative)
+
+        template = self._templates.get(key, False)
+
+        if template:
+            self._hits += 1
+
+            return template.instanciate(instruction.address, ir_name_generator)
+
+        self._misses += 1
+
+        if template is None or len(self._templates) >= self._max_size:
+            return translate_fn(instruction)
+
+        # Translate the instruction again at a different address to
+        # find out which operands depend on it (the copy is taken
+        # first, as translation functions might modify the instruction).
+        instruction_displaced = _displace_instruction(instruction, TEMPLATE_DISPLACEMENT, relative)
+
+        instrs = translate_fn(instruction)
+        instrs_displaced = translate_fn(instruction_displaced)
+
+        self._templates[key] = TranslationTemplate.build(instrs, instruction.address,
+                                                         instrs_displaced, instruction_displaced.address)
+
+        return instrs
+
+    def clear(self):
+        """Remove all templates.
+        """
+        self._templates = {}
+
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self):
+        """Get number of translations served from a template.
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """Get number of translations done from scratch.
+        """
+        return self._misses
+
+    def __len__(self):
+        return len(self._templates)
+
+
+def _displace_instruction(instruction, displacement, relative):
+    instruction_displaced = copy.copy(instruction)
+    instruction_displaced.address = instruction.address + displacement
+
+    if relative:
+        oprnds = []
+
+        for oprnd in instruction.operands:
+            if hasattr(oprnd, "immediate"):
+                oprnd = type(oprnd)((oprnd.immediate + displacement) & (2**oprnd.size - 1), oprnd.size)
+
+            oprnds.append(oprnd)
+
+        instruction_displaced._operands = oprnds
+
+    return instruction_displaced
+
+
 class TranslationBuilder(object):
 
     def __init__(self, ir_name_generator, architecture_information):
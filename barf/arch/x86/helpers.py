@@ -48,6 +48,16 @@ def compare_contexts(context_init, x86_context, reil_context):
     return match
 
 
+def compare_registers(registers, x86_context, reil_context):
+    mask = 2**64-1
+
+    for reg in registers:
+        if (x86_context[reg] & mask) != (reil_context[reg] & mask):
+            return False
+
+    return True
+
+
 def print_contexts(context_init, x86_context, reil_context, skip=None):
     header_fmt = " {0:^12s}: {1:^16s} | {2:^16s} | {3:^16s}\n"
     header = header_fmt.format("Register", "Initial", "Expected", "Obtained")
@@ -22,6 +22,16 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import copy
+import mmap
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 def _parse_memory(accesses_string):
     accesses = {}
@@ -47,29 +57,41 @@ def _parse_registers(registers_string):
     return reg_state
 
 
+def _split_line(line):
+    tokens = [token.strip().lower() for token in line[:-1].split('|')]
+
+    assert len(tokens) in [5]
+
+    instr_addr_str, image = tokens[0].split(':')
+
+    return int(instr_addr_str, 16), image.strip(), tokens
+
+
+def _parse_entry(tokens):
+    instr_disasm, instr_encoding, reads, registers = tokens[1:5]
+
+    # Parse memory reads and writes.
+    mem_reads = _parse_memory(reads)
+
+    # Parse registers.
+    reg_state = _parse_registers(registers)
+
+    return instr_disasm, instr_encoding, mem_reads, reg_state
+
+
 def parse_trace(filename, asm_parser, start_address=None):
-    start_found = start_address is None
-    trace_index = 0
-    trace_asm_rep = None
-    fold_reps_active = False
+    return fold_trace(_read_trace(filename, asm_parser, start_address))
 
-    last_syscall = False
 
-    delay_instr = None
-    issue_asm = None
+def _read_trace(filename, asm_parser, start_address):
+    start_found = start_address is None
 
     with open(filename, "r") as f:
         for index, line in enumerate(f):
             try:
-                tokens = [token.strip().lower() for token in line[:-1].split('|')]
-
-                assert len(tokens) in [5]
+                instr_addr, image, tokens = _split_line(line)
 
                 # Check for the requested start address of the trace.
-                instr_addr_str, image = tokens[0].split(':')
-                image = image.strip()
-                instr_addr = int(instr_addr_str, 16)
-
                 if not start_found:
                     if instr_addr == start_address:
                         start_found = True
@@ -77,81 +99,93 @@ def parse_trace(filename, asm_parser, start_address=None):
                         # Skip current instruction.
                         continue
 
-                instr_disasm, instr_encoding, reads, registers = tokens[1:5]
-
-                # Parse memory reads and writes.
-                mem_reads = _parse_memory(reads)
-
-                # Parse registers.
-                reg_state = _parse_registers(registers)
+                instr_disasm, instr_encoding, mem_reads, reg_state = _parse_entry(tokens)
 
                 # Parse instruction.
                 asm = asm_parser.parse(instr_disasm)
 
                 # print("Index #{})".format(index))
 
-                if asm:
-                    asm.address = instr_addr
-                    asm.bytes = instr_encoding.decode("hex")
-                    asm.size = len(asm.bytes)
-
-                    if asm.prefix and asm.prefix.startswith("rep"):
-                        if not fold_reps_active:
-                            # print("[+] Start folding {} (#{})".format(asm, index))
-                            fold_reps_active = True
-                            trace_asm_rep = asm, image, mem_reads, reg_state
-                        else:
-                            # print("[+] Folding {} (#{})".format(asm, index))
-                            asm1, image1, mem_reads1, reg_state1 = trace_asm_rep
-                            mem_reads1.update(mem_reads)
-                            trace_asm_rep = asm1, image1, mem_reads1, reg_state1
+                if not asm:
+                    raise Exception()
 
-                        continue
-                    else:
-                        if fold_reps_active:
-                            # print("[+] Folding finished {} (#{})".format(asm, index))
-                            fold_reps_active = False
+                asm.address = instr_addr
+                asm.bytes = instr_encoding.decode("hex")
+                asm.size = len(asm.bytes)
+            except GeneratorExit:
+                return
+            except:
+                import traceback
+                print(traceback.format_exc())
+                print("[-] Error loading instruction (line: #{}): {}".format(index, line))
 
-                            delay_instr = trace_asm_rep
+                continue
 
-                        issue_asm = asm, image, mem_reads, reg_state
+            yield asm, image, mem_reads, reg_state
 
-                    if last_syscall:
-                        asm_prev, image_prev, mem_reads_prev, reg_state_prev = delay_instr
 
-                        if "eax" in reg_state:
-                            reg_state_prev["eax_next"] = reg_state["eax"]
-                        else:
-                            reg_state_prev["rax_next"] = reg_state["rax"]
+def fold_trace(entries):
+    """Fold repeated string instructions (rep prefix) and attach the
+    return value of system calls to the entries of a trace.
+    """
+    trace_asm_rep = None
+    fold_reps_active = False
 
-                        delay_instr = asm_prev, image_prev, mem_reads_prev, reg_state_prev
+    last_syscall = False
 
-                        last_syscall = False
+    delay_instr = None
+    issue_asm = None
 
-                    if asm.mnemonic in ["int", "syscall", "sysenter"]:
-                        last_syscall = True
-                        delay_instr = issue_asm
+    try:
+        for asm, image, mem_reads, reg_state in entries:
+            if asm.prefix and asm.prefix.startswith("rep"):
+                if not fold_reps_active:
+                    # print("[+] Start folding {} (#{})".format(asm, index))
+                    fold_reps_active = True
+                    trace_asm_rep = asm, image, mem_reads, reg_state
+                else:
+                    # print("[+] Folding {} (#{})".format(asm, index))
+                    asm1, image1, mem_reads1, reg_state1 = trace_asm_rep
+                    mem_reads1.update(mem_reads)
+                    trace_asm_rep = asm1, image1, mem_reads1, reg_state1
 
-                        continue
+                continue
+            else:
+                if fold_reps_active:
+                    # print("[+] Folding finished {} (#{})".format(asm, index))
+                    fold_reps_active = False
 
-                    if delay_instr:
-                        yield delay_instr
+                    delay_instr = trace_asm_rep
 
-                    delay_instr = None
+                issue_asm = asm, image, mem_reads, reg_state
 
-                    yield issue_asm
+            if last_syscall:
+                asm_prev, image_prev, mem_reads_prev, reg_state_prev = delay_instr
 
-                    issue_asm = None
+                if "eax" in reg_state:
+                    reg_state_prev["eax_next"] = reg_state["eax"]
                 else:
-                    raise Exception()
-            except GeneratorExit:
-                return
-            except:
-                import traceback
-                print(traceback.format_exc())
-                print("[-] Error loading instruction #{} (line: #{}): {}".format(trace_index, index, line))
+                    reg_state_prev["rax_next"] = reg_state["rax"]
+
+                delay_instr = asm_prev, image_prev, mem_reads_prev, reg_state_prev
+
+                last_syscall = False
+
+            if asm.mnemonic in ["int", "syscall", "sysenter"]:
+                last_syscall = True
+                delay_instr = issue_asm
+
+                continue
+
+            if delay_instr:
+                yield delay_instr
+
+            delay_instr = None
+
+            yield issue_asm
+
+            issue_asm = None
 
-    try:
         if delay_instr:
             yield delay_instr
 
@@ -161,6 +195,369 @@ def parse_trace(filename, asm_parser, start_address=None):
         return
 
 
+# Compact binary trace format
+# ============================================================================ #
+#
+# A binary trace starts with a fixed-size header (magic, version,
+# compression and offset of the tables) followed by blocks of records.
+# Each block is compressed independently and its first record holds
+# the full register state, so blocks can be decoded in isolation. The
+# image, register and instruction (encoding and disassembly) tables and
+# the block index are stored at the end of the file.
+#
+# Record layout (little endian):
+#
+#   address (u64) | instruction id (u32) | image id (u16) |
+#   register deltas (u16) | memory reads (u16) |
+#   register deltas: register id (u8), size (u8, 0 if removed), value |
+#   memory reads: address (u64), size (u16), value
+#
+
+TRACE_MAGIC = "BARFTRC\x00"
+TRACE_VERSION = 1
+
+TRACE_COMPRESSION_NONE = 0
+TRACE_COMPRESSION_GZIP = 1
+TRACE_COMPRESSION_ZSTD = 2
+
+_compression_by_name = {
+    None: TRACE_COMPRESSION_NONE,
+    "none": TRACE_COMPRESSION_NONE,
+    "gzip": TRACE_COMPRESSION_GZIP,
+    "zstd": TRACE_COMPRESSION_ZSTD,
+}
+
+_header = struct.Struct("<8sHHQ")
+_record = struct.Struct("<QIHHH")
+_register = struct.Struct("<BB")
+_memory = struct.Struct("<QH")
+_block = struct.Struct("<QIII")
+_length = struct.Struct("<I")
+
+
+class BinaryTraceError(Exception):
+    pass
+
+
+def convert_trace(src_filename, dst_filename, compression=None, block_size=4096):
+    """Convert a text trace into the compact binary format. Records are
+    grouped in blocks of `block_size` entries, which are compressed
+    with `compression` (None, 'gzip' or 'zstd').
+    """
+    if compression not in _compression_by_name:
+        raise BinaryTraceError("Unknown compression: {}".format(compression))
+
+    compression = _compression_by_name[compression]
+
+    if compression == TRACE_COMPRESSION_ZSTD and zstandard is None:
+        raise BinaryTraceError("zstd compression requires the zstandard package")
+
+    images, registers, instrs = {}, {}, {}
+
+    blocks = []
+
+    with open(dst_filename, "wb") as dst:
+        dst.write(_header.pack(TRACE_MAGIC, TRACE_VERSION, compression, 0))
+
+        records, count, reg_state_prev = [], 0, {}
+
+        with open(src_filename, "r") as src:
+            for index, line in enumerate(src):
+                # Malformed lines are skipped. Errors while packing a
+                # record (for instance, too many registers) abort the
+                # conversion.
+                try:
+                    instr_addr, image, tokens = _split_line(line)
+                    instr_disasm, instr_encoding, mem_reads, reg_state = _parse_entry(tokens)
+                    instr_bytes = instr_encoding.decode("hex")
+                except (ValueError, AssertionError, TypeError):
+                    print("[-] Error converting instruction (line: #{}): {}".format(index, line))
+
+                    continue
+
+                records.append(_pack_record(instr_addr,
+                                            _intern(instrs, (instr_bytes, instr_disasm)),
+                                            _intern(images, image),
+                                            mem_reads, reg_state, reg_state_prev, registers))
+
+                reg_state_prev = reg_state
+                count += 1
+
+                if count == block_size:
+                    blocks.append(_write_block(dst, "".join(records), count, compression))
+
+                    # Each block starts with a full register state.
+                    records, count, reg_state_prev = [], 0, {}
+
+        if count:
+            blocks.append(_write_block(dst, "".join(records), count, compression))
+
+        tables_offset = dst.tell()
+
+        _write_table(dst, [image for image, _ in sorted(images.items(), key=lambda item: item[1])])
+        _write_table(dst, [reg for reg, _ in sorted(registers.items(), key=lambda item: item[1])])
+        _write_table(dst, [encoding for (encoding, _), _ in sorted(instrs.items(), key=lambda item: item[1])])
+        _write_table(dst, [disasm for (_, disasm), _ in sorted(instrs.items(), key=lambda item: item[1])])
+
+        dst.write(_length.pack(len(blocks)))
+
+        for block in blocks:
+            dst.write(_block.pack(*block))
+
+        dst.seek(0)
+        dst.write(_header.pack(TRACE_MAGIC, TRACE_VERSION, compression, tables_offset))
+
+
+def is_binary_trace(filename):
+    """Return whether a file is a binary trace.
+    """
+    with open(filename, "rb") as f:
+        return f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+
+def parse_binary_trace(filename, asm_parser, start_address=None):
+    """Parse a binary trace. It yields the same entries as
+    `parse_trace`. Each distinct instruction is parsed only once.
+    """
+    return fold_trace(BinaryTraceReader(filename).instructions(asm_parser, start_address))
+
+
+class BinaryTraceReader(object):
+
+    """Lazy (mmap-based) reader of binary traces.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._data) < _header.size:
+            raise BinaryTraceError("Invalid binary trace")
+
+        magic, version, compression, tables_offset = _header.unpack_from(self._data, 0)
+
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise BinaryTraceError("Invalid binary trace")
+
+        if compression == TRACE_COMPRESSION_ZSTD and zstandard is None:
+            raise BinaryTraceError("zstd compression requires the zstandard package")
+
+        self._compression = compression
+
+        offset = tables_offset
+
+        self._images, offset = _read_table(self._data, offset)
+        self._registers, offset = _read_table(self._data, offset)
+        encodings, offset = _read_table(self._data, offset)
+        disasms, offset = _read_table(self._data, offset)
+
+        self._instrs = zip(encodings, disasms)
+
+        count, = _length.unpack_from(self._data, offset)
+        offset += _length.size
+
+        self._blocks = []
+
+        for _ in xrange(count):
+            self._blocks.append(_block.unpack_from(self._data, offset))
+            offset += _block.size
+
+    def entries(self, start_address=None):
+        """Return an iterator over the entries of the trace as (address,
+        image, encoding, disassembly, memory reads, registers) tuples.
+        Entries before `start_address` (if given) are skipped.
+        """
+        for address, image_id, instr_id, mem_reads, reg_state in self._records(start_address):
+            encoding, disasm = self._instrs[instr_id]
+
+            yield address, self._images[image_id], encoding, disasm, mem_reads, reg_state
+
+    def instructions(self, asm_parser, start_address=None):
+        """Return an iterator over the entries of the trace as
+        (instruction, image, memory reads, registers) tuples.
+        """
+        asm_instrs = {}
+
+        for address, image_id, instr_id, mem_reads, reg_state in self._records(start_address):
+            if instr_id not in asm_instrs:
+                encoding, disasm = self._instrs[instr_id]
+
+                asm = asm_parser.parse(disasm)
+
+                if asm:
+                    asm.bytes = encoding
+                    asm.size = len(encoding)
+                else:
+                    print("[-] Error loading instruction: {}".format(disasm))
+
+                asm_instrs[instr_id] = asm
+
+            if not asm_instrs[instr_id]:
+                continue
+
+            asm = copy.copy(asm_instrs[instr_id])
+            asm.address = address
+
+            yield asm, self._images[image_id], mem_reads, reg_state
+
+    def close(self):
+        self._data.close()
+
+    @property
+    def compression(self):
+        """Get compression method.
+        """
+        return self._compression
+
+    def __len__(self):
+        return sum(block[3] for block in self._blocks)
+
+    def _records(self, start_address):
+        start_found = start_address is None
+
+        for offset, size, raw_size, count in self._blocks:
+            data = self._read_block(offset, size, raw_size)
+
+            reg_state = {}
+
+            pos = 0
+
+            for _ in xrange(count):
+                address, instr_id, image_id, reg_count, mem_count = _record.unpack_from(data, pos)
+                pos += _record.size
+
+                # Update register state.
+                for _ in xrange(reg_count):
+                    reg_id, reg_size = _register.unpack_from(data, pos)
+                    pos += _register.size
+
+                    if reg_size:
+                        reg_state[self._registers[reg_id]] = int(data[pos:pos + reg_size][::-1].encode("hex"), 16)
+                        pos += reg_size
+                    else:
+                        del reg_state[self._registers[reg_id]]
+
+                # Check for the requested start address of the trace.
+                if not start_found:
+                    if address == start_address:
+                        start_found = True
+                    else:
+                        for _ in xrange(mem_count):
+                            pos += _memory.size + _memory.unpack_from(data, pos)[1]
+
+                        continue
+
+                mem_reads = {}
+
+                for _ in xrange(mem_count):
+                    mem_addr, mem_size = _memory.unpack_from(data, pos)
+                    pos += _memory.size
+
+                    mem_reads[mem_addr] = data[pos:pos + mem_size].encode("hex")
+                    pos += mem_size
+
+                yield address, image_id, instr_id, mem_reads, dict(reg_state)
+
+    def _read_block(self, offset, size, raw_size):
+        data = self._data[offset:offset + size]
+
+        if self._compression == TRACE_COMPRESSION_GZIP:
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        elif self._compression == TRACE_COMPRESSION_ZSTD:
+            data = zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_size)
+
+        return data
+
+
+def _intern(table, value):
+    if value not in table:
+        table[value] = len(table)
+
+    return table[value]
+
+
+def _intern_register(registers, reg):
+    reg_id = _intern(registers, reg)
+
+    if reg_id > 0xff:
+        raise BinaryTraceError("Too many registers")
+
+    return reg_id
+
+
+def _pack_value(value):
+    encoding = "%x" % value
+
+    return ("0" * (len(encoding) % 2) + encoding).decode("hex")[::-1]
+
+
+def _pack_record(address, instr_id, image_id, mem_reads, reg_state, reg_state_prev, registers):
+    if image_id > 0xffff:
+        raise BinaryTraceError("Too many images")
+
+    deltas = []
+
+    for reg, value in reg_state.items():
+        if reg_state_prev.get(reg) != value:
+            value_packed = _pack_value(value)
+
+            deltas.append(_register.pack(_intern_register(registers, reg), len(value_packed)) + value_packed)
+
+    for reg in reg_state_prev:
+        if reg not in reg_state:
+            deltas.append(_register.pack(_intern_register(registers, reg), 0))
+
+    reads = []
+
+    for mem_addr, value in mem_reads.items():
+        value_packed = value.decode("hex")
+
+        reads.append(_memory.pack(mem_addr, len(value_packed)) + value_packed)
+
+    header = _record.pack(address, instr_id, image_id, len(deltas), len(reads))
+
+    return header + "".join(deltas) + "".join(reads)
+
+
+def _write_block(f, data, count, compression):
+    if compression == TRACE_COMPRESSION_GZIP:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        data_stored = compressor.compress(data) + compressor.flush()
+    elif compression == TRACE_COMPRESSION_ZSTD:
+        data_stored = zstandard.ZstdCompressor().compress(data)
+    else:
+        data_stored = data
+
+    offset = f.tell()
+
+    f.write(data_stored)
+
+    return offset, len(data_stored), len(data), count
+
+
+def _write_table(f, strings):
+    f.write(_length.pack(len(strings)))
+
+    for string in strings:
+        f.write(_length.pack(len(string)) + string)
+
+
+def _read_table(data, offset):
+    count, = _length.unpack_from(data, offset)
+    offset += _length.size
+
+    strings = []
+
+    for _ in xrange(count):
+        length, = _length.unpack_from(data, offset)
+        offset += _length.size
+
+        strings.append(data[offset:offset + length])
+        offset += length
+
+    return strings, offset
+
+
 class AsmTrace(object):
 
     def __init__(self, trace):
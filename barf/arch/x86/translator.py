@@ -28,7 +28,9 @@ import barf.arch.x86.translators as translators
 
 from barf.arch import ARCH_X86_MODE_32
 from barf.arch import ARCH_X86_MODE_64
+from barf.arch.translator import Label
 from barf.arch.translator import TranslationBuilder
+from barf.arch.translator import TranslationCache
 from barf.arch.translator import Translator
 from barf.arch.x86 import X86ArchitectureInformation
 from barf.arch.x86 import X86ImmediateOperand
@@ -36,12 +38,36 @@ from barf.arch.x86 import X86MemoryOperand
 from barf.arch.x86 import X86RegisterOperand
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilRegisterOperand
+from barf.core.reil import ReilMnemonic
 from barf.core.reil.builder import ReilBuilder
+from barf.core.reil.helpers import is_temporal_register
+from barf.core.reil.helpers import read_registers
+from barf.core.reil.helpers import written_registers
 from barf.utils.utils import VariableNamer
 
 logger = logging.getLogger(__name__)
 
 
+# Translation templates shared among translators.
+translation_cache = TranslationCache()
+
+
+def lazy_flag(flag):
+    """Decorator for flag update methods. In lazy flags mode, the update
+    is recorded (to be translated later on) instead of translated.
+    """
+    def decorator(method):
+        def wrapper(self, tb, oprnd0, oprnd1, result):
+            if self._flag_records is None:
+                return method(self, tb, oprnd0, oprnd1, result)
+
+            self._defer_flag_update(tb, flag, method, [oprnd0, oprnd1, result])
+
+        return wrapper
+
+    return decorator
+
+
 class X86TranslationBuilder(TranslationBuilder):
 
     def __init__(self, ir_name_generator, architecture_mode):
@@ -180,7 +206,7 @@ class X86Translator(Translator):
 
     """x86 to IR Translator."""
 
-    def __init__(self, architecture_mode):
+    def __init__(self, architecture_mode, lazy_flags=False, translation_cache=translation_cache):
 
         super(X86Translator, self).__init__()
 
@@ -220,9 +246,31 @@ class X86Translator(Translator):
 
             self._ws = ReilImmediateOperand(8, 64)  # word size
 
+        # Lazy flags mode. Flag updates are deferred until a flag is
+        # read, control leaves the basic block or the block ends.
+        self._lazy_flags = lazy_flags
+
+        # Deferred flag updates, by flag (update method and operands).
+        self._pending_flags = {}
+
+        # Flag updates recorded while translating an instruction (None
+        # if flags are being translated eagerly).
+        self._flag_records = None
+
+        # Copies of the operands of the recorded flag updates.
+        self._flag_snapshots = {}
+        self._flag_snapshots_mark = None
+
+        # Translation templates of already seen instruction encodings
+        # (None to disable it). It is not used in lazy flags mode.
+        self._translation_cache = translation_cache
+
     def translate(self, instruction):
         """Return IR representation of an instruction.
         """
+        if self._lazy_flags:
+            return self.translate_block([instruction])[0]
+
         try:
             trans_instrs = self.__translate(instruction)
         except NotImplementedError:
@@ -238,6 +286,33 @@ class X86Translator(Translator):
 
         return trans_instrs
 
+    def translate_block(self, instructions):
+        """Return IR representation of a sequence of instructions that
+        make up a basic block (a list of REIL instructions for each
+        one). In lazy flags mode, flag updates are translated only
+        where a flag is read, before control leaves the block and at
+        the end of it. Therefore, each REIL list is only valid as part
+        of the whole block.
+        """
+        if not self._lazy_flags:
+            return [self.translate(instruction) for instruction in instructions]
+
+        self._pending_flags = {}
+
+        trans_instrs = []
+
+        for index, instruction in enumerate(instructions):
+            last = index == len(instructions) - 1
+
+            try:
+                trans_instrs.append(self.__translate_lazy(instruction, last))
+            except:
+                self.__log_translation_exception(instruction)
+
+                raise
+
+        return trans_instrs
+
     def reset(self):
         """Restart IR register name generator.
         """
@@ -249,6 +324,155 @@ class X86Translator(Translator):
         :param instruction: a x86 instruction
         :type instruction: X86Instruction
         """
+        if self._translation_cache is None or not instruction.bytes:
+            return self.__translate_instruction(instruction)
+
+        relative = self.__is_address_relative(instruction)
+
+        return self._translation_cache.translate(self._arch_mode, instruction, relative,
+                                                 self.__translate_instruction, self._ir_name_generator)
+
+    def __translate_instruction(self, instruction):
+        """Translate a x86 instruction into REIL language (bypassing the
+        translation cache).
+        """
+        tb = self.__build(instruction)
+
+        return tb.instanciate(instruction.address)
+
+    def __is_address_relative(self, instruction):
+        """Return whether the immediate operands of an instruction are
+        encoded relative to its address.
+        """
+        mnemonic = instruction.mnemonic
+
+        if not (mnemonic.startswith("j") or mnemonic.startswith("loop") or mnemonic == "call"):
+            return False
+
+        return any(isinstance(oprnd, X86ImmediateOperand) for oprnd in instruction.operands)
+
+    def __translate_lazy(self, instruction, last):
+        """Translate a x86 instruction into REIL language deferring
+        flag updates.
+        """
+        try:
+            # Record flag updates, unless the instruction has branches
+            # (flag updates might be conditional) or writes a flag
+            # directly as well.
+            self._flag_records = {}
+            self._flag_snapshots = {}
+
+            try:
+                tb = self.__build(instruction)
+            finally:
+                flag_records, self._flag_records = self._flag_records, None
+
+            reads, writes, branches, exits = self.__get_flags_usage(tb)
+
+            if branches or set(flag_records).intersection(writes):
+                tb = self.__build(instruction)
+
+                reads, writes, branches, exits = self.__get_flags_usage(tb)
+
+                flag_records = {}
+
+                # Flags written by the instruction are materialized, too,
+                # as they might be written conditionally.
+                flags = reads.union(writes)
+            else:
+                flags = reads
+        except NotImplementedError:
+            tb = X86TranslationBuilder(self._ir_name_generator, self._arch_mode)
+            tb.add(self._builder.gen_unkn())
+
+            flag_records, writes, exits = {}, set(), True
+
+            self.__log_not_supported_instruction(instruction)
+
+        # Materialize flags read by the instruction (every flag if
+        # control might leave the block).
+        if exits:
+            flags = set(self._pending_flags)
+
+        tb._instructions = self.__materialize_flags(flags) + tb._instructions
+
+        for flag in writes:
+            self._pending_flags.pop(flag, None)
+
+        self._pending_flags.update(flag_records)
+
+        # Materialize the remaining flags at the end of the block.
+        if last:
+            tb._instructions += self.__materialize_flags(set(self._pending_flags))
+
+        return tb.instanciate(instruction.address)
+
+    def __materialize_flags(self, flags):
+        """Return the REIL instructions that compute the deferred value
+        of a set of flags.
+        """
+        tb = X86TranslationBuilder(self._ir_name_generator, self._arch_mode)
+
+        for flag in sorted(flags.intersection(self._pending_flags)):
+            method, oprnds = self._pending_flags.pop(flag)
+
+            method(self, tb, *oprnds)
+
+        return tb._instructions
+
+    def __get_flags_usage(self, tb):
+        """Return the flags read and written by an instruction, whether
+        it has branches and whether control might leave the block.
+        """
+        reads, writes, branches, exits = set(), set(), False, False
+
+        for instr in tb._instructions:
+            if isinstance(instr, Label):
+                continue
+
+            reads.update(name for name in read_registers(instr) if name in self._flags)
+            writes.update(name for name in written_registers(instr) if name in self._flags)
+
+            if instr.mnemonic == ReilMnemonic.JCC:
+                branches = True
+                exits = exits or not isinstance(instr.operands[2], Label)
+
+            if instr.mnemonic == ReilMnemonic.UNKN:
+                exits = True
+
+        return reads, writes, branches, exits
+
+    def _defer_flag_update(self, tb, flag, method, oprnds):
+        """Record a flag update. Native registers are copied, as they
+        might be overwritten before the flag is materialized.
+        """
+        # Copies are shared among consecutive updates.
+        if self._flag_snapshots_mark != len(tb._instructions):
+            self._flag_snapshots = {}
+
+        oprnds_copy = []
+
+        for oprnd in oprnds:
+            if isinstance(oprnd, ReilRegisterOperand) and not is_temporal_register(oprnd.name):
+                key = (oprnd.name, oprnd.size)
+
+                if key not in self._flag_snapshots:
+                    self._flag_snapshots[key] = tb.temporal(oprnd.size)
+
+                    tb.add(self._builder.gen_str(oprnd, self._flag_snapshots[key]))
+
+                oprnd = self._flag_snapshots[key]
+
+            oprnds_copy.append(oprnd)
+
+        self._flag_snapshots_mark = len(tb._instructions)
+
+        self._flag_records[flag] = (method, oprnds_copy)
+
+    def __build(self, instruction):
+        """Run the translation function of an instruction. Return the
+        translation builder.
+        """
         # Retrieve translation function.
         mnemonic = instruction.mnemonic
 
@@ -265,7 +489,7 @@ class X86Translator(Translator):
         else:
             raise NotImplementedError("Instruction Not Implemented")
 
-        return tb.instanciate(instruction.address)
+        return tb
 
     def __log_not_supported_instruction(self, instruction):
         bytes_str = " ".join("%02x" % ord(b) for b in instruction.bytes)
@@ -289,6 +513,7 @@ class X86Translator(Translator):
 
     # Flag translation.
     # ======================================================================== #
+    @lazy_flag("af")
     def _update_af(self, tb, oprnd0, oprnd1, result):
         assert oprnd0.size == oprnd1.size
 
@@ -322,6 +547,7 @@ class X86Translator(Translator):
         # Move bit 4 to AF flag.
         tb.add(self._builder.gen_bsh(tmp6, immn4, af))
 
+    @lazy_flag("af")
     def _update_af_sub(self, tb, oprnd0, oprnd1, result):
         assert oprnd0.size == oprnd1.size
 
@@ -355,6 +581,7 @@ class X86Translator(Translator):
         # Move bit 4 to AF flag.
         tb.add(self._builder.gen_bsh(tmp6, immn4, af))
 
+    @lazy_flag("pf")
     def _update_pf(self, tb, oprnd0, oprnd1, result):
         tmp0 = tb.temporal(result.size)
         tmp1 = tb.temporal(result.size)
@@ -385,6 +612,7 @@ class X86Translator(Translator):
         # Invert and save result.
         tb.add(self._builder.gen_xor(tmp5, imm1, pf))
 
+    @lazy_flag("sf")
     def _update_sf(self, tb, oprnd0, oprnd1, result):
         # Create temporal variables.
         tmp0 = tb.temporal(result.size)
@@ -397,6 +625,7 @@ class X86Translator(Translator):
         tb.add(self._builder.gen_and(result, mask0, tmp0))  # filter sign bit
         tb.add(self._builder.gen_bsh(tmp0, shift0, sf))     # extract sign bit
 
+    @lazy_flag("of")
     def _update_of(self, tb, oprnd0, oprnd1, result):
         assert oprnd0.size == oprnd1.size
 
@@ -423,6 +652,7 @@ class X86Translator(Translator):
         # Save result.
         tb.add(self._builder.gen_str(tmp3, of))
 
+    @lazy_flag("of")
     def _update_of_sub(self, tb, oprnd0, oprnd1, result):
         assert oprnd0.size == oprnd1.size
 
@@ -454,6 +684,7 @@ class X86Translator(Translator):
         # Save result.
         tb.add(self._builder.gen_str(tmp3, of))
 
+    @lazy_flag("cf")
     def _update_cf(self, tb, oprnd0, oprnd1, result):
         cf = self._flags["cf"]
 
@@ -465,6 +696,7 @@ class X86Translator(Translator):
         tb.add(self._builder.gen_and(result, imm0, tmp0))   # filter carry bit
         tb.add(self._builder.gen_bsh(tmp0, imm1, cf))
 
+    @lazy_flag("zf")
     def _update_zf(self, tb, oprnd0, oprnd1, result):
         zf = self._flags["zf"]
 
@@ -574,19 +574,23 @@ class X86Instruction(AssemblyInstruction):
         return not self.__eq__(other)
 
     def __getstate__(self):
-        state = {
+        state = super(X86Instruction, self).__getstate__()
+
+        state.update({
             '_prefix': self._prefix,
             '_mnemonic': self._mnemonic,
             '_operands': self._operands,
             '_bytes': self._bytes,
             '_size': self._size,
             '_address': self._address,
-            '_arch_mode': self._arch_mode
-        }
+            '_arch_mode': self._arch_mode,
+        })
 
         return state
 
     def __setstate__(self, state):
+        super(X86Instruction, self).__setstate__(state)
+
         self._prefix = state['_prefix']
         self._mnemonic = state['_mnemonic']
         self._operands = state['_operands']
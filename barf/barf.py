@@ -26,7 +26,11 @@
 BARF : Binary Analysis Framework.
 
 """
+import hashlib
 import logging
+import multiprocessing
+
+from collections import deque
 
 from analysis.codeanalyzer import CodeAnalyzer
 from analysis.graphs.controlflowgraph import CFGRecoverer
@@ -85,6 +89,8 @@ class BARF(object):
 
         self._arch_mode = None
 
+        self._binary_hash = None
+
         self.open(filename)
 
     def _load(self, arch_mode=None):
@@ -193,7 +199,7 @@ class BARF(object):
         self.gadget_verifier = None
 
         if self.code_analyzer:
-            self.gadget_verifier = GadgetVerifier(self.code_analyzer, self.arch_info)
+            self.gadget_verifier = GadgetVerifier(self.code_analyzer, self.arch_info, self.ir_emulator)
 
         self.emulator = Emulator(self.arch_info, self.ir_emulator, self.ir_translator, self.disassembler)
 
@@ -208,6 +214,7 @@ class BARF(object):
         if filename:
             self.binary = BinaryFile(filename)
             self.text_section = self.binary.text_section
+            self._binary_hash = None
 
             self._load(arch_mode=self.binary.architecture_mode)
 
@@ -280,7 +287,8 @@ class BARF(object):
             # update instruction pointer
             curr_addr += asm_instr.size
 
-    def recover_cfg(self, start=None, end=None, symbols=None, callback=None, arch_mode=None):
+    def recover_cfg(self, start=None, end=None, symbols=None, callback=None, arch_mode=None, translate=True,
+                    cache=None):
         """Recover CFG.
 
         Args:
@@ -289,6 +297,8 @@ class BARF(object):
             symbols (dict): Symbol table.
             callback (function): A callback function which is called after each successfully recovered CFG.
             arch_mode (int): Architecture mode.
+            translate (bool): Translate instructions to REIL (on first access to their IR).
+            cache (AnalysisCache): A cache of recovered CFGs.
 
         Returns:
             ControlFlowGraph: A CFG.
@@ -303,11 +313,13 @@ class BARF(object):
         # Check start address.
         start = start if start else self.binary.entry_point
 
-        cfg, _ = self._recover_cfg(start=start, end=end, symbols=symbols, callback=callback)
+        cfg, _ = self._recover_cfg(start=start, end=end, symbols=symbols, callback=callback, translate=translate,
+                                   cache=cache)
 
         return cfg
 
-    def recover_cfg_all(self, entries, symbols=None, callback=None, arch_mode=None):
+    def recover_cfg_all(self, entries, symbols=None, callback=None, arch_mode=None, translate=True, jobs=1,
+                        cache=None):
         """Recover CFG for all functions from an entry point and/or symbol table.
 
         Args:
@@ -315,10 +327,32 @@ class BARF(object):
             symbols (dict): Symbol table.
             callback (function): A callback function which is called after each successfully recovered CFG.
             arch_mode (int): Architecture mode.
+            translate (bool): Translate instructions to REIL (on first access to their IR).
+            jobs (int): Number of worker processes.
+            cache (AnalysisCache): A cache of recovered CFGs.
 
         Returns:
             list: A list of recovered CFGs.
         """
+        return list(self.recover_cfg_all_iter(entries, symbols=symbols, callback=callback, arch_mode=arch_mode,
+                                              translate=translate, jobs=jobs, cache=cache))
+
+    def recover_cfg_all_iter(self, entries, symbols=None, callback=None, arch_mode=None, translate=True, jobs=1,
+                             cache=None):
+        """Recover CFG for all functions from an entry point and/or symbol table.
+
+        Args:
+            entries (list): A list of function addresses' to start the CFG recovery process.
+            symbols (dict): Symbol table.
+            callback (function): A callback function which is called after each successfully recovered CFG.
+            arch_mode (int): Architecture mode.
+            translate (bool): Translate instructions to REIL (on first access to their IR).
+            jobs (int): Number of worker processes.
+            cache (AnalysisCache): A cache of recovered CFGs.
+
+        Returns:
+            generator: The recovered CFGs, as soon as they are available.
+        """
         # Set architecture in case it wasn't already set.
         if arch_mode is None:
             arch_mode = self.binary.architecture_mode
@@ -329,37 +363,108 @@ class BARF(object):
         # Set symbols.
         symbols = {} if not symbols else symbols
 
-        # Recover the CFGs.
-        cfgs = []
-        addrs_processed = set()
-        calls = entries
+        if jobs > 1:
+            cfgs = self._recover_cfg_all_parallel(entries, symbols, callback, translate, jobs, cache)
+        else:
+            cfgs = self._recover_cfg_all_sequential(entries, symbols, callback, translate, cache)
+
+        for cfg in cfgs:
+            yield cfg
+
+    def _recover_cfg_all_sequential(self, entries, symbols, callback, translate, cache):
+        """Recover CFG for all functions, one at a time.
 
-        while len(calls) > 0:
-            start, calls = calls[0], calls[1:]
+        """
+        calls = deque(entries)
+        calls_seen = set(entries)
 
-            cfg, calls_tmp = self._recover_cfg(start=start, symbols=symbols, callback=callback)
+        while calls:
+            start = calls.popleft()
 
-            addrs_processed.add(start)
+            cfg, calls_tmp = self._recover_cfg(start=start, symbols=symbols, callback=callback, translate=translate,
+                                               cache=cache)
 
-            cfgs.append(cfg)
+            yield cfg
 
             for addr in sorted(calls_tmp):
-                if addr not in addrs_processed and addr not in calls:
+                if addr not in calls_seen:
+                    calls_seen.add(addr)
                     calls.append(addr)
 
-        return cfgs
+    def _recover_cfg_all_parallel(self, entries, symbols, callback, translate, jobs, cache):
+        """Recover CFG for all functions, using a pool of worker processes.
+
+        """
+        calls = deque(entries)
+        calls_seen = set(entries)
+        results = deque()
+
+        # Each worker has its own disassembler and recoverer. The
+        # section is inherited by the workers (read-only).
+        pool = multiprocessing.Pool(jobs, _cfg_worker_init, (self.binary.architecture,
+                                                              self.arch_info.architecture_mode,
+                                                              self.text_section, symbols))
+
+        try:
+            while calls or results:
+                while calls:
+                    start = calls.popleft()
 
-    def _recover_cfg(self, start=None, end=None, symbols=None, callback=None):
+                    name, size = self._get_function_name_and_size(start, symbols)
+
+                    if callback:
+                        callback(start, name, size)
+
+                    cached = self._load_cfg_from_cache(cache, start, self.binary.ea_end, symbols, translate)
+
+                    if cached:
+                        bbs, calls_tmp = cached
+
+                        yield ControlFlowGraph(bbs, name=name)
+
+                        for addr in sorted(calls_tmp):
+                            if addr not in calls_seen:
+                                calls_seen.add(addr)
+                                calls.append(addr)
+
+                        continue
+
+                    results.append(pool.apply_async(_cfg_worker_recover, (start, self.binary.ea_end)))
+
+                # All the functions could have been loaded from the cache.
+                if not results:
+                    continue
+
+                # Errors raised by a worker are re-raised here.
+                start, bbs, calls_tmp = results.popleft().get()
+
+                self._store_cfg_in_cache(cache, start, self.binary.ea_end, symbols, bbs, calls_tmp)
+
+                # Instructions come back untranslated, translate them
+                # (lazily) in this process.
+                if translate:
+                    for bb in bbs:
+                        for instr in bb:
+                            instr.ir_translator = self.ir_translator
+
+                name, _ = self._get_function_name_and_size(start, symbols)
+
+                yield ControlFlowGraph(bbs, name=name)
+
+                for addr in sorted(calls_tmp):
+                    if addr not in calls_seen:
+                        calls_seen.add(addr)
+                        calls.append(addr)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _recover_cfg(self, start=None, end=None, symbols=None, callback=None, translate=True, cache=None):
         """Recover CFG
 
         """
         # Retrieve symbol name in case it is available.
-        if symbols and start in symbols:
-            name = symbols[start][0]
-            size = symbols[start][1] - 1 if symbols[start][1] != 0 else 0
-        else:
-            name = "sub_{:x}".format(start)
-            size = 0
+        name, size = self._get_function_name_and_size(start, symbols)
 
         # Compute start and end address.
         start_addr = start if start else self.binary.ea_start
@@ -369,14 +474,76 @@ class BARF(object):
         if callback:
             callback(start, name, size)
 
-        # Recover basic blocks.
-        bbs, calls = self.bb_builder.build(start_addr, end_addr, symbols)
+        # Recover basic blocks (or load them from the cache).
+        cached = self._load_cfg_from_cache(cache, start_addr, end_addr, symbols, translate)
+
+        if cached:
+            bbs, calls = cached
+        else:
+            bbs, calls = self.bb_builder.build(start_addr, end_addr, symbols, translate=translate)
+
+            self._store_cfg_in_cache(cache, start_addr, end_addr, symbols, bbs, calls)
 
         # Build CFG.
         cfg = ControlFlowGraph(bbs, name=name)
 
         return cfg, calls
 
+    def _load_cfg_from_cache(self, cache, start, end, symbols, translate):
+        """Load the basic blocks and call targets of a function from the
+        cache.
+
+        """
+        if not cache:
+            return None
+
+        def disassemble(address, bb_end):
+            return self.bb_builder.disassemble_instr(address, bb_end, translate=translate)
+
+        return cache.load(self._get_binary_hash(), start, self._get_cache_options(end, symbols), disassemble)
+
+    def _store_cfg_in_cache(self, cache, start, end, symbols, bbs, calls):
+        """Store the basic blocks and call targets of a function in the
+        cache.
+
+        """
+        if not cache:
+            return
+
+        cache.store(self._get_binary_hash(), start, self._get_cache_options(end, symbols), bbs, calls)
+
+    def _get_cache_options(self, end, symbols):
+        """Get the recovery options that a cached CFG depends on.
+
+        """
+        symbols_hash = hashlib.sha1(repr(sorted(symbols.items())) if symbols else "").hexdigest()
+
+        return "{}:{}:{:#x}:{}".format(self.bb_builder.strategy.__class__.__name__,
+                                       self.arch_info.architecture_mode, end, symbols_hash)
+
+    def _get_binary_hash(self):
+        """Get the hash of the binary being analyzed.
+
+        """
+        if self._binary_hash is None:
+            with open(self.binary.filename, "rb") as f:
+                self._binary_hash = hashlib.sha1(f.read()).hexdigest()
+
+        return self._binary_hash
+
+    def _get_function_name_and_size(self, start, symbols):
+        """Get function name and size from the symbol table.
+
+        """
+        if symbols and start in symbols:
+            name = symbols[start][0]
+            size = symbols[start][1] - 1 if symbols[start][1] != 0 else 0
+        else:
+            name = "sub_{:x}".format(start)
+            size = 0
+
+        return name, size
+
     def emulate(self, context=None, start=None, end=None, arch_mode=None, hooks=None, max_instrs=None, print_asm=False):
         """Emulate native code.
 
@@ -435,3 +602,32 @@ class BARF(object):
             encoding += chr(self.ir_emulator.read_memory(start + i, 1))
 
         return encoding
+
+
+# ============================================================================ #
+
+# State of a CFG recovery worker process.
+_cfg_worker = {}
+
+
+def _cfg_worker_init(architecture, arch_mode, memory, symbols):
+    """Set up a CFG recovery worker process.
+    """
+    if architecture == ARCH_X86:
+        arch_info = X86ArchitectureInformation(arch_mode)
+        disassembler = X86Disassembler(arch_mode)
+    else:
+        arch_info = ArmArchitectureInformation(arch_mode)
+        disassembler = ArmDisassembler(architecture_mode=arch_mode)
+
+    # Instructions are not translated by workers.
+    _cfg_worker['bb_builder'] = CFGRecoverer(RecursiveDescent(disassembler, memory, None, arch_info))
+    _cfg_worker['symbols'] = symbols
+
+
+def _cfg_worker_recover(start, end):
+    """Recover the basic blocks of a function in a worker process.
+    """
+    bbs, calls = _cfg_worker['bb_builder'].build(start, end, _cfg_worker['symbols'], translate=False)
+
+    return start, bbs, calls
@@ -22,8 +22,17 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
+import mmap
+import struct
+
 from barf.core.reil.helpers import split_address
 from barf.core.reil.helpers import to_asm_address
+from barf.core.reil.helpers import to_reil_address
+from barf.core.reil.reil import ReilEmptyOperand
+from barf.core.reil.reil import ReilImmediateOperand
+from barf.core.reil.reil import ReilInstruction
+from barf.core.reil.reil import ReilRegisterOperand
 
 
 class ReilSequenceInvalidAddressError(Exception):
@@ -105,58 +114,400 @@ class ReilContainerInvalidAddressError(Exception):
 
 class ReilContainer(object):
 
-    """Reil instruction container.
+    """Reil instruction container. Sequences are indexed by address and
+    kept sorted by it.
     """
 
     def __init__(self):
         self.__container = {}
 
+        # Sequences addresses (sorted).
+        self.__addresses = []
+
     def add(self, sequence):
         base_addr, _ = split_address(sequence.address)
 
-        if base_addr in self.__container.keys():
+        if base_addr in self.__container:
             raise Exception("Invalid sequence")
 
         self.__container[base_addr] = sequence
 
-    def fetch(self, address):
-        base_addr, index = split_address(address)
+        # Sequences are usually added in order.
+        if not self.__addresses or base_addr > self.__addresses[-1]:
+            self.__addresses.append(base_addr)
+        else:
+            bisect.insort(self.__addresses, base_addr)
 
-        if base_addr not in self.__container.keys():
+    def fetch(self, address):
+        try:
+            sequence = self.__container[address >> 0x08]
+        except KeyError:
             raise ReilContainerInvalidAddressError()
 
-        return self.__container[base_addr].get(index)
+        return sequence.get(address & 0xff)
 
     def fetch_sequence(self, address):
+        try:
+            return self.__container[address >> 0x08]
+        except KeyError:
+            raise ReilContainerInvalidAddressError()
+
+    def fetch_sequences(self, start, end):
+        """Return the sequences within [start, end) (sorted by address).
+        """
+        return [self.__container[addr] for addr in _addresses_range(self.__addresses, start, end)]
+
+    def get_next_address(self, address):
+        try:
+            sequence = self.__container[address >> 0x08]
+        except KeyError:
+            raise Exception("Invalid address.")
+
+        # Fall through to the next instruction or to the next sequence.
+        if (address & 0xff) < len(sequence) - 1:
+            return address + 1
+
+        return sequence.next_sequence_address
+
+    def dump(self):
+        for base_addr in self.__addresses:
+            self.__container[base_addr].dump()
+
+            print("-" * 80)
+
+    @property
+    def sequences(self):
+        return [self.__container[addr] for addr in self.__addresses]
+
+    def __iter__(self):
+        for addr in self.__addresses:
+            for instr in self.__container[addr]:
+                yield instr
+
+
+# Binary REIL container format
+# ======================================================================== #
+# A header, the encoded sequences (sorted by address), an index with an
+# entry per sequence and a table of strings (register names and
+# comments). Each sequence is encoded as the number of instructions
+# followed by the instructions:
+#
+#   mnemonic (byte), index (byte), operand kinds (byte), operands...
+#
+# Operand kinds take two bits per operand (empty, immediate or register)
+# and bit 7 flags a comment. Register operands are encoded as the string
+# id of the name and the size; immediate operands as the size and the
+# (zigzag encoded) value. Numbers are varints. The sequence *assembly* is
+# not stored.
+
+REIL_CONTAINER_MAGIC = "BARFREIL"
+REIL_CONTAINER_VERSION = 1
+
+_OPERAND_EMPTY = 0
+_OPERAND_IMMEDIATE = 1
+_OPERAND_REGISTER = 2
+
+_COMMENT_FLAG = 0x80
+
+# magic, version, sequences count, index offset, strings offset
+_header = struct.Struct("<8sHIQQ")
+
+# address, next sequence address (+ index and flag), offset, length
+_index_entry = struct.Struct("<QQBBQI")
+
+
+class ReilContainerFileError(Exception):
+    pass
+
+
+def save_container(container, filename):
+    """Save a container in the binary REIL container format.
+    """
+    strings = {}
+    index = []
+
+    with open(filename, "wb") as f:
+        f.write(_header.pack(REIL_CONTAINER_MAGIC, REIL_CONTAINER_VERSION, 0, 0, 0))
+
+        for sequence in container.sequences:
+            data = _encode_sequence(sequence, strings)
+
+            base_addr, _ = split_address(sequence.address)
+
+            if sequence.next_sequence_address is None:
+                next_base_addr, next_index, next_flag = 0, 0, 0
+            else:
+                next_base_addr, next_index = split_address(sequence.next_sequence_address)
+                next_flag = 1
+
+            index.append(_index_entry.pack(base_addr, next_base_addr, next_index, next_flag, f.tell(), len(data)))
+
+            f.write(data)
+
+        index_offset = f.tell()
+
+        f.write("".join(index))
+
+        strings_offset = f.tell()
+
+        table = bytearray()
+
+        _pack_varint(table, len(strings))
+
+        for string in sorted(strings, key=strings.get):
+            _pack_varint(table, len(string))
+
+            table += string
+
+        f.write(table)
+
+        f.seek(0)
+        f.write(_header.pack(REIL_CONTAINER_MAGIC, REIL_CONTAINER_VERSION, len(index), index_offset, strings_offset))
+
+
+def load_container(filename):
+    """Load a container saved with `save_container`. Sequences are
+    decoded on demand.
+    """
+    return ReilContainerFile(filename)
+
+
+class ReilContainerFile(object):
+
+    """Reil instruction container backed by a (memory mapped) binary
+    REIL container file. It provides the same read interface as
+    **ReilContainer**.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.__data) < _header.size:
+            raise ReilContainerFileError("Invalid file.")
+
+        magic, version, count, index_offset, strings_offset = _header.unpack_from(self.__data, 0)
+
+        if magic != REIL_CONTAINER_MAGIC:
+            raise ReilContainerFileError("Invalid file.")
+
+        if version != REIL_CONTAINER_VERSION:
+            raise ReilContainerFileError("Unsupported version: {}".format(version))
+
+        self.__strings = _unpack_strings(bytearray(self.__data[strings_offset:]))
+
+        # Sequences index (by base address).
+        self.__index = {}
+        self.__addresses = []
+
+        for i in xrange(count):
+            entry = _index_entry.unpack_from(self.__data, index_offset + i * _index_entry.size)
+            base_addr, next_base_addr, next_index, next_flag, offset, length = entry
+
+            next_addr = to_reil_address(next_base_addr, next_index) if next_flag else None
+
+            self.__index[base_addr] = next_addr, offset, length
+            self.__addresses.append(base_addr)
+
+        # Decoded sequences.
+        self.__container = {}
+
+    def fetch(self, address):
         base_addr, index = split_address(address)
 
-        if base_addr not in self.__container.keys():
-            raise ReilContainerInvalidAddressError()
+        return self.__get_sequence(base_addr).get(index)
 
-        return self.__container[base_addr]
+    def fetch_sequence(self, address):
+        base_addr, _ = split_address(address)
+
+        return self.__get_sequence(base_addr)
+
+    def fetch_sequences(self, start, end):
+        """Return the sequences within [start, end) (sorted by address).
+        """
+        return [self.__get_sequence(addr) for addr in _addresses_range(self.__addresses, start, end)]
 
     def get_next_address(self, address):
         base_addr, index = split_address(address)
 
-        if base_addr not in self.__container.keys():
+        if base_addr not in self.__index:
             raise Exception("Invalid address.")
 
-        addr = address
+        sequence = self.__get_sequence(base_addr)
 
-        if index < len(self.__container[base_addr]) - 1:
-            addr += 1
+        if index < len(sequence) - 1:
+            addr = address + 1
         else:
-            addr = self.__container[base_addr].next_sequence_address
+            addr = sequence.next_sequence_address
 
         return addr
 
     def dump(self):
-        for base_addr in sorted(self.__container.keys()):
-            self.__container[base_addr].dump()
+        for base_addr in self.__addresses:
+            self.__get_sequence(base_addr).dump()
 
             print("-" * 80)
 
+    def close(self):
+        self.__data.close()
+
+    @property
+    def sequences(self):
+        return [self.__get_sequence(addr) for addr in self.__addresses]
+
+    def __get_sequence(self, base_addr):
+        try:
+            return self.__container[base_addr]
+        except KeyError:
+            pass
+
+        if base_addr not in self.__index:
+            raise ReilContainerInvalidAddressError()
+
+        next_addr, offset, length = self.__index[base_addr]
+
+        sequence = _decode_sequence(bytearray(self.__data[offset:offset + length]), base_addr, self.__strings)
+        sequence.next_sequence_address = next_addr
+
+        self.__container[base_addr] = sequence
+
+        return sequence
+
     def __iter__(self):
-        for addr in sorted(self.__container.keys()):
-            for instr in self.__container[addr]:
+        for addr in self.__addresses:
+            for instr in self.__get_sequence(addr):
                 yield instr
+
+
+def _addresses_range(addresses, start, end):
+    # Return the (sorted) base addresses within the [start, end) REIL
+    # address range.
+    lo = bisect.bisect_left(addresses, to_asm_address(start + 0xff))
+    hi = bisect.bisect_left(addresses, to_asm_address(end + 0xff))
+
+    return addresses[lo:hi]
+
+
+def _encode_sequence(sequence, strings):
+    data = bytearray()
+
+    _pack_varint(data, len(sequence))
+
+    for instr in sequence:
+        kinds = 0
+
+        for i, oprnd in enumerate(instr.operands):
+            if isinstance(oprnd, ReilRegisterOperand):
+                kinds |= _OPERAND_REGISTER << (2 * i)
+            elif isinstance(oprnd, ReilImmediateOperand):
+                kinds |= _OPERAND_IMMEDIATE << (2 * i)
+
+        if instr.comment:
+            kinds |= _COMMENT_FLAG
+
+        data.append(instr.mnemonic)
+        data.append(instr.address & 0xff)
+        data.append(kinds)
+
+        for oprnd in instr.operands:
+            if isinstance(oprnd, ReilRegisterOperand):
+                _pack_varint(data, _intern(strings, oprnd.name))
+                _pack_varint(data, oprnd.size + 1 if oprnd.size is not None else 0)
+            elif isinstance(oprnd, ReilImmediateOperand):
+                value = oprnd._immediate
+
+                _pack_varint(data, oprnd.size + 1 if oprnd.size is not None else 0)
+                _pack_varint(data, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+        if instr.comment:
+            _pack_varint(data, _intern(strings, instr.comment))
+
+    return str(data)
+
+
+def _decode_sequence(data, base_addr, strings):
+    sequence = ReilSequence()
+
+    count, offset = _unpack_varint(data, 0)
+
+    for _ in xrange(count):
+        mnemonic, index, kinds = data[offset], data[offset + 1], data[offset + 2]
+        offset += 3
+
+        operands = []
+
+        for i in xrange(3):
+            kind = (kinds >> (2 * i)) & 0x3
+
+            if kind == _OPERAND_REGISTER:
+                name, offset = _unpack_varint(data, offset)
+                size, offset = _unpack_varint(data, offset)
+
+                operands.append(ReilRegisterOperand(strings[name], size - 1 if size else None))
+            elif kind == _OPERAND_IMMEDIATE:
+                size, offset = _unpack_varint(data, offset)
+                value, offset = _unpack_varint(data, offset)
+
+                value = (value >> 1) if not value & 0x1 else -((value + 1) >> 1)
+
+                operands.append(ReilImmediateOperand(value, size - 1 if size else None))
+            else:
+                operands.append(ReilEmptyOperand())
+
+        instr = ReilInstruction()
+
+        instr.mnemonic = mnemonic
+        instr.operands = operands
+        instr.address = to_reil_address(base_addr, index)
+
+        if kinds & _COMMENT_FLAG:
+            comment, offset = _unpack_varint(data, offset)
+
+            instr.comment = strings[comment]
+
+        sequence.append(instr)
+
+    return sequence
+
+
+def _intern(table, string):
+    if string not in table:
+        table[string] = len(table)
+
+    return table[string]
+
+
+def _pack_varint(data, value):
+    while value > 0x7f:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+
+    data.append(value)
+
+
+def _unpack_varint(data, offset):
+    value, shift = 0, 0
+
+    while True:
+        byte = data[offset]
+        offset += 1
+
+        value |= (byte & 0x7f) << shift
+        shift += 7
+
+        if not byte & 0x80:
+            return value, offset
+
+
+def _unpack_strings(data):
+    count, offset = _unpack_varint(data, 0)
+    strings = []
+
+    for _ in xrange(count):
+        length, offset = _unpack_varint(data, offset)
+
+        strings.append(str(data[offset:offset + length]))
+
+        offset += length
+
+    return strings
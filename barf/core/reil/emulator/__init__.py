@@ -26,3 +26,4 @@ from cpu import *
 from tainter import *
 from memory import *
 from emulator import *
+from vector import *
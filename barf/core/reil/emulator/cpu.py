@@ -27,6 +27,7 @@ import random
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilMnemonic
 from barf.core.reil import ReilRegisterOperand
+from barf.core.reil.helpers import is_temporal_register
 from barf.utils.utils import extract_sign_bit
 from barf.utils.utils import extract_value
 from barf.utils.utils import insert_value
@@ -62,6 +63,13 @@ class ReilCpu(object):
         self.__regs_written = set()
         self.__regs_read = set()
 
+        # Temporal registers (None if they are kept along with the
+        # native ones).
+        self.__temps = None
+
+        # Native registers whose reads and writes are tracked.
+        self.__regs_tracked = frozenset(arch.registers_gp_all) if arch else frozenset()
+
         # Instruction implementation.
         self.__executors = {
             # Arithmetic Instructions
@@ -112,6 +120,24 @@ class ReilCpu(object):
         self.__regs_written = set()
         self.__regs_read = set()
 
+        if self.__temps is not None:
+            self.__temps = dict()
+
+    def clear_temporaries(self):
+        """Remove temporal registers.
+        """
+        if self.__temps is not None:
+            self.__temps = dict()
+        else:
+            for reg in [reg for reg in self.__regs if is_temporal_register(reg)]:
+                del self.__regs[reg]
+
+    def clear_register_tracking(self):
+        """Clear the sets of read and written native registers.
+        """
+        self.__regs_written.clear()
+        self.__regs_read.clear()
+
     # Properties
     # ======================================================================== #
     @property
@@ -122,6 +148,31 @@ class ReilCpu(object):
     def registers(self, value):
         self.__regs = value
 
+    @property
+    def separate_temporaries(self):
+        return self.__temps is not None
+
+    @separate_temporaries.setter
+    def separate_temporaries(self, value):
+        """Keep temporal registers apart from the native ones (so they
+        are not part of *registers* and can be removed at once).
+        """
+        if value and self.__temps is None:
+            self.__temps = dict((reg, val) for reg, val in self.__regs.items() if is_temporal_register(reg))
+
+            for reg in self.__temps:
+                del self.__regs[reg]
+
+        if not value and self.__temps is not None:
+            self.__regs.update(self.__temps)
+
+            self.__temps = None
+
+    @property
+    def temporaries(self):
+        return self.__temps if self.__temps is not None else \
+            dict((reg, val) for reg, val in self.__regs.items() if is_temporal_register(reg))
+
     @property
     def memory(self):
         return self.__mem
@@ -182,13 +233,21 @@ class ReilCpu(object):
 
         return base_register, base_size, offset
 
+    def __get_register_file(self, base_register):
+        if self.__temps is not None and is_temporal_register(base_register):
+            return self.__temps
+
+        return self.__regs
+
     def __get_register_value(self, register):
         base_register, base_size, offset = self.__get_register_info(register)
 
-        if base_register not in self.__regs:
-            self.__regs[base_register] = random.randint(0, 2**base_size - 1)
+        regs = self.__get_register_file(base_register)
+
+        if base_register not in regs:
+            regs[base_register] = random.randint(0, 2**base_size - 1)
 
-        base_value = self.__regs[base_register]
+        base_value = regs[base_register]
 
         return base_register, base_value, offset
 
@@ -197,7 +256,7 @@ class ReilCpu(object):
         value = extract_value(base_value, offset, register.size)
 
         # Keep track of native register reads.
-        if self.__arch and register.name in self.__arch.registers_gp_all:
+        if register.name in self.__regs_tracked:
             self.__regs_read.add(register.name)
 
         if DEBUG:
@@ -209,10 +268,10 @@ class ReilCpu(object):
         base_register, base_value, offset = self.__get_register_value(register)
         base_value_new = insert_value(base_value, value, offset, register.size)
 
-        self.__regs[base_register] = base_value_new
+        self.__get_register_file(base_register)[base_register] = base_value_new
 
         # Keep track of native register writes.
-        if self.__arch and register.name in self.__arch.registers_gp_all:
+        if register.name in self.__regs_tracked:
             self.__regs_written.add(register.name)
 
         if DEBUG:
@@ -221,7 +280,7 @@ class ReilCpu(object):
     # Debug methods
     # ======================================================================== #
     def __debug_read_operand(self, base_register, register, value):
-        base_value = self.__regs[base_register]
+        base_value = self.__get_register_file(base_register)[base_register]
         # taint = "T" if self.__tainter.get_register_taint(register) else "-"
         taint = "x"
 
@@ -240,7 +299,7 @@ class ReilCpu(object):
         print(fmt.format(**params))
 
     def __debug_write_operand(self, base_register, register, value):
-        base_value = self.__regs[base_register]
+        base_value = self.__get_register_file(base_register)[base_register]
         # taint = "T" if self.__tainter.get_register_taint(register) else "-"
         taint = "x"
 
@@ -61,7 +61,7 @@ class ReilEmulator(object):
 
     """Reil Emulator."""
 
-    def __init__(self, arch, cpu=None, memory=None):
+    def __init__(self, arch, cpu=None, memory=None, taint=True):
         # Architecture information.
         self.__arch = arch
 
@@ -74,10 +74,16 @@ class ReilEmulator(object):
         # An instance of a ReilTainter.
         self.__tainter = ReilEmulatorTainter(self, arch=self.__arch)
 
+        # Taint propagation enabled.
+        self.__taint = taint
+
         # Instructions pre and post handlers.
         self.__instr_handler_pre = None, None
         self.__instr_handler_post = None, None
 
+        # Instruction execution function (see *__set_executor*).
+        self.__executor = None
+
         self.__set_default_handlers()
 
     # Execution methods
@@ -90,6 +96,8 @@ class ReilEmulator(object):
 
         ip = start if start else container[0].address
 
+        execute_one = self.__executor
+
         while ip and ip != end:
             try:
                 instr = container.fetch(ip)
@@ -98,7 +106,7 @@ class ReilEmulator(object):
 
                 raise ReilCpuInvalidAddressError()
 
-            next_ip = self.__execute_one(instr)
+            next_ip = execute_one(instr)
 
             ip = next_ip if next_ip else container.get_next_address(ip)
 
@@ -110,13 +118,15 @@ class ReilEmulator(object):
         if context:
             self.__cpu.registers = dict(context)
 
+        execute_one = self.__executor
+
         for instr in instructions:
-            self.__execute_one(instr)
+            execute_one(instr)
 
         return dict(self.__cpu.registers), self.__mem
 
     def single_step(self, instruction):
-        return self.__execute_one(instruction)
+        return self.__executor(instruction)
 
     def __execute_one(self, instruction):
         # Execute pre instruction handlers
@@ -135,6 +145,41 @@ class ReilEmulator(object):
 
         return next_addr
 
+    def __execute_one_taint(self, instruction):
+        # Execute instruction
+        next_addr = self.__cpu.execute(instruction)
+
+        # Taint instruction
+        self.__tainter.taint(instruction)
+
+        return next_addr
+
+    def __execute_one_no_taint(self, instruction):
+        # Execute pre instruction handlers
+        handler_fn_pre, handler_param_pre = self.__instr_handler_pre
+        handler_fn_pre(self, instruction, handler_param_pre)
+
+        # Execute instruction
+        next_addr = self.__cpu.execute(instruction)
+
+        # Execute post instruction handlers
+        handler_fn_post, handler_param_post = self.__instr_handler_post
+        handler_fn_post(self, instruction, handler_param_post)
+
+        return next_addr
+
+    def __set_executor(self):
+        """Select the instruction execution function according to the
+        emulator configuration (taint propagation and handlers).
+        """
+        hooks = self.__instr_handler_pre[0] is not _empty_handler or \
+            self.__instr_handler_post[0] is not _empty_handler
+
+        if hooks:
+            self.__executor = self.__execute_one if self.__taint else self.__execute_one_no_taint
+        else:
+            self.__executor = self.__execute_one_taint if self.__taint else self.__cpu.execute
+
     # Reset methods
     # ======================================================================== #
     def reset(self):
@@ -164,17 +209,23 @@ class ReilEmulator(object):
     def set_instruction_pre_handler(self, func, parameter):
         self.__instr_handler_pre = (func, parameter)
 
+        self.__set_executor()
+
     def set_instruction_post_handler(self, func, parameter):
         self.__instr_handler_post = (func, parameter)
 
+        self.__set_executor()
+
     # Instruction's handler auxiliary methods
     # ======================================================================== #
     def __set_default_handlers(self):
-        empty_fn, empty_param = lambda emu, instr, param: None, None
+        empty_fn, empty_param = _empty_handler, None
 
         self.__instr_handler_pre = (empty_fn, empty_param)
         self.__instr_handler_post = (empty_fn, empty_param)
 
+        self.__set_executor()
+
     # Read/Write methods
     # ======================================================================== #
     def read_operand(self, operand):
@@ -203,6 +254,9 @@ class ReilEmulator(object):
     def get_register_taint(self, register):
         return self.__tainter.get_register_taint(register)
 
+    def get_register_taint_mask(self, register):
+        return self.__tainter.get_register_taint_mask(register)
+
     def set_register_taint(self, register, value):
         self.__tainter.set_register_taint(register, value)
 
@@ -244,6 +298,26 @@ class ReilEmulator(object):
         """
         return self.__cpu
 
+    @property
+    def tainter(self):
+        """Return tainter.
+        """
+        return self.__tainter
+
+    @property
+    def taint(self):
+        """Return whether taint propagation is enabled.
+        """
+        return self.__taint
+
+    @taint.setter
+    def taint(self, value):
+        """Enable or disable taint propagation.
+        """
+        self.__taint = value
+
+        self.__set_executor()
+
     @property
     def read_registers(self):
         """Return read (native) registers.
@@ -255,3 +329,7 @@ class ReilEmulator(object):
         """Return written (native) registers.
         """
         return self.__cpu.written_registers
+
+
+def _empty_handler(emulator, instruction, parameter):
+    pass
@@ -22,38 +22,50 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
+
 from barf.core.reil import ReilImmediateOperand
 from barf.core.reil import ReilMnemonic
 from barf.core.reil import ReilRegisterOperand
 
+# Size of registers of unknown size (temporal registers, for instance).
+_REGISTER_MAX_SIZE = 512
+
 
 class ReilEmulatorTainter(object):
 
-    def __init__(self, emulator, arch=None):
+    """Reil emulator tainter. Taint is either boolean or, in labeled
+    mode, a set of labels (which identify the taint sources).
+    """
+
+    def __init__(self, emulator, arch=None, labeled=False):
         # Reil emulator instance.
         self.__emu = emulator
 
         # Architecture information.
         self.__arch = arch
 
+        # Label sets table (None for boolean taint).
+        self.__labels = ReilTaintLabels() if labeled else None
+
         # Taint information.
-        self.__taint_reg = set()   # Register-level tainting
-        self.__taint_mem = set()   # Byte-level tainting
+        self.__taint_reg = dict()               # Byte-level tainting
+        self.__taint_mem = ReilTaintMemory()    # Byte-level tainting
 
         # Taint function lookup table.
         self.__tainter = {
             # Arithmetic Instructions
-            ReilMnemonic.ADD: self.__taint_binary_op,
-            ReilMnemonic.SUB: self.__taint_binary_op,
+            ReilMnemonic.ADD: self.__taint_arithmetic_op,
+            ReilMnemonic.SUB: self.__taint_arithmetic_op,
             ReilMnemonic.MUL: self.__taint_binary_op,
             ReilMnemonic.DIV: self.__taint_binary_op,
             ReilMnemonic.MOD: self.__taint_binary_op,
             ReilMnemonic.BSH: self.__taint_binary_op,
 
             # Bitwise Instructions
-            ReilMnemonic.AND: self.__taint_binary_op,
-            ReilMnemonic.OR:  self.__taint_binary_op,
-            ReilMnemonic.XOR: self.__taint_binary_op,
+            ReilMnemonic.AND: self.__taint_bitwise_op,
+            ReilMnemonic.OR:  self.__taint_bitwise_op,
+            ReilMnemonic.XOR: self.__taint_bitwise_op,
 
             # Data Transfer Instructions
             ReilMnemonic.LDM: self.__taint_load,
@@ -61,7 +73,7 @@ class ReilEmulatorTainter(object):
             ReilMnemonic.STR: self.__taint_move,
 
             # Conditional Instructions
-            ReilMnemonic.BISZ: self.__taint_move,
+            ReilMnemonic.BISZ: self.__taint_test,
             ReilMnemonic.JCC:  self.__taint_nothing,
 
             # Other Instructions
@@ -70,7 +82,7 @@ class ReilEmulatorTainter(object):
             ReilMnemonic.NOP:   self.__taint_nothing,
 
             # Extensions
-            ReilMnemonic.SEXT: self.__taint_move,
+            ReilMnemonic.SEXT: self.__taint_sign_extend,
             ReilMnemonic.SDIV: self.__taint_binary_op,
             ReilMnemonic.SMOD: self.__taint_binary_op,
         }
@@ -80,8 +92,30 @@ class ReilEmulatorTainter(object):
 
     def reset(self):
         # Taint information.
-        self.__taint_reg = set()
-        self.__taint_mem = set()
+        self.__taint_reg = dict()
+        self.__taint_mem = ReilTaintMemory()
+
+        if self.__labels is not None:
+            self.__labels.reset()
+
+    # Properties
+    # ======================================================================== #
+    @property
+    def labeled(self):
+        return self.__labels is not None
+
+    @labeled.setter
+    def labeled(self, value):
+        """Switch between boolean and labeled taint (taint information
+        is reset).
+        """
+        self.__labels = ReilTaintLabels() if value else None
+
+        self.reset()
+
+    @property
+    def labels(self):
+        return self.__labels
 
     # Operand taint methods
     # ======================================================================== #
@@ -89,7 +123,7 @@ class ReilEmulatorTainter(object):
         if isinstance(operand, ReilRegisterOperand):
             taint = self.get_register_taint(operand.name)
         elif isinstance(operand, ReilImmediateOperand):
-            taint = False
+            taint = False if self.__labels is None else self.__labels.empty
         else:
             raise Exception("Invalid operand: %s" % str(operand))
 
@@ -110,59 +144,223 @@ class ReilEmulatorTainter(object):
     # Memory taint methods
     # ======================================================================== #
     def get_memory_taint(self, address, size):
-        tainted = False
+        if self.__labels is None:
+            return self.__taint_mem.get(address, size) is not None
 
-        for i in xrange(0, size):
-            tainted = tainted or address + i in self.__taint_mem
+        taint = self.__labels.empty
 
-        return tainted
+        for labels in self.__taint_mem.get_values(address, size):
+            taint = self.__labels.union(taint, labels)
+
+        return taint
 
     def set_memory_taint(self, address, size, taint):
-        for i in xrange(0, size):
-            if taint:
-                self.__taint_mem.add(address + i)
-            else:
-                self.__taint_mem.discard(address + i)
+        if self.__labels is None:
+            self.__taint_mem.set(address, size, True if taint else None)
+        else:
+            self.__taint_mem.set(address, size, self.__labels.intern(taint) if taint else None)
 
     def clear_memory_taint(self, address, size):
-        for i in xrange(0, size):
-            self.__taint_mem.discard(address + i)
+        self.__taint_mem.set(address, size, None)
 
     # Register taint methods
     # ======================================================================== #
     def get_register_taint(self, register):
-        return self.__get_base_register(register) in self.__taint_reg
+        taint = self.__read_register(register, self.__get_register_size(register))
+
+        if self.__labels is None:
+            return taint != 0
+
+        return self.__labels.union_all(taint)
+
+    def get_register_taint_mask(self, register):
+        """Return the tainted bytes of a register as a mask (bit i set
+        if byte i is tainted).
+        """
+        taint = self.__read_register(register, self.__get_register_size(register))
+
+        if self.__labels is None:
+            return taint
+
+        return sum(1 << i for i, labels in enumerate(taint) if labels)
 
     def set_register_taint(self, register, taint):
-        if taint:
-            self.__taint_reg.add(self.__get_base_register(register))
+        size = self.__get_register_size(register)
+
+        if self.__labels is None:
+            taint = _byte_mask(size) if taint else 0
         else:
-            self.__taint_reg.discard(self.__get_base_register(register))
+            taint = (self.__labels.intern(taint) if taint else self.__labels.empty,) * _byte_count(size)
+
+        self.__write_register(register, size, taint)
 
     def clear_register_taint(self, register):
-        self.__taint_reg.discard(self.__get_base_register(register))
+        self.set_register_taint(register, False)
 
     # Taint auxiliary methods
     # ======================================================================== #
     def __get_base_register(self, register):
+        # Return base register and byte offset within it.
         if self.__arch and register in self.__arch.alias_mapper and \
             register not in self.__arch.registers_flags:
             # NOTE: Flags are tainted individually.
-            base_name, _ = self.__arch.alias_mapper[register]
+            base_name, offset = self.__arch.alias_mapper[register]
         else:
-            base_name = register
+            base_name, offset = register, 0
+
+        return base_name, offset // 8
+
+    def __get_register_size(self, register):
+        if self.__arch and register in self.__arch.registers_size:
+            return self.__arch.registers_size[register]
+
+        return _REGISTER_MAX_SIZE
+
+    def __read_register(self, register, size):
+        """Return the taint of each byte of a register (a mask or, in
+        labeled mode, a tuple of label sets).
+        """
+        base_name, offset = self.__get_base_register(register)
+
+        if self.__labels is None:
+            return (self.__taint_reg.get(base_name, 0) >> offset) & _byte_mask(size)
+
+        count = _byte_count(size)
+        taint = self.__taint_reg.get(base_name, ())[offset:offset + count]
+
+        return taint + (self.__labels.empty,) * (count - len(taint))
+
+    def __write_register(self, register, size, taint):
+        base_name, offset = self.__get_base_register(register)
+
+        if self.__labels is None:
+            mask = _byte_mask(size) << offset
+
+            taint = (self.__taint_reg.get(base_name, 0) & ~mask) | ((taint << offset) & mask)
+
+            if taint:
+                self.__taint_reg[base_name] = taint
+            else:
+                self.__taint_reg.pop(base_name, None)
+        else:
+            empty = self.__labels.empty
+            count = _byte_count(size)
+
+            base_taint = list(self.__taint_reg.get(base_name, ()))
+            base_taint += [empty] * (offset + count - len(base_taint))
+            base_taint[offset:offset + count] = taint[:count] + (empty,) * (count - len(taint))
 
-        return base_name
+            while base_taint and not base_taint[-1]:
+                base_taint.pop()
+
+            if base_taint:
+                self.__taint_reg[base_name] = tuple(base_taint)
+            else:
+                self.__taint_reg.pop(base_name, None)
+
+    def __read_operand(self, operand):
+        if isinstance(operand, ReilImmediateOperand):
+            return 0 if self.__labels is None else (self.__labels.empty,) * _byte_count(operand.size)
+
+        return self.__read_register(operand.name, operand.size)
+
+    def __write_operand(self, operand, taint):
+        self.__write_register(operand.name, operand.size, taint)
+
+    def __read_memory(self, address, size):
+        taint = self.__taint_mem.get_bytes(address, _byte_count(size))
+
+        if self.__labels is None:
+            return sum(1 << i for i, value in enumerate(taint) if value is not None)
+
+        return tuple(self.__labels.empty if value is None else value for value in taint)
+
+    def __write_memory(self, address, size, taint):
+        count = _byte_count(size)
+
+        if self.__labels is None:
+            taint = [True if taint & (1 << i) else None for i in xrange(count)]
+        else:
+            taint = [value if value else None for value in taint]
+
+        # Set runs of bytes with the same taint at once.
+        start = 0
+
+        for i in xrange(1, count + 1):
+            if i == count or taint[i] != taint[start]:
+                self.__taint_mem.set(address + start, i - start, taint[start])
+
+                start = i
+
+    def __union(self, taint_a, taint_b, size):
+        # Byte-wise union.
+        if self.__labels is None:
+            return (taint_a | taint_b) & _byte_mask(size)
+
+        empty = self.__labels.empty
+
+        return tuple(self.__labels.union(taint_a[i] if i < len(taint_a) else empty,
+                                         taint_b[i] if i < len(taint_b) else empty)
+                     for i in xrange(_byte_count(size)))
+
+    def __spread_up(self, taint, size):
+        # Every byte is tainted by itself and the lower bytes (carries).
+        if self.__labels is None:
+            return (_byte_mask(size) & ~((taint & -taint) - 1)) if taint else 0
+
+        labels = self.__labels.empty
+        spread = []
+
+        for value in taint:
+            labels = self.__labels.union(labels, value)
+
+            spread.append(labels)
+
+        return tuple(spread)
+
+    def __spread_all(self, taint, size):
+        # Every byte is tainted by all the bytes.
+        if self.__labels is None:
+            return _byte_mask(size) if taint else 0
+
+        return (self.__labels.union_all(taint),) * _byte_count(size)
 
     # Taint methods
     # ======================================================================== #
     def __taint_binary_op(self, instr):
-        # Get taint information.
-        op0_taint = self.get_operand_taint(instr.operands[0])
-        op1_taint = self.get_operand_taint(instr.operands[1])
+        """Taint binary instructions (every byte of the result depends
+        on every byte of the operands).
+        """
+        op0_taint = self.__read_operand(instr.operands[0])
+        op1_taint = self.__read_operand(instr.operands[1])
 
-        # Propagate taint.
-        self.set_operand_taint(instr.operands[2], op0_taint or op1_taint)
+        size = instr.operands[2].size
+        taint = self.__union(op0_taint, op1_taint, max(instr.operands[0].size, instr.operands[1].size))
+
+        self.__write_operand(instr.operands[2], self.__spread_all(taint, size))
+
+    def __taint_arithmetic_op(self, instr):
+        """Taint ADD and SUB instructions (each byte of the result
+        depends on the same and lower bytes of the operands).
+        """
+        op0_taint = self.__read_operand(instr.operands[0])
+        op1_taint = self.__read_operand(instr.operands[1])
+
+        size = instr.operands[2].size
+        taint = self.__union(op0_taint, op1_taint, size)
+
+        self.__write_operand(instr.operands[2], self.__spread_up(taint, size))
+
+    def __taint_bitwise_op(self, instr):
+        """Taint bitwise instructions (each byte of the result depends
+        on the same bytes of the operands).
+        """
+        op0_taint = self.__read_operand(instr.operands[0])
+        op1_taint = self.__read_operand(instr.operands[1])
+
+        size = instr.operands[2].size
+
+        self.__write_operand(instr.operands[2], self.__union(op0_taint, op1_taint, size))
 
     def __taint_load(self, instr):
         """Taint LDM instruction.
@@ -171,10 +369,10 @@ class ReilEmulatorTainter(object):
         op0_val = self.__emu.read_operand(instr.operands[0])
 
         # Get taint information.
-        op0_taint = self.get_memory_taint(op0_val, instr.operands[2].size / 8)
+        op0_taint = self.__read_memory(op0_val, instr.operands[2].size)
 
         # Propagate taint.
-        self.set_operand_taint(instr.operands[2], op0_taint)
+        self.__write_operand(instr.operands[2], op0_taint)
 
     def __taint_store(self, instr):
         """Taint STM instruction.
@@ -183,28 +381,250 @@ class ReilEmulatorTainter(object):
         op2_val = self.__emu.read_operand(instr.operands[2])
 
         # Get taint information.
-        op0_size = instr.operands[0].size
-        op0_taint = self.get_operand_taint(instr.operands[0])
+        op0_taint = self.__read_operand(instr.operands[0])
 
         # Propagate taint.
-        self.set_memory_taint(op2_val, op0_size / 8, op0_taint)
+        self.__write_memory(op2_val, instr.operands[0].size, op0_taint)
 
     def __taint_move(self, instr):
         """Taint registers move instruction.
         """
         # Get taint information.
-        op0_taint = self.get_operand_taint(instr.operands[0])
+        op0_taint = self.__read_operand(instr.operands[0])
+
+        # Propagate taint (truncate or zero extend).
+        if self.__labels is None:
+            op0_taint &= _byte_mask(instr.operands[2].size)
+
+        self.__write_operand(instr.operands[2], op0_taint)
+
+    def __taint_sign_extend(self, instr):
+        """Taint SEXT instruction.
+        """
+        # Get taint information.
+        op0_taint = self.__read_operand(instr.operands[0])
+
+        # Propagate taint (extended bytes depend on the sign byte).
+        op0_count = _byte_count(instr.operands[0].size)
+        op2_count = _byte_count(instr.operands[2].size)
+
+        if self.__labels is None:
+            if op0_taint & (1 << (op0_count - 1)):
+                op0_taint |= _byte_mask(instr.operands[2].size) & ~_byte_mask(instr.operands[0].size)
+        else:
+            op0_taint += (op0_taint[-1],) * (op2_count - op0_count)
+
+        self.__write_operand(instr.operands[2], op0_taint)
+
+    def __taint_test(self, instr):
+        """Taint BISZ instruction.
+        """
+        # Get taint information.
+        op0_taint = self.__read_operand(instr.operands[0])
 
         # Propagate taint.
-        self.set_operand_taint(instr.operands[2], op0_taint)
+        self.__write_operand(instr.operands[2], self.__spread_all(op0_taint, instr.operands[2].size))
 
     def __taint_undef(self, instr):
         """Taint UNDEF instruction.
         """
         # Propagate taint.
-        self.set_operand_taint(instr.operands[2], False)
+        self.clear_operand_taint(instr.operands[2])
 
     def __taint_nothing(self, instr):
         """Taint nothing.
         """
         pass
+
+
+class ReilTaintLabels(object):
+
+    """Table of taint label sets. Label sets are interned frozensets
+    (equal sets are the same object) and unions are cached, so
+    propagating labeled taint is mostly dictionary lookups.
+    """
+
+    def __init__(self):
+        self.empty = frozenset()
+
+        self.__sets = {self.empty: self.empty}
+        self.__unions = {}
+
+    def intern(self, labels):
+        """Return the interned set of labels (*labels* might be a set of
+        labels or a single label).
+        """
+        if not isinstance(labels, frozenset):
+            labels = frozenset(labels) if isinstance(labels, (set, list, tuple)) else frozenset([labels])
+
+        return self.__sets.setdefault(labels, labels)
+
+    def union(self, labels_a, labels_b):
+        """Return the (interned) union of two interned label sets.
+        """
+        if labels_a is labels_b or not labels_b:
+            return labels_a
+
+        if not labels_a:
+            return labels_b
+
+        key = labels_a, labels_b
+
+        try:
+            return self.__unions[key]
+        except KeyError:
+            labels = self.intern(labels_a | labels_b)
+
+            self.__unions[key] = labels
+
+            return labels
+
+    def union_all(self, labels_list):
+        """Return the (interned) union of a list of interned label sets.
+        """
+        labels = self.empty
+
+        for labels_b in labels_list:
+            labels = self.union(labels, labels_b)
+
+        return labels
+
+    def reset(self):
+        self.__sets = {self.empty: self.empty}
+        self.__unions = {}
+
+    def __len__(self):
+        return len(self.__sets)
+
+
+class ReilTaintMemory(object):
+
+    """Byte-level taint storage. Taint is kept as a sorted list of
+    disjoint address intervals, each one with a (non-None) value.
+    Adjacent intervals with the same value are merged, so tainting a
+    whole buffer takes a single entry.
+    """
+
+    def __init__(self):
+        # Intervals [start, end) sorted by start address.
+        self.__starts = []
+        self.__ends = []
+        self.__values = []
+
+    def get(self, address, size):
+        """Return the value of the first tainted byte in the range, None
+        if no byte is tainted.
+        """
+        index = self.__lookup(address)
+
+        if index < len(self.__starts) and self.__starts[index] < address + size:
+            return self.__values[index]
+
+        return None
+
+    def get_values(self, address, size):
+        """Return the values of the tainted bytes in the range.
+        """
+        end = address + size
+        index = self.__lookup(address)
+        values = []
+
+        while index < len(self.__starts) and self.__starts[index] < end:
+            values.append(self.__values[index])
+
+            index += 1
+
+        return values
+
+    def get_bytes(self, address, size):
+        """Return the value of each byte in the range (None for untainted
+        bytes).
+        """
+        end = address + size
+        index = self.__lookup(address)
+        values = [None] * size
+
+        while index < len(self.__starts) and self.__starts[index] < end:
+            for i in xrange(max(self.__starts[index], address), min(self.__ends[index], end)):
+                values[i - address] = self.__values[index]
+
+            index += 1
+
+        return values
+
+    def set(self, address, size, value):
+        """Set the value of a range of bytes (None untaints them).
+        """
+        if size <= 0:
+            return
+
+        starts, ends, values = self.__starts, self.__ends, self.__values
+
+        start, end = address, address + size
+
+        # Overlapped intervals are in [lo, hi).
+        lo = self.__lookup(start)
+        hi = bisect.bisect_left(starts, end, lo)
+
+        intervals = []
+
+        if lo < hi and starts[lo] < start:
+            intervals.append([starts[lo], start, values[lo]])
+
+        if value is not None:
+            intervals.append([start, end, value])
+
+        if lo < hi and ends[hi - 1] > end:
+            intervals.append([end, ends[hi - 1], values[hi - 1]])
+
+        # Merge with adjacent intervals.
+        if intervals and lo > 0 and ends[lo - 1] == intervals[0][0] and values[lo - 1] == intervals[0][2]:
+            lo -= 1
+            intervals.insert(0, [starts[lo], ends[lo], values[lo]])
+
+        if intervals and hi < len(starts) and starts[hi] == intervals[-1][1] and values[hi] == intervals[-1][2]:
+            intervals.append([starts[hi], ends[hi], values[hi]])
+            hi += 1
+
+        merged = []
+
+        for interval in intervals:
+            if merged and merged[-1][1] == interval[0] and merged[-1][2] == interval[2]:
+                merged[-1][1] = interval[1]
+            else:
+                merged.append(interval)
+
+        starts[lo:hi] = [interval[0] for interval in merged]
+        ends[lo:hi] = [interval[1] for interval in merged]
+        values[lo:hi] = [interval[2] for interval in merged]
+
+    def intervals(self):
+        """Return the tainted intervals as (address, size, value) tuples.
+        """
+        return [(start, end - start, value) for start, end, value in zip(self.__starts, self.__ends, self.__values)]
+
+    def reset(self):
+        self.__starts = []
+        self.__ends = []
+        self.__values = []
+
+    def __lookup(self, address):
+        # Return the index of the first interval that ends after
+        # *address*.
+        index = bisect.bisect_right(self.__starts, address) - 1
+
+        if index < 0 or self.__ends[index] <= address:
+            index += 1
+
+        return index
+
+    def __len__(self):
+        return len(self.__starts)
+
+
+def _byte_count(size):
+    return (size + 7) // 8
+
+
+def _byte_mask(size):
+    return (1 << _byte_count(size)) - 1
@@ -0,0 +1,463 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements a vectorized REIL emulator. It executes a
+straight-line list of REIL instructions (same semantics as
+**ReilEmulator.execute_lite**) over many concrete contexts at once.
+
+Each register holds one value per context (a *lane*). Registers and
+operations of up to 64 bits are computed with NumPy ``uint64`` arrays,
+wider ones fall back to object arrays of Python integers. Memory is kept
+per lane, using one **ReilMemoryEx** instance for each context.
+
+"""
+
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from barf.core.reil import ReilEmptyOperand
+from barf.core.reil import ReilImmediateOperand
+from barf.core.reil import ReilMnemonic
+from barf.core.reil import ReilRegisterOperand
+from barf.core.reil.emulator.cpu import ReilCpuInvalidInstruction
+from barf.core.reil.emulator.memory import ReilMemoryEx
+
+
+class ReilVectorEmulatorNotAvailable(Exception):
+    pass
+
+
+class ReilVectorEmulator(object):
+
+    """Vectorized REIL emulator.
+    """
+
+    def __init__(self, arch):
+        if numpy is None:
+            raise ReilVectorEmulatorNotAvailable("NumPy is not installed")
+
+        # Architecture information.
+        self.__arch = arch
+
+        # Number of contexts (lanes).
+        self.__lanes = 0
+
+        # Registers (an array of values per register).
+        self.__regs = {}
+
+        # Memory (a ReilMemoryEx per lane).
+        self.__mems = []
+
+        # Lanes that raised an exception (e.g., division by zero).
+        self.__faults = numpy.zeros(0, dtype=bool)
+
+        # Native registers written and read.
+        self.__regs_written = set()
+        self.__regs_read = set()
+
+        # Instruction implementation.
+        self.__executors = {
+            # Arithmetic Instructions
+            ReilMnemonic.ADD: self.__execute_binary_op,
+            ReilMnemonic.SUB: self.__execute_binary_op,
+            ReilMnemonic.MUL: self.__execute_binary_op,
+            ReilMnemonic.DIV: self.__execute_binary_op,
+            ReilMnemonic.MOD: self.__execute_binary_op,
+            ReilMnemonic.BSH: self.__execute_bsh,
+
+            # Bitwise Instructions
+            ReilMnemonic.AND: self.__execute_binary_op,
+            ReilMnemonic.OR:  self.__execute_binary_op,
+            ReilMnemonic.XOR: self.__execute_binary_op,
+
+            # Data Transfer Instructions
+            ReilMnemonic.LDM: self.__execute_ldm,
+            ReilMnemonic.STM: self.__execute_stm,
+            ReilMnemonic.STR: self.__execute_str,
+
+            # Conditional Instructions
+            ReilMnemonic.BISZ: self.__execute_bisz,
+            ReilMnemonic.JCC:  self.__execute_skip,
+
+            # Other Instructions
+            ReilMnemonic.UNDEF: self.__execute_undef,
+            ReilMnemonic.UNKN:  self.__execute_unkn,
+            ReilMnemonic.NOP:   self.__execute_skip,
+
+            # Extensions
+            ReilMnemonic.SEXT: self.__execute_sext,
+            ReilMnemonic.SDIV: self.__execute_signed_op,
+            ReilMnemonic.SMOD: self.__execute_signed_op,
+        }
+
+        self.__binary_ops = {
+            ReilMnemonic.ADD: lambda a, b: a + b,
+            ReilMnemonic.SUB: lambda a, b: a - b,
+            ReilMnemonic.MUL: lambda a, b: a * b,   # unsigned multiplication
+            ReilMnemonic.DIV: lambda a, b: a // b,  # unsigned division
+            ReilMnemonic.MOD: lambda a, b: a % b,   # unsigned modulo
+
+            ReilMnemonic.AND: lambda a, b: a & b,
+            ReilMnemonic.OR:  lambda a, b: a | b,
+            ReilMnemonic.XOR: lambda a, b: a ^ b,
+        }
+
+    # Execution methods
+    # ======================================================================== #
+    def execute_lite(self, instructions, contexts):
+        """Execute a list of instructions over a list of contexts (one
+        dictionary of registers per lane). It does not support loops.
+
+        Return a dictionary of registers (an array of values per
+        register) and the memory of each lane.
+        """
+        self.reset(len(contexts))
+
+        for name in set(name for context in contexts for name in context):
+            values = [context[name] for context in contexts]
+            size = self.__arch.registers_size.get(name, max(values).bit_length())
+
+            self.__regs[name] = self.__to_array(values, size > 64)
+
+        with numpy.errstate(all='ignore'):
+            for instr in instructions:
+                self.__executors[instr.mnemonic](instr)
+
+        return dict(self.__regs), self.__mems
+
+    def get_context(self, lane):
+        """Return the registers of a lane.
+        """
+        return dict((name, int(values[lane])) for name, values in self.__regs.items())
+
+    def reset(self, lanes=0):
+        """Reset emulator. All registers and memory are reset.
+        """
+        self.__lanes = lanes
+        self.__regs = {}
+        self.__mems = [ReilMemoryEx(self.__arch.address_size) for _ in xrange(lanes)]
+        self.__faults = numpy.zeros(lanes, dtype=bool)
+        self.__regs_written = set()
+        self.__regs_read = set()
+
+    # Properties
+    # ======================================================================== #
+    @property
+    def registers(self):
+        """Return registers.
+        """
+        return self.__regs
+
+    @property
+    def memories(self):
+        """Return the memory of each lane.
+        """
+        return self.__mems
+
+    @property
+    def faults(self):
+        """Return a boolean array of the lanes that raised an exception.
+        """
+        return self.__faults
+
+    @property
+    def read_registers(self):
+        """Return read (native) registers.
+        """
+        return self.__regs_read
+
+    @property
+    def written_registers(self):
+        """Return written (native) registers.
+        """
+        return self.__regs_written
+
+    # Read/Write methods
+    # ======================================================================== #
+    def read_operand(self, operand, wide=False):
+        if isinstance(operand, ReilRegisterOperand):
+            value = self.__read_register(operand, wide)
+        elif isinstance(operand, ReilImmediateOperand):
+            value = self.__to_array([operand.immediate] * self.__lanes, wide)
+        else:
+            raise Exception("Invalid operand type : %s" % str(operand))
+
+        return value
+
+    def write_operand(self, operand, value):
+        if isinstance(operand, ReilRegisterOperand):
+            self.__write_register(operand, value)
+        else:
+            raise Exception("Invalid operand type : %s" % str(operand))
+
+    # Read/Write auxiliary methods
+    # ======================================================================== #
+    def __get_register_info(self, register):
+        if register.name in self.__arch.alias_mapper:
+            base_register, offset = self.__arch.alias_mapper[register.name]
+            base_size = self.__arch.registers_size[base_register]
+        else:
+            base_register, offset = register.name, 0
+            base_size = register.size
+
+        return base_register, base_size, offset
+
+    def __get_register_value(self, register):
+        base_register, base_size, offset = self.__get_register_info(register)
+
+        if base_register not in self.__regs:
+            values = [random.randint(0, 2**base_size - 1) for _ in xrange(self.__lanes)]
+
+            self.__regs[base_register] = self.__to_array(values, base_size > 64)
+
+        return base_register, base_size, offset
+
+    def __read_register(self, register, wide):
+        base_register, base_size, offset = self.__get_register_value(register)
+
+        base_wide = base_size > 64
+        base_value = self.__cast(self.__regs[base_register], base_wide)
+
+        value = (base_value >> self.__scalar(offset, base_wide)) & \
+                self.__scalar(2**register.size - 1, base_wide)
+
+        # Keep track of native register reads.
+        if register.name in self.__arch.registers_gp_all:
+            self.__regs_read.add(register.name)
+
+        return self.__cast(value, wide)
+
+    def __write_register(self, register, value):
+        base_register, base_size, offset = self.__get_register_value(register)
+
+        base_wide = base_size > 64
+        base_value = self.__cast(self.__regs[base_register], base_wide)
+
+        mask = 2**register.size - 1
+        clear = ~(mask << offset) & (2**base_size - 1)
+
+        value = value & self.__scalar(mask, value.dtype == object)
+        value = self.__cast(value, base_wide) << self.__scalar(offset, base_wide)
+
+        self.__regs[base_register] = (base_value & self.__scalar(clear, base_wide)) | value
+
+        # Keep track of native register writes.
+        if register.name in self.__arch.registers_gp_all:
+            self.__regs_written.add(register.name)
+
+    # Array auxiliary methods
+    # ======================================================================== #
+    def __to_array(self, values, wide):
+        return numpy.array(values, dtype=object if wide else numpy.uint64)
+
+    def __scalar(self, value, wide):
+        return value if wide else numpy.uint64(value)
+
+    def __cast(self, value, wide):
+        if wide and value.dtype != object:
+            value = value.astype(object)
+        elif not wide and value.dtype != numpy.uint64:
+            value = value.astype(numpy.uint64)
+
+        return value
+
+    def __is_wide(self, instr):
+        return any(oprnd.size > 64 for oprnd in instr.operands
+                   if not isinstance(oprnd, ReilEmptyOperand))
+
+    def __check_divisor(self, value, wide):
+        is_zero = value == self.__scalar(0, wide)
+
+        self.__faults |= is_zero
+
+        return numpy.where(is_zero, self.__scalar(1, wide), value)
+
+    def __negate(self, value, size, wide):
+        return (self.__scalar(0, wide) - value) & self.__scalar(2**size - 1, wide)
+
+    def __shift_left(self, value, amount, size, wide):
+        # Shifts larger than the destination size clear all its bits.
+        if wide:
+            return self.__to_array([0 if s >= size else v << s for v, s in zip(value, amount)], wide)
+
+        large = amount >= numpy.uint64(64)
+        amount = numpy.where(large, numpy.uint64(0), amount)
+
+        return numpy.where(large, numpy.uint64(0), value << amount)
+
+    def __shift_right(self, value, amount, size, wide):
+        # Shifts larger than the source size clear all its bits.
+        if wide:
+            return self.__to_array([0 if s >= size else v >> s for v, s in zip(value, amount)], wide)
+
+        large = amount >= numpy.uint64(64)
+        amount = numpy.where(large, numpy.uint64(0), amount)
+
+        return numpy.where(large, numpy.uint64(0), value >> amount)
+
+    # ======================================================================== #
+    # REIL instructions implementation
+    # ======================================================================== #
+
+    # Arithmetic and bitwise instructions
+    # ======================================================================== #
+    def __execute_binary_op(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_val = self.read_operand(instr.operands[0], wide)
+        op1_val = self.read_operand(instr.operands[1], wide)
+
+        if instr.mnemonic in [ReilMnemonic.DIV, ReilMnemonic.MOD]:
+            op1_val = self.__check_divisor(op1_val, wide)
+
+        op2_val = self.__binary_ops[instr.mnemonic](op0_val, op1_val)
+
+        self.write_operand(instr.operands[2], op2_val)
+
+    def __execute_bsh(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_val = self.read_operand(instr.operands[0], wide)
+        op1_val = self.read_operand(instr.operands[1], wide)
+
+        op0_size = instr.operands[0].size
+        op1_size = instr.operands[1].size
+        op2_size = instr.operands[2].size
+
+        # A negative shift amount (sign bit set) means a right shift.
+        op1_sign = (op1_val >> self.__scalar(op1_size - 1, wide)) & self.__scalar(1, wide)
+        op1_sign = op1_sign == self.__scalar(1, wide)
+
+        right_amount = numpy.where(op1_sign, self.__negate(op1_val, op1_size, wide), self.__scalar(0, wide))
+        left_amount = numpy.where(op1_sign, self.__scalar(0, wide), op1_val)
+
+        op2_val = numpy.where(op1_sign,
+                              self.__shift_right(op0_val, right_amount, op0_size, wide),
+                              self.__shift_left(op0_val, left_amount, op2_size, wide))
+
+        self.write_operand(instr.operands[2], op2_val)
+
+    def __execute_signed_op(self, instr):
+        wide = self.__is_wide(instr)
+
+        oprnd0, oprnd1, oprnd2 = instr.operands
+
+        op0_val = self.read_operand(oprnd0, wide)
+        op1_val = self.read_operand(oprnd1, wide)
+
+        one = self.__scalar(1, wide)
+        mask = self.__scalar(2**oprnd2.size - 1, wide)
+
+        op0_sign = (op0_val >> self.__scalar(oprnd0.size - 1, wide)) & one
+        op1_sign = (op1_val >> self.__scalar(oprnd1.size - 1, wide)) & one
+
+        op0_abs = numpy.where(op0_sign == one, self.__negate(op0_val, oprnd0.size, wide), op0_val)
+        op1_abs = numpy.where(op1_sign == one, self.__negate(op1_val, oprnd1.size, wide), op1_val)
+
+        quotient = op0_abs // self.__check_divisor(op1_abs, wide)
+        quotient = numpy.where((op0_sign ^ op1_sign) == one, self.__negate(quotient, oprnd2.size, wide), quotient) & mask
+
+        if instr.mnemonic == ReilMnemonic.SDIV:
+            op2_val = quotient
+        else:
+            op2_val = (op0_val - op1_val * quotient) & mask
+
+        self.write_operand(oprnd2, op2_val)
+
+    # Data transfer instructions
+    # ======================================================================== #
+    def __execute_ldm(self, instr):
+        op0_val = self.read_operand(instr.operands[0])
+
+        size = instr.operands[2].size
+
+        values = [mem.read(int(addr), size / 8) for mem, addr in zip(self.__mems, op0_val)]
+
+        self.write_operand(instr.operands[2], self.__to_array(values, size > 64))
+
+    def __execute_stm(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_val = self.read_operand(instr.operands[0], wide)  # Data.
+        op2_val = self.read_operand(instr.operands[2])        # Memory address.
+
+        size = instr.operands[0].size
+
+        for mem, addr, value in zip(self.__mems, op2_val, op0_val):
+            mem.write(int(addr), size / 8, int(value))
+
+    def __execute_str(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_val = self.read_operand(instr.operands[0], wide)
+
+        self.write_operand(instr.operands[2], op0_val)
+
+    # Conditional instructions
+    # ======================================================================== #
+    def __execute_bisz(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_val = self.read_operand(instr.operands[0], wide)
+
+        op2_val = numpy.where(op0_val == self.__scalar(0, wide), self.__scalar(1, wide), self.__scalar(0, wide))
+
+        self.write_operand(instr.operands[2], op2_val)
+
+    # Other instructions
+    # ======================================================================== #
+    def __execute_undef(self, instr):
+        size = instr.operands[2].size
+
+        values = [random.randint(0, size) for _ in xrange(self.__lanes)]
+
+        self.write_operand(instr.operands[2], self.__to_array(values, size > 64))
+
+    def __execute_unkn(self, instr):
+        raise ReilCpuInvalidInstruction()
+
+    def __execute_skip(self, instr):
+        pass
+
+    # REIL extension instructions
+    # ======================================================================== #
+    def __execute_sext(self, instr):
+        wide = self.__is_wide(instr)
+
+        op0_size = instr.operands[0].size
+        op2_size = instr.operands[2].size
+
+        op0_val = self.read_operand(instr.operands[0], wide)
+        op0_msb = (op0_val >> self.__scalar(op0_size - 1, wide)) & self.__scalar(1, wide)
+
+        op2_mask = self.__scalar((2**op2_size-1) & ~(2**op0_size-1), wide)
+
+        op2_val = numpy.where(op0_msb == self.__scalar(1, wide), op0_val | op2_mask, op0_val)
+
+        self.write_operand(instr.operands[2], op2_val)
@@ -22,6 +22,11 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from barf.core.reil.reil import ReilMnemonic
+from barf.core.reil.reil import ReilRegisterOperand
+from barf.utils.utils import extract_sign_bit
+from barf.utils.utils import twos_complement
+
 
 def split_address(reil_address):
     return reil_address >> 0x08, reil_address & 0xff
@@ -33,3 +38,90 @@ def to_reil_address(asm_address, offset=0x0):
 
 def to_asm_address(reil_address):
     return reil_address >> 0x08
+
+
+# Instructions that write their third operand.
+REIL_WRITE_MNEMONICS = (
+    ReilMnemonic.ADD, ReilMnemonic.SUB, ReilMnemonic.MUL, ReilMnemonic.DIV, ReilMnemonic.MOD, ReilMnemonic.BSH,
+    ReilMnemonic.AND, ReilMnemonic.OR, ReilMnemonic.XOR,
+    ReilMnemonic.LDM, ReilMnemonic.STR,
+    ReilMnemonic.BISZ,
+    ReilMnemonic.UNDEF,
+    ReilMnemonic.SEXT, ReilMnemonic.SDIV, ReilMnemonic.SMOD,
+)
+
+
+def is_temporal_register(name):
+    """Return whether a register name refers to a temporal register
+    (t0, t1, ...).
+    """
+    return name[0] == "t" and name[1:].isdigit()
+
+
+def read_registers(instr):
+    """Return the names of the registers read by a REIL instruction.
+    """
+    if instr.mnemonic in [ReilMnemonic.STM, ReilMnemonic.JCC]:
+        oprnds = instr.operands
+    elif instr.mnemonic in [ReilMnemonic.UNDEF, ReilMnemonic.UNKN, ReilMnemonic.NOP]:
+        oprnds = []
+    else:
+        oprnds = instr.operands[:2]
+
+    return [oprnd.name for oprnd in oprnds if isinstance(oprnd, ReilRegisterOperand)]
+
+
+def written_registers(instr):
+    """Return the names of the registers written by a REIL instruction.
+    """
+    oprnd = instr.operands[2]
+
+    if instr.mnemonic in REIL_WRITE_MNEMONICS and isinstance(oprnd, ReilRegisterOperand):
+        return [oprnd.name]
+
+    return []
+
+
+def evaluate(instr, op0_val, op1_val):
+    """Evaluate a REIL instruction that writes a register given the
+    values of its source operands. Return None if the result can not
+    be computed (LDM, UNDEF or division by zero).
+    """
+    binary_ops = {
+        ReilMnemonic.ADD: lambda a, b: a + b,
+        ReilMnemonic.SUB: lambda a, b: a - b,
+        ReilMnemonic.MUL: lambda a, b: a * b,
+        ReilMnemonic.DIV: lambda a, b: a / b,
+        ReilMnemonic.MOD: lambda a, b: a % b,
+        ReilMnemonic.AND: lambda a, b: a & b,
+        ReilMnemonic.OR:  lambda a, b: a | b,
+        ReilMnemonic.XOR: lambda a, b: a ^ b,
+    }
+
+    oprnd0, oprnd1, oprnd2 = instr.operands
+
+    if instr.mnemonic in binary_ops:
+        if instr.mnemonic in [ReilMnemonic.DIV, ReilMnemonic.MOD] and op1_val == 0:
+            return None
+
+        result = binary_ops[instr.mnemonic](op0_val, op1_val)
+    elif instr.mnemonic == ReilMnemonic.BSH:
+        if extract_sign_bit(op1_val, oprnd1.size) == 0:
+            result = op0_val << op1_val
+        else:
+            result = op0_val >> twos_complement(op1_val, oprnd1.size)
+    elif instr.mnemonic == ReilMnemonic.STR:
+        result = op0_val
+    elif instr.mnemonic == ReilMnemonic.BISZ:
+        result = 1 if op0_val == 0 else 0
+    elif instr.mnemonic == ReilMnemonic.SEXT:
+        if extract_sign_bit(op0_val, oprnd0.size) == 1:
+            result = op0_val | ((2**oprnd2.size - 1) & ~(2**oprnd0.size - 1))
+        else:
+            result = op0_val
+    else:
+        # LDM, UNDEF, SDIV and SMOD.
+        return None
+
+    return result & (2**oprnd2.size - 1)
+
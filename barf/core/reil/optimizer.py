@@ -0,0 +1,536 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This module implements an optimizer for REIL code. It runs a pipeline
+of passes over the translation of a straight-line sequence of native
+instructions (typically, a basic block):
+
+    * Constant folding
+    * Copy propagation
+    * STR chain collapsing
+    * Dead code elimination (of temporaries and flags, mostly)
+
+Control can only enter a block through its first instruction. Native
+registers are regarded as live at the end of the block and at every
+branch that leaves it. JCC instructions that target an instruction of
+the same native instruction (for example, the ones generated for REP
+prefixed instructions) are supported.
+
+"""
+
+import logging
+import re
+
+from barf.core.reil import ReilEmptyOperand
+from barf.core.reil import ReilImmediateOperand
+from barf.core.reil import ReilInstruction
+from barf.core.reil import ReilMnemonic
+from barf.core.reil import ReilRegisterOperand
+from barf.core.reil.builder import ReilBuilder
+from barf.core.reil.container import ReilContainer
+from barf.core.reil.container import ReilSequence
+from barf.core.reil.helpers import evaluate
+from barf.core.reil.helpers import read_registers
+from barf.core.reil.helpers import split_address
+from barf.core.reil.helpers import written_registers
+
+logger = logging.getLogger(__name__)
+
+temporary_register_regex = r"^t\d+$"
+
+# Instructions that can be removed if the register they write is dead.
+removable_mnemonics = [
+    ReilMnemonic.ADD, ReilMnemonic.SUB, ReilMnemonic.MUL, ReilMnemonic.BSH,
+    ReilMnemonic.AND, ReilMnemonic.OR, ReilMnemonic.XOR,
+    ReilMnemonic.STR,
+    ReilMnemonic.BISZ,
+    ReilMnemonic.UNDEF, ReilMnemonic.NOP,
+    ReilMnemonic.SEXT,
+]
+
+# Instructions that can be folded if their operands are constant.
+foldable_mnemonics = [
+    ReilMnemonic.ADD, ReilMnemonic.SUB, ReilMnemonic.MUL, ReilMnemonic.DIV, ReilMnemonic.MOD, ReilMnemonic.BSH,
+    ReilMnemonic.AND, ReilMnemonic.OR, ReilMnemonic.XOR,
+    ReilMnemonic.BISZ,
+    ReilMnemonic.SEXT,
+]
+
+# Instructions that can be deleted if their divisor is not zero.
+division_mnemonics = [
+    ReilMnemonic.DIV, ReilMnemonic.MOD, ReilMnemonic.SDIV, ReilMnemonic.SMOD,
+]
+
+
+class ReilOptimizer(object):
+
+    """REIL optimizer.
+    """
+
+    def __init__(self, arch_info, fold_constants=True, propagate_copies=True,
+                 collapse_str_chains=True, eliminate_dead_code=True, max_iterations=4):
+
+        # Architecture information (used to map sub-registers to their
+        # base register).
+        self._arch_info = arch_info
+
+        # Passes.
+        self._fold_constants = fold_constants
+        self._propagate_copies = propagate_copies
+        self._collapse_str_chains = collapse_str_chains
+        self._eliminate_dead_code = eliminate_dead_code
+
+        # Maximum number of times the pipeline is run on a block.
+        self._max_iterations = max_iterations
+
+        self._builder = ReilBuilder()
+
+    def optimize_block(self, block, live_out=None):
+        """Optimize a block, that is, a list of lists of REIL
+        instructions (one for each native instruction). Optionally,
+        the registers live at the end of the block can be specified.
+        Return a new block. Instructions are not modified.
+        """
+        block = [[self._copy_instruction(instr) for instr in instrs] for instrs in block]
+
+        base_addrs = [self._get_base_address(instrs) for instrs in block]
+
+        registers = set()
+
+        for instrs in block:
+            for instr in instrs:
+                for name in read_registers(instr) + written_registers(instr):
+                    if not self._is_temporary(name):
+                        registers.add(self._get_family(name))
+
+        if live_out is None:
+            live_out = registers
+        else:
+            live_out = set([self._get_family(name) for name in live_out])
+
+        for _ in xrange(self._max_iterations):
+            changed = False
+
+            if self._fold_constants or self._propagate_copies or self._collapse_str_chains:
+                changed |= self._propagate(block)
+
+            if self._eliminate_dead_code:
+                changed |= self._eliminate(block, live_out, registers)
+
+            if not changed:
+                break
+
+        return [self._relocate(instrs, base_addr) for instrs, base_addr in zip(block, base_addrs)]
+
+    def optimize_sequences(self, sequences, live_out=None):
+        """Optimize a list of REIL sequences that make up a block.
+        Return a list of new sequences.
+        """
+        block = self.optimize_block([list(sequence) for sequence in sequences], live_out)
+
+        sequences_new = []
+
+        for sequence, instrs in zip(sequences, block):
+            sequence_new = ReilSequence(assembly=sequence.assembly)
+
+            for instr in instrs:
+                sequence_new.append(instr)
+
+            sequence_new.next_sequence_address = sequence.next_sequence_address
+
+            sequences_new.append(sequence_new)
+
+        return sequences_new
+
+    def optimize_sequence(self, sequence, live_out=None):
+        """Optimize a REIL sequence. Return a new sequence.
+        """
+        return self.optimize_sequences([sequence], live_out)[0]
+
+    def optimize_container(self, container):
+        """Optimize each sequence of a REIL container (as control flow
+        between sequences is not known, every native register is
+        regarded as live at the end of each one). Return a new
+        container.
+        """
+        container_new = ReilContainer()
+
+        for sequence in container.sequences:
+            container_new.add(self.optimize_sequence(sequence))
+
+        return container_new
+
+    # Passes
+    # ======================================================================== #
+    def _propagate(self, block):
+        """Constant folding, copy propagation and STR chain collapsing
+        (forward).
+        """
+        changed = False
+
+        values = {}
+
+        for instrs in block:
+            targets = self._get_local_targets(instrs)
+
+            # Temporaries do not live across native instructions.
+            values = dict([(name, oprnd) for name, oprnd in values.items()
+                           if not self._is_temporary(name) and
+                           not (isinstance(oprnd, ReilRegisterOperand) and self._is_temporary(oprnd.name))])
+
+            for index, instr in enumerate(instrs):
+                # Nothing is known at the target of a jump.
+                if index in targets:
+                    values = {}
+
+                if instr is None:
+                    continue
+
+                instr_new = self._rewrite(instr, values)
+
+                if instr_new is not instr:
+                    instrs[index] = instr_new
+
+                    changed = True
+
+                self._update_values(instr_new, values)
+
+        return changed
+
+    def _eliminate(self, block, live_out, registers):
+        """Dead code elimination (backward).
+        """
+        changed = False
+
+        live = set(live_out)
+
+        for instrs in reversed(block):
+            live_at = self._compute_liveness(instrs, live, registers)
+
+            for index, instr in enumerate(instrs):
+                if instr is not None and self._is_dead(instr, live_at[index][0]):
+                    instrs[index] = None
+
+                    changed = True
+
+            # Temporaries can be read by later native instructions (for
+            # instance, by deferred flag updates), so they are kept.
+            live = set(live_at[0][1])
+
+        return changed
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def _rewrite(self, instr, values):
+        """Replace source operands by known values and fold the
+        instruction, if possible.
+        """
+        if instr.mnemonic in [ReilMnemonic.STM, ReilMnemonic.JCC]:
+            indexes = [0, 2]
+        elif instr.mnemonic in [ReilMnemonic.UNDEF, ReilMnemonic.UNKN, ReilMnemonic.NOP]:
+            indexes = []
+        elif instr.mnemonic in [ReilMnemonic.LDM, ReilMnemonic.STR, ReilMnemonic.BISZ, ReilMnemonic.SEXT]:
+            indexes = [0]
+        else:
+            indexes = [0, 1]
+
+        oprnds = list(instr.operands)
+
+        for index in indexes:
+            oprnd = oprnds[index]
+
+            if not isinstance(oprnd, ReilRegisterOperand) or oprnd.name not in values:
+                continue
+
+            value = values[oprnd.name]
+
+            if isinstance(value, ReilImmediateOperand):
+                if self._fold_constants:
+                    oprnds[index] = ReilImmediateOperand(value.immediate, oprnd.size)
+            elif value.size == oprnd.size:
+                if self._propagate_copies or (self._collapse_str_chains and instr.mnemonic == ReilMnemonic.STR):
+                    oprnds[index] = value
+            elif self._collapse_str_chains and instr.mnemonic == ReilMnemonic.STR:
+                # The value of the intermediate register is the source
+                # one, truncated or zero-extended.
+                if oprnd.size >= min(value.size, oprnds[2].size):
+                    oprnds[index] = value
+
+        if self._fold_constants:
+            if instr.mnemonic in foldable_mnemonics and \
+               all(isinstance(oprnds[index], ReilImmediateOperand) for index in indexes):
+                oprnd0, oprnd1, oprnd2 = oprnds
+
+                op0_val = oprnd0.immediate
+                op1_val = oprnd1.immediate if instr.mnemonic not in [ReilMnemonic.BISZ, ReilMnemonic.SEXT] else None
+
+                result = evaluate(instr, op0_val, op1_val)
+
+                if result is not None:
+                    return self._build(ReilMnemonic.STR, [ReilImmediateOperand(result, oprnd2.size),
+                                                         ReilEmptyOperand(), oprnd2], instr)
+
+            # Branches that are never taken.
+            if instr.mnemonic == ReilMnemonic.JCC and \
+               isinstance(oprnds[0], ReilImmediateOperand) and oprnds[0].immediate == 0:
+                return self._build(ReilMnemonic.NOP, [], instr)
+
+        if oprnds != instr.operands:
+            return self._build(instr.mnemonic, oprnds, instr)
+
+        return instr
+
+    def _update_values(self, instr, values):
+        """Update known values after executing an instruction.
+        """
+        if instr.mnemonic == ReilMnemonic.UNKN:
+            values.clear()
+
+            return
+
+        for name in written_registers(instr):
+            family = self._get_family(name)
+
+            for key, value in values.items():
+                if self._get_family(key) == family or \
+                   (isinstance(value, ReilRegisterOperand) and self._get_family(value.name) == family):
+                    del values[key]
+
+            if instr.mnemonic != ReilMnemonic.STR:
+                continue
+
+            oprnd0, _, oprnd2 = instr.operands
+
+            if isinstance(oprnd0, ReilImmediateOperand):
+                values[name] = ReilImmediateOperand(oprnd0.immediate, oprnd2.size)
+            elif isinstance(oprnd0, ReilRegisterOperand) and self._get_family(oprnd0.name) != family:
+                values[name] = oprnd0
+
+    def _compute_liveness(self, instrs, live_end, registers):
+        """Compute the registers live before and after each instruction
+        of a native instruction. Return a list of (live after, live
+        before) tuples (the last one holds the registers live at the
+        end).
+        """
+        base_addr = self._get_base_address(instrs)
+
+        live_at = [(set(), set()) for _ in xrange(len(instrs))] + [(live_end, live_end)]
+
+        changed = True
+
+        while changed:
+            changed = False
+
+            for index in xrange(len(instrs) - 1, -1, -1):
+                instr = instrs[index]
+
+                live = live_at[index + 1][1]
+
+                if instr is not None and instr.mnemonic == ReilMnemonic.JCC:
+                    oprnd0, _, oprnd2 = instr.operands
+
+                    target = self._get_local_target(oprnd2, base_addr)
+
+                    if target is None:
+                        live_taken = registers
+                    else:
+                        live_taken = live_at[min(target, len(instrs))][1]
+
+                    if isinstance(oprnd0, ReilImmediateOperand):
+                        live = set(live_taken)
+                    else:
+                        live = live | live_taken
+
+                live_before = self._transfer(instr, live, registers)
+
+                if live_at[index] != (live, live_before):
+                    live_at[index] = (live, live_before)
+
+                    changed = True
+
+        return live_at
+
+    def _transfer(self, instr, live, registers):
+        """Return the registers live before an instruction.
+        """
+        if instr is None or self._is_dead(instr, live):
+            return live
+
+        live = set(live)
+
+        if instr.mnemonic == ReilMnemonic.UNKN:
+            return live | registers
+
+        for name in written_registers(instr):
+            family = self._get_family(name)
+
+            # Partial writes keep the rest of the register.
+            if family == name:
+                live.discard(family)
+
+        for name in read_registers(instr):
+            live.add(self._get_family(name))
+
+        return live
+
+    def _is_dead(self, instr, live):
+        """Return whether an instruction can be removed.
+        """
+        if instr.mnemonic == ReilMnemonic.NOP:
+            return True
+
+        if instr.mnemonic in division_mnemonics:
+            oprnd1 = instr.operands[1]
+
+            if not isinstance(oprnd1, ReilImmediateOperand) or oprnd1.immediate == 0:
+                return False
+        elif instr.mnemonic not in removable_mnemonics:
+            return False
+
+        return not any(self._get_family(name) in live for name in written_registers(instr))
+
+    def _relocate(self, instrs, base_addr):
+        """Remove deleted instructions and update addresses and local
+        jump targets.
+        """
+        if base_addr is None:
+            return [instr for instr in instrs if instr is not None]
+
+        # Map old indexes to new ones.
+        indexes = [None] * (len(instrs) + 1)
+        count = len([instr for instr in instrs if instr is not None])
+
+        indexes[len(instrs)] = count
+
+        for index in xrange(len(instrs) - 1, -1, -1):
+            if instrs[index] is not None:
+                count -= 1
+
+            indexes[index] = count
+
+        instrs_new = []
+
+        for instr in instrs:
+            if instr is None:
+                continue
+
+            instr.address = (base_addr << 8) | len(instrs_new)
+
+            oprnd2 = instr.operands[2]
+
+            if instr.mnemonic == ReilMnemonic.JCC:
+                target = self._get_local_target(oprnd2, base_addr)
+
+                if target is not None:
+                    target = (base_addr << 8) | indexes[min(target, len(instrs))]
+
+                    instr.operands = [instr.operands[0], instr.operands[1],
+                                      ReilImmediateOperand(target, oprnd2.size)]
+
+            instrs_new.append(instr)
+
+        # Keep a valid target for jumps to the end of the native
+        # instruction, and at least one instruction (so the sequence
+        # keeps its address).
+        targets = [instr for instr in instrs_new if instr.mnemonic == ReilMnemonic.JCC and
+                   self._get_local_target(instr.operands[2], base_addr) == len(instrs_new)]
+
+        if not instrs_new or targets:
+            instrs_new.append(self._build(ReilMnemonic.NOP, []))
+
+            instrs_new[-1].address = (base_addr << 8) | (len(instrs_new) - 1)
+
+        return instrs_new
+
+    def _get_local_targets(self, instrs):
+        """Return the indexes of the instructions of a native
+        instruction that are target of a jump.
+        """
+        base_addr = self._get_base_address(instrs)
+
+        targets = set()
+
+        for instr in instrs:
+            if instr is not None and instr.mnemonic == ReilMnemonic.JCC:
+                target = self._get_local_target(instr.operands[2], base_addr)
+
+                if target is not None:
+                    targets.add(target)
+
+        return targets
+
+    def _get_local_target(self, oprnd, base_addr):
+        """Return the index of the target of a jump if it is in the
+        same native instruction, None otherwise.
+        """
+        if not isinstance(oprnd, ReilImmediateOperand):
+            return None
+
+        target_base_addr, index = split_address(oprnd.immediate)
+
+        return index if target_base_addr == base_addr else None
+
+    def _get_base_address(self, instrs):
+        for instr in instrs:
+            if instr is not None and instr.address is not None:
+                return split_address(instr.address)[0]
+
+        return None
+
+    def _get_family(self, name):
+        """Return the base register of a register. Flags are regarded
+        as registers on their own.
+        """
+        if name in self._arch_info.alias_mapper:
+            base, _ = self._arch_info.alias_mapper[name]
+
+            if self._arch_info.registers_size.get(name, 0) > 1:
+                return base
+
+        return name
+
+    def _is_temporary(self, name):
+        return re.match(temporary_register_regex, name) is not None
+
+    def _build(self, mnemonic, oprnds, instr=None):
+        oprnds = oprnds + [ReilEmptyOperand() for _ in xrange(3 - len(oprnds))]
+
+        instr_new = self._builder.build(mnemonic, *oprnds)
+
+        if instr:
+            instr_new.address = instr.address
+            instr_new.comment = instr.comment
+
+        return instr_new
+
+    def _copy_instruction(self, instr):
+        instr_new = ReilInstruction()
+
+        instr_new.mnemonic = instr.mnemonic
+        instr_new.operands = list(instr.operands)
+        instr_new.address = instr.address
+        instr_new.comment = instr.comment
+
+        return instr_new
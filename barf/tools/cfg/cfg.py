@@ -31,6 +31,7 @@ import os
 import sys
 import time
 
+from barf.analysis.graphs import AnalysisCache
 from barf.barf import BARF
 from barf.core.symbols import load_symbols
 from barf.tools.common import create_output_dir
@@ -112,6 +113,17 @@ def init_parser():
         action="store_true",
         help="Print process time.")
 
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to recover all functions.")
+
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="Analysis cache file (recovered CFGs are loaded from and stored in it).")
+
     parser.add_argument(
         "-d", "--output-dir",
         type=str,
@@ -187,21 +199,27 @@ def main():
     else:
         symbols_by_addr = load_symbols(filename)
 
+    # Open analysis cache.
+    cache = AnalysisCache(args.cache) if args.cache else None
+
     # Recover CFGs.
     print("[+] Recovering CFGs...")
 
     output_dir = create_output_dir(args.output_dir + os.path.sep + filename.split(os.path.sep)[-1] + "_cfg")
 
     if args.recover_all:
-        cfgs = recover_cfg_all(barf, symbols_by_addr)
+        cfgs = recover_cfg_all(barf, symbols_by_addr, translate=args.show_reil, jobs=args.jobs, cache=cache)
 
     if args.recover:
         addresses = [int(addr, 16) for addr in args.recover.split(",")]
 
-        cfgs = recover_cfg_some(barf, addresses, symbols_by_addr)
+        cfgs = recover_cfg_some(barf, addresses, symbols_by_addr, translate=args.show_reil, cache=cache)
 
     print("[+] Number of CFGs recovered: {:d}".format(len(cfgs)))
 
+    if cache:
+        cache.close()
+
     # Saving CFGs to files.
     print("[+] Saving CFGs...")
 
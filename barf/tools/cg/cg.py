@@ -29,6 +29,7 @@ import os
 import sys
 import time
 
+from barf.analysis.graphs import AnalysisCache
 from barf.analysis.graphs.callgraph import CallGraph
 from barf.barf import BARF
 from barf.core.symbols import load_symbols
@@ -65,6 +66,17 @@ def init_parser():
         action="store_true",
         help="Print process time.")
 
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to recover all functions.")
+
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="Analysis cache file (recovered CFGs are loaded from and stored in it).")
+
     group = parser.add_mutually_exclusive_group()
 
     group.add_argument(
@@ -115,19 +127,25 @@ def main():
     else:
         symbols_by_addr = load_symbols(filename)
 
+    # Open analysis cache.
+    cache = AnalysisCache(args.cache) if args.cache else None
+
     # Recover CFGs.
     print("[+] Recovering CFGs...")
 
     if args.recover_all:
-        cfgs = recover_cfg_all(barf, symbols_by_addr)
+        cfgs = recover_cfg_all(barf, symbols_by_addr, translate=False, jobs=args.jobs, cache=cache)
 
     if args.recover:
         addresses = [int(addr, 16) for addr in args.recover.split(",")]
 
-        cfgs = recover_cfg_some(barf, addresses, symbols_by_addr)
+        cfgs = recover_cfg_some(barf, addresses, symbols_by_addr, translate=False, cache=cache)
 
     print("[+] Number of CFGs recovered: {:d}".format(len(cfgs)))
 
+    if cache:
+        cache.close()
+
     # Recover CG.
     print("[+] Recovering program CG...")
 
@@ -55,18 +55,19 @@ def load_symbols_from_file(filename):
     return symbols_by_addr
 
 
-def recover_cfg_some(barf, addresses, symbols_by_addr):
+def recover_cfg_some(barf, addresses, symbols_by_addr, translate=True, cache=None):
     cfgs = []
 
     for addr in sorted(addresses):
-        cfg = barf.recover_cfg(start=addr, symbols=symbols_by_addr, callback=print_recovery_status)
+        cfg = barf.recover_cfg(start=addr, symbols=symbols_by_addr, callback=print_recovery_status,
+                               translate=translate, cache=cache)
 
         cfgs.append(cfg)
 
     return cfgs
 
 
-def recover_cfg_all(barf, symbols_by_addr):
+def recover_cfg_all(barf, symbols_by_addr, translate=True, jobs=1, cache=None):
     if len(symbols_by_addr) > 0:
         print("[+] Recovering from symbols")
 
@@ -76,7 +77,8 @@ def recover_cfg_all(barf, symbols_by_addr):
 
         entries = [barf.binary.entry_point]
 
-    cfgs = barf.recover_cfg_all(entries, symbols=symbols_by_addr, callback=print_recovery_status)
+    cfgs = barf.recover_cfg_all(entries, symbols=symbols_by_addr, callback=print_recovery_status,
+                                translate=translate, jobs=jobs, cache=cache)
 
     return cfgs
 
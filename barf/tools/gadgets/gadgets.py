@@ -27,6 +27,7 @@
 from __future__ import print_function
 
 import argparse
+import hashlib
 import os
 import sys
 import time
@@ -35,6 +36,7 @@ from pygments import highlight
 from pygments.formatters import TerminalFormatter
 from pygments.lexers.asm import NasmLexer
 
+from barf.analysis.gadgets.database import GadgetDatabase
 from barf.analysis.gadgets.gadget import GadgetType
 from barf.barf import BARF
 
@@ -43,13 +45,15 @@ def filter_duplicates(candidates):
 
     gadgets = {}
 
+    # Gadgets with the same (normalized) IR code are duplicates, even if
+    # their encodings differ.
     for cand in candidates:
-        asm_instrs = " ; ".join([str(instr) for instr in cand.instrs])
+        fingerprint = cand.ir_fingerprint
 
-        if asm_instrs not in gadgets:
-            gadgets[asm_instrs] = cand
+        if fingerprint not in gadgets:
+            gadgets[fingerprint] = cand
 
-    return [cand for asm_instrs, cand in gadgets.items()]
+    return [cand for fingerprint, cand in gadgets.items()]
 
 
 def sort_gadgets_by_type(gadgets):
@@ -321,13 +325,22 @@ def init_parser():
         choices=[8, 16, 32, 64],
         help="Filter verified gadgets by operands register size.")
 
+    parser.add_argument(
+        "--db",
+        type=str,
+        default=None,
+        help="Gadget database file. Reuse (and store) gadgets, classification and verification results.")
+
     return parser
 
 
-def do_find(b, args):
+def do_find(b, args, db=None, binary_hash=None):
     start = time.time()
 
-    candidates = b.gadget_finder.find(b.binary.ea_start, b.binary.ea_end, byte_depth=args.bdepth, instrs_depth=args.idepth)
+    if db:
+        candidates = db.find(b.gadget_finder, b.binary.ea_start, b.binary.ea_end, byte_depth=args.bdepth, instrs_depth=args.idepth, binary_hash=binary_hash)
+    else:
+        candidates = b.gadget_finder.find(b.binary.ea_start, b.binary.ea_end, byte_depth=args.bdepth, instrs_depth=args.idepth)
 
     end = time.time()
     find_time = end - start
@@ -342,13 +355,21 @@ def do_find(b, args):
     return candidates, find_time
 
 
-def do_classify(b, gadgets, args):
+def do_classify(b, gadgets, args, db=None):
     start = time.time()
 
     classified = []
 
     for gadget in gadgets:
-        classified += b.gadget_classifier.classify(gadget)
+        typed_gadgets = db.load_classification(gadget) if db else None
+
+        if typed_gadgets is None:
+            typed_gadgets = b.gadget_classifier.classify(gadget)
+
+            if db:
+                db.store_classification(gadget, typed_gadgets)
+
+        classified += typed_gadgets
 
     end = time.time()
 
@@ -357,14 +378,20 @@ def do_classify(b, gadgets, args):
     return classified, classify_time
 
 
-def do_verify(b, classified, args):
+def do_verify(b, classified, args, db=None):
     start = time.time()
 
     verified = []
     invalid = []
 
     for gadget in classified:
-        valid = b.gadget_verifier.verify(gadget)
+        if db and gadget.verified:
+            valid = gadget.is_valid
+        else:
+            valid = b.gadget_verifier.verify(gadget)
+
+            if db:
+                db.store_verification(gadget, valid)
 
         if valid:
             gadget.is_valid = True
@@ -392,23 +419,20 @@ def do_verify(b, classified, args):
     # Filter duplicate gadgets.
     if args.unique:
         verified_by_type = {}
+        verified_distinct = []
 
         for gadget in verified:
             if gadget.type not in verified_by_type:
-                verified_by_type[gadget.type] = []
+                verified_by_type[gadget.type] = set()
 
             gadgets = verified_by_type[gadget.type]
 
-            if not any(gadget == another for another in gadgets):
-                gadgets += [gadget]
+            if gadget not in gadgets:
+                gadgets.add(gadget)
+                verified_distinct += [gadget]
             else:
                 discarded += [gadget]
 
-        verified_distinct = []
-
-        for _, gadgets in verified_by_type.items():
-            verified_distinct += gadgets
-
         verified = verified_distinct
 
         end = time.time()
@@ -455,14 +479,24 @@ def main():
     if args.verify:
         args.classify = True
 
+    # Open gadget database.
+    db = None
+    binary_hash = None
+
+    if args.db:
+        db = GadgetDatabase(args.db)
+
+        with open(filename, "rb") as f:
+            binary_hash = hashlib.sha1(f.read()).hexdigest()
+
     # Find gadgets.
-    candidates, find_time = do_find(barf, args)
+    candidates, find_time = do_find(barf, args, db, binary_hash)
 
     print_gadgets_raw(candidates, output_fd, args.sort, args.color, "Raw Gadgets", args.show_binary)
 
     # Classify gadgets.
     if args.classify:
-        classified, classify_time = do_classify(barf, candidates, args)
+        classified, classify_time = do_classify(barf, candidates, args, db)
 
         if args.show_classification:
             print_gadgets_typed(classified, output_fd, address_size, "Classified Gadgets")
@@ -470,7 +504,7 @@ def main():
     # Verify gadgets.
     if args.verify:
         if barf.gadget_verifier:
-            verified, verify_time, discarded, invalid = do_verify(barf, classified, args)
+            verified, verify_time, discarded, invalid = do_verify(barf, classified, args, db)
 
             print_gadgets_typed(verified, output_fd, address_size, "Verified Gadgets")
 
@@ -548,6 +582,10 @@ def main():
 
         summary_fd.close()
 
+    # Close gadget database.
+    if db:
+        db.close()
+
     # Close output file.
     if args.output:
         output_fd.close()
@@ -23,6 +23,8 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import argparse
+import collections
+import multiprocessing
 import sys
 
 from pygments import highlight
@@ -37,18 +39,37 @@ from barf.arch import ARCH_X86_MODE_64
 from barf.arch.emulator import Emulator
 from barf.arch.x86 import X86ArchitectureInformation
 from barf.arch.x86.disassembler import X86Disassembler
-from barf.arch.x86.helpers import compare_contexts
+from barf.arch.x86.helpers import compare_registers
 from barf.arch.x86.helpers import fix_flags
 from barf.arch.x86.helpers import print_contexts
 from barf.arch.x86.parser import X86Parser
 from barf.arch.x86.trace import AsmTrace
 from barf.arch.x86.trace import AsmTraceAnalyzer
+from barf.arch.x86.trace import convert_trace
+from barf.arch.x86.trace import is_binary_trace
+from barf.arch.x86.trace import parse_binary_trace
 from barf.arch.x86.trace import parse_trace
 from barf.arch.x86.translator import X86Translator
 from barf.core.binary import BinaryFile
 from barf.core.reil.emulator.emulator import ReilEmulator
 
 
+# Flags left undefined by some instructions (they are copied from the
+# trace before comparing contexts).
+undefined_flags = {
+    "bsf": ["cf", "of", "sf", "af", "pf"],
+    "bt": ["pf"],       # TODO Check.
+    "div": ["cf", "of", "sf", "zf", "af", "pf"],
+    "imul": ["pf"],     # TODO Check.
+    "shl": ["of"],      # TODO Check.
+    "shr": ["of"],      # TODO Check.
+}
+
+# Number of instructions between full context comparisons (in between,
+# only the registers written by the instruction are compared).
+FULL_CHECK = 100
+
+
 class AsmReplayAnalyzer(AsmTraceAnalyzer):
 
     def __init__(self, arch, trace, start_address, options):
@@ -59,16 +80,13 @@ class AsmReplayAnalyzer(AsmTraceAnalyzer):
         disassembler = X86Disassembler(arch.architecture_mode)
         ir_translator = X86Translator(arch.architecture_mode)
 
-        self._emulator = Emulator(arch, ReilEmulator(arch), ir_translator, disassembler)
+        self._emulator = Emulator(arch, ReilEmulator(arch, taint=False), ir_translator, disassembler,
+                                  separate_temporaries=True)
 
-        self._undefined_flags = {
-            "bsf": ["cf", "of", "sf", "af", "pf"],
-            "bt": ["pf"],       # TODO Check.
-            "div": ["cf", "of", "sf", "zf", "af", "pf"],
-            "imul": ["pf"],     # TODO Check.
-            "shl": ["of"],      # TODO Check.
-            "shr": ["of"],      # TODO Check.
-        }
+        self._undefined_flags = undefined_flags
+
+        self._full_check = options.full_check
+        self._checks = 0
 
         self._set_regs = True
         self._next_addr = start_address
@@ -84,6 +102,8 @@ class AsmReplayAnalyzer(AsmTraceAnalyzer):
             print("[+] Setting registers...")
             self._emulator.set_registers(regs)
 
+            self._checks = 0
+
         # Initialize memory.
         self._emulator.set_memory(reads)
 
@@ -140,7 +160,14 @@ class AsmReplayAnalyzer(AsmTraceAnalyzer):
             self._emulator.ir_emulator.registers[flags_reg] = fix_flags(flags_next, flags_curr, flags_undef, self._arch)
 
         # Check registers values.
-        cmp_result = compare_contexts(regs_curr, regs_next, self._emulator.ir_emulator.registers)
+        if self._checks % self._full_check == 0:
+            registers = regs_curr.keys()
+        else:
+            registers = modified_registers(self._arch, self._emulator, regs_curr)
+
+        self._checks += 1
+
+        cmp_result = compare_registers(registers, regs_next, self._emulator.ir_emulator.registers)
 
         if not cmp_result:
             print("Contexts don't match!\n\n")
@@ -156,6 +183,189 @@ class AsmReplayAnalyzer(AsmTraceAnalyzer):
         self._trace.close()
 
 
+class SegmentReplayer(object):
+
+    """Replay trace segments independently. Each segment is run on a
+    fresh emulator seeded with the registers recorded at its first
+    entry. Memory is set from the reads recorded in the segment.
+    """
+
+    def __init__(self, arch, full_check=FULL_CHECK):
+        if full_check < 1:
+            raise ValueError("Invalid full check interval: {}".format(full_check))
+
+        self._arch = arch
+        self._full_check = full_check
+
+        self._disassembler = X86Disassembler(arch.architecture_mode)
+        self._ir_translator = X86Translator(arch.architecture_mode)
+
+    def replay(self, start_index, entries):
+        """Replay a segment of a trace. The last entry is not executed,
+        it only provides the expected context of the previous one.
+        Return a list of divergences as (trace index, address,
+        instruction, description) tuples.
+        """
+        emulator = Emulator(self._arch, ReilEmulator(self._arch, taint=False), self._ir_translator,
+                            self._disassembler, separate_temporaries=True)
+
+        divergences = []
+
+        set_regs = True
+        checks = 0
+
+        for index, (asm_instr, _, reads, regs_curr) in enumerate(entries[:-1], start_index):
+            asm_instr_next, _, _, regs_next = entries[index - start_index + 1]
+
+            # Set registers if necessary (after a syscall or a
+            # divergence.)
+            if set_regs:
+                emulator.set_registers(regs_curr)
+
+                set_regs = False
+                checks = 0
+
+            # Initialize memory.
+            emulator.set_memory(reads)
+
+            try:
+                next_addr = emulator.execute(asm_instr)
+            except barf.arch.emulator.Syscall:
+                set_regs = True
+
+                continue
+            except barf.arch.emulator.InstructionNotImplemented:
+                divergences.append((index, asm_instr.address, str(asm_instr), "Instruction not implemented"))
+
+                set_regs = True
+
+                continue
+
+            if next_addr != asm_instr_next.address:
+                divergences.append((index, asm_instr.address, str(asm_instr),
+                                    "Next address mismatch: {:#x} != {:#x}".format(next_addr, asm_instr_next.address)))
+
+                set_regs = True
+
+                continue
+
+            # Fix undefined flags.
+            if asm_instr.mnemonic in undefined_flags:
+                flags_reg = self._arch.flags_register()
+
+                emulator.registers[flags_reg] = fix_flags(regs_next[flags_reg], emulator.registers[flags_reg],
+                                                          undefined_flags[asm_instr.mnemonic], self._arch)
+
+            # Check registers values (all of them after setting the
+            # registers and every *full_check* instructions).
+            if checks % self._full_check == 0:
+                registers = regs_curr.keys()
+            else:
+                registers = modified_registers(self._arch, emulator, regs_curr)
+
+            checks += 1
+
+            if not compare_registers(registers, regs_next, emulator.registers):
+                divergences.append((index, asm_instr.address, str(asm_instr),
+                                    print_contexts(regs_curr, regs_next, emulator.registers,
+                                                   skip=["eax_next", "rax_next"])))
+
+                set_regs = True
+
+        return divergences
+
+
+def replay_segments(arch, asm_trace, jobs=1, segment_size=10000, full_check=FULL_CHECK):
+    """Replay a trace split in segments of `segment_size` entries, using
+    a pool of `jobs` worker processes. Return an iterator over the
+    divergences found (see **SegmentReplayer.replay**), in trace order.
+    """
+    # Checked here as well, so workers do not fail on start up.
+    if full_check < 1:
+        raise ValueError("Invalid full check interval: {}".format(full_check))
+
+    segments = _split_trace(asm_trace, segment_size)
+
+    if jobs == 1:
+        replayer = SegmentReplayer(arch, full_check=full_check)
+
+        for start_index, entries in segments:
+            for divergence in replayer.replay(start_index, entries):
+                yield divergence
+
+        return
+
+    pool = multiprocessing.Pool(jobs, _replay_worker_init, (arch.architecture_mode, full_check))
+
+    # Bound the number of segments in flight (the trace might not fit
+    # in memory).
+    results = collections.deque()
+
+    try:
+        for segment in segments:
+            results.append(pool.apply_async(_replay_worker_run, segment))
+
+            if len(results) >= 2 * jobs:
+                for divergence in results.popleft().get():
+                    yield divergence
+
+        while results:
+            for divergence in results.popleft().get():
+                yield divergence
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _split_trace(asm_trace, segment_size):
+    # Consecutive segments share an entry (the last entry of a segment
+    # is the first one of the next).
+    entries = []
+    start_index = 0
+
+    for entry in asm_trace:
+        entries.append(entry)
+
+        if len(entries) == segment_size + 1:
+            yield start_index, entries
+
+            entries = [entry]
+            start_index += segment_size
+
+    if len(entries) > 1:
+        yield start_index, entries
+
+
+_replay_worker = {}
+
+
+def _replay_worker_init(arch_mode, full_check):
+    """Set up a replay worker process.
+    """
+    _replay_worker["replayer"] = SegmentReplayer(X86ArchitectureInformation(arch_mode), full_check=full_check)
+
+
+def _replay_worker_run(start_index, entries):
+    """Replay a trace segment in a worker process.
+    """
+    return _replay_worker["replayer"].replay(start_index, entries)
+
+
+def modified_registers(arch, emulator, context):
+    """Return the registers of `context` modified by the last instruction
+    executed by `emulator` (native registers written by its REIL
+    translation, plus the flags and the instruction pointer).
+    """
+    alias_mapper = arch.alias_mapper
+
+    registers = set([arch.flags_register(), emulator.ip])
+
+    for name in emulator.ir_emulator.written_registers:
+        registers.add(alias_mapper[name][0] if name in alias_mapper else name)
+
+    return [reg for reg in registers if reg in context]
+
+
 def format_asm_instruction(asm_instr, options):
     nasm_lexer = NasmLexer()
     term_formatter = TerminalFormatter()
@@ -189,6 +399,15 @@ class DotDict(dict):
             self[key] = value
 
 
+def _positive_int(string):
+    value = int(string)
+
+    if value < 1:
+        raise argparse.ArgumentTypeError("{} is not a positive integer".format(string))
+
+    return value
+
+
 def init_parser():
 
     description = "Tool for replaying a x86 binary trace."
@@ -219,6 +438,37 @@ def init_parser():
         type=str,
         help="start address")
 
+    arg_parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="replay the trace in segments, using JOBS processes")
+
+    arg_parser.add_argument(
+        "--segment-size",
+        type=int,
+        default=10000,
+        help="number of trace entries per segment")
+
+    arg_parser.add_argument(
+        "--full-check",
+        type=_positive_int,
+        default=FULL_CHECK,
+        help="compare the whole context every FULL_CHECK instructions (1 to always do it)")
+
+    arg_parser.add_argument(
+        "--convert",
+        type=str,
+        metavar="FILENAME",
+        help="convert the (text) trace to the compact binary format and exit")
+
+    arg_parser.add_argument(
+        "--compression",
+        type=str,
+        choices=["none", "gzip", "zstd"],
+        default="gzip",
+        help="compression of the converted trace")
+
     arg_parser.add_argument(
         "binary",
         type=str,
@@ -237,6 +487,13 @@ def main():
     parser = init_parser()
     args = parser.parse_args()
 
+    # Convert trace.
+    if args.convert:
+        print("[+] Converting trace...")
+        convert_trace(args.trace, args.convert, compression=args.compression)
+
+        sys.exit(0)
+
     # Open binary.
     binary = BinaryFile(args.binary)
 
@@ -257,15 +514,30 @@ def main():
     options.abort = args.abort
     options.color = args.color
     options.verbose = args.verbose
+    options.full_check = args.full_check
 
     print("[+] Loading trace...")
-    asm_trace = parse_trace(args.trace, X86Parser(arch_info.architecture_mode),
-                            start_address=start_address)
+    parse_fn = parse_binary_trace if is_binary_trace(args.trace) else parse_trace
+
+    asm_trace = parse_fn(args.trace, X86Parser(arch_info.architecture_mode),
+                         start_address=start_address)
 
     print("[+] Replaying trace...")
-    analyzer = AsmReplayAnalyzer(arch_info, asm_trace, start_address, options)
+    if args.jobs > 1:
+        for index, address, asm_instr, description in replay_segments(arch_info, asm_trace, jobs=args.jobs,
+                                                                      segment_size=args.segment_size,
+                                                                      full_check=args.full_check):
+            print("[-] Divergence at trace entry #{} ({:#010x}: {})".format(index, address, asm_instr))
+
+            if options.verbose:
+                print(description)
+
+            if options.abort:
+                sys.exit(1)
+    else:
+        analyzer = AsmReplayAnalyzer(arch_info, asm_trace, start_address, options)
 
-    analyzer.run()
+        analyzer.run()
 
 
 if __name__ == "__main__":
@@ -33,6 +33,7 @@ from barf.core.reil import ReilRegisterOperand
 from barf.core.reil.container import ReilContainer
 from barf.core.reil.container import ReilSequence
 from barf.core.reil.helpers import split_address
+from barf.core.reil.optimizer import ReilOptimizer
 
 
 def is_conditional_jump(instruction):
@@ -42,14 +43,15 @@ def is_conditional_jump(instruction):
 
 class ReilContainerBuilder(object):
 
-    def __init__(self, binary):
+    def __init__(self, binary, optimize=False, lazy_flags=False):
         self.__binary = binary
         self.__arch_mode = self.__binary.architecture_mode
         self.__arch = X86ArchitectureInformation(self.__arch_mode)
         self.__disassembler = X86Disassembler(self.__arch_mode)
-        self.__translator = X86Translator(self.__arch_mode)
+        self.__translator = X86Translator(self.__arch_mode, lazy_flags=lazy_flags)
         self.__bb_builder = CFGRecoverer(RecursiveDescent(self.__disassembler, self.__binary.text_section,
                                                           self.__translator, self.__arch))
+        self.__optimizer = ReilOptimizer(self.__arch) if optimize else None
 
     def build(self, functions):
         reil_container = ReilContainer()
@@ -69,26 +71,34 @@ class ReilContainerBuilder(object):
         if not reil_container:
             reil_container = ReilContainer()
 
-        asm_instrs = []
+        instr_seqs = []
 
         for bb in cfg.basic_blocks:
-            for instr in bb:
-                asm_instrs += [instr]
+            bb_instr_seqs = [self.__build_sequence(instrs) for instrs in self.__translator.translate_block(list(bb))]
 
-        reil_container = self.__translate(asm_instrs, reil_container)
+            # Optimize each basic block as a whole.
+            if self.__optimizer:
+                bb_instr_seqs = self.__optimizer.optimize_sequences(bb_instr_seqs)
+
+            instr_seqs += bb_instr_seqs
+
+        reil_container = self.__translate(instr_seqs, reil_container)
 
         return reil_container
 
-    def __translate(self, asm_instrs, reil_container):
-        asm_instr_last = None
-        instr_seq_prev = None
+    def __build_sequence(self, reil_instrs):
+        instr_seq = ReilSequence()
 
-        for asm_instr in asm_instrs:
-            instr_seq = ReilSequence()
+        for reil_instr in reil_instrs:
+            instr_seq.append(reil_instr)
 
-            for reil_instr in self.__translator.translate(asm_instr):
-                instr_seq.append(reil_instr)
+        return instr_seq
+
+    def __translate(self, instr_seqs, reil_container):
+        asm_instr_last = None
+        instr_seq_prev = None
 
+        for instr_seq in instr_seqs:
             if instr_seq_prev:
                 instr_seq_prev.next_sequence_address = instr_seq.address
 
@@ -108,16 +108,22 @@ class ExecutionCache(object):
 
     def add(self, address, instruction, container):
         # NOTE Does not take into account self modifying code.
-        if address in self.__container.keys():
+        if address in self.__container:
             raise Exception("Invalid instruction")
 
         self.__container[address] = (instruction, container)
 
     def retrieve(self, address):
-        if address not in self.__container.keys():
+        if address not in self.__container:
             # print("cache miss!")
             raise InvalidAddressError()
 
         # print("cache hit!")
 
         return self.__container[address]
+
+    def remove(self, address):
+        if address not in self.__container:
+            raise InvalidAddressError()
+
+        del self.__container[address]
@@ -19,6 +19,9 @@ setup(
         'pygments',
         'pyparsing',
     ],
+    extras_require   = {
+        'vector': ['numpy'],
+    },
     license          = 'BSD 2-Clause',
     name             = 'barf',
     classifiers      = [
@@ -0,0 +1,145 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.analysis.dataflow import ConstantPropagationAnalysis
+from barf.analysis.dataflow import LivenessAnalysis
+from barf.analysis.dataflow import ReachingDefinitionsAnalysis
+from barf.analysis.graphs import CFGRecoverer, ControlFlowGraph, RecursiveDescent
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.disassembler import X86Disassembler
+from barf.arch.x86.translator import X86Translator
+
+
+class DataflowTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_mode = ARCH_X86_MODE_32
+        self._arch_info = X86ArchitectureInformation(self._arch_mode)
+        self._disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        self._translator = X86Translator(ARCH_X86_MODE_32)
+
+        code  = "\xb8\x01\x00\x00\x00"     # 0x00 : (5) mov eax, 0x1
+        code += "\xb9\x02\x00\x00\x00"     # 0x05 : (5) mov ecx, 0x2
+        code += "\x83\xfb\x00"             # 0x0a : (3) cmp ebx, 0x0
+        code += "\x74\x05"                 # 0x0d : (2) je 0x14
+        code += "\xb9\x03\x00\x00\x00"     # 0x0f : (5) mov ecx, 0x3
+        code += "\x01\xc8"                 # 0x14 : (2) add eax, ecx
+        code += "\xb0\x05"                 # 0x16 : (2) mov al, 0x5
+        code += "\xc3"                     # 0x18 : (1) ret
+
+        strategy = RecursiveDescent(self._disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x18)
+
+        self._cfg = ControlFlowGraph(bbs, name="diamond")
+
+    def test_liveness(self):
+        analysis = LivenessAnalysis(self._cfg, self._arch_info, live_out=["eax"])
+        analysis.solve()
+
+        self.assertEquals(analysis.live_out(0x14), set(["eax"]))
+        self.assertEquals(analysis.live_in(0x14), set(["eax", "ecx", "esp"]))
+        self.assertEquals(analysis.live_in(0x0f), set(["eax", "esp"]))
+        self.assertEquals(analysis.live_out(0x00), set(["eax", "ecx", "esp"]))
+        self.assertEquals(analysis.live_in(0x00), set(["ebx", "esp"]))
+
+        # Temporaries are never live across basic blocks.
+        for bb in self._cfg.basic_blocks:
+            for name in analysis.live_in(bb.address):
+                self.assertFalse(name.startswith("t"))
+
+    def test_liveness_dead_instructions(self):
+        analysis = LivenessAnalysis(self._cfg, self._arch_info, live_out=["eax"])
+
+        dead = analysis.dead_instructions()
+
+        # The second write to ecx in the entry block is not dead...
+        self.assertFalse(any(instr.address >> 0x8 == 0x05 for instr in dead))
+
+        # ...but the flags computed by 'add eax, ecx' are.
+        self.assertTrue(any(instr.address >> 0x8 == 0x14 and instr.operands[2].name == "of" for instr in dead))
+
+    def test_reaching_definitions(self):
+        analysis = ReachingDefinitionsAnalysis(self._cfg, self._arch_info)
+        analysis.solve()
+
+        defs_ecx = lambda defs: sorted([addr >> 0x8 for addr, name in defs if name == "ecx"])
+
+        self.assertEquals(defs_ecx(analysis.reaching_in(0x00)), [])
+        self.assertEquals(defs_ecx(analysis.reaching_out(0x00)), [0x05])
+        self.assertEquals(defs_ecx(analysis.reaching_out(0x0f)), [0x0f])
+        self.assertEquals(defs_ecx(analysis.reaching_in(0x14)), [0x05, 0x0f])
+
+        # A write to a sub-register does not kill previous definitions.
+        defs_eax = lambda defs: sorted([addr >> 0x8 for addr, name in defs if name == "eax"])
+
+        self.assertEquals(defs_eax(analysis.reaching_out(0x14)), [0x14, 0x16])
+
+    def test_constant_propagation(self):
+        analysis = ConstantPropagationAnalysis(self._cfg, self._arch_info)
+        analysis.solve()
+
+        self.assertEquals(analysis.constants_in(0x00), {})
+        self.assertEquals(analysis.constants_out(0x00)["eax"], 0x1)
+        self.assertEquals(analysis.constants_out(0x00)["ecx"], 0x2)
+        self.assertEquals(analysis.constants_out(0x0f)["ecx"], 0x3)
+
+        # Values that differ among predecessors are not constant.
+        self.assertEquals(analysis.constants_in(0x14)["eax"], 0x1)
+        self.assertTrue("ecx" not in analysis.constants_in(0x14))
+        self.assertTrue("eax" not in analysis.constants_out(0x14))
+
+    def test_constant_propagation_folding(self):
+        code  = "\xb8\x01\x00\x00\x00"     # 0x00 : (5) mov eax, 0x1
+        code += "\xb9\xff\xff\xff\xff"     # 0x05 : (5) mov ecx, 0xffffffff
+        code += "\x01\xc8"                 # 0x0a : (2) add eax, ecx
+        code += "\xc1\xe1\x04"             # 0x0c : (3) shl ecx, 0x4
+        code += "\xc3"                     # 0x0f : (1) ret
+
+        strategy = RecursiveDescent(self._disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x0f)
+
+        cfg = ControlFlowGraph(bbs)
+
+        analysis = ConstantPropagationAnalysis(cfg, self._arch_info)
+
+        constants = analysis.constants_out(0x00)
+
+        self.assertEquals(constants["eax"], 0x0)
+        self.assertEquals(constants["ecx"], 0xfffffff0)
+        self.assertEquals(constants["zf"], 0x0)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.analysis.gadgets.classifier import GadgetClassifier
+from barf.analysis.gadgets.database import GadgetDatabase
+from barf.analysis.gadgets.finder import GadgetFinder
+from barf.analysis.gadgets.gadget import GadgetType
+from barf.arch import ARCH_X86
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.disassembler import X86Disassembler
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil.emulator.emulator import ReilEmulator
+
+
+class GadgetFinderMock(GadgetFinder):
+
+    def __init__(self, *args):
+        super(GadgetFinderMock, self).__init__(*args)
+
+        self.calls = []
+
+    def find(self, start_address, end_address, byte_depth=20, instrs_depth=2):
+        self.calls += [(start_address, end_address)]
+
+        return super(GadgetFinderMock, self).find(start_address, end_address, byte_depth, instrs_depth)
+
+
+class GadgetDatabaseTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+
+        self._g_classifier = GadgetClassifier(ReilEmulator(self._arch_info), self._arch_info)
+
+        self._db = GadgetDatabase(":memory:", range_size=0x8)
+
+        self._binary  = "\x89\xd8"          # 0x00 : (2) mov eax, ebx
+        self._binary += "\xc3"              # 0x02 : (1) ret
+        self._binary += "\x90" * 0x0d       # 0x03 : (1) nop
+        self._binary += "\x01\xd8"          # 0x10 : (2) add eax, ebx
+        self._binary += "\xc3"              # 0x12 : (1) ret
+        self._binary += "\x90" * 0x0d       # 0x13 : (1) nop
+        self._binary += "\x89\xc8"          # 0x20 : (2) mov eax, ecx
+        self._binary += "\xc3"              # 0x22 : (1) ret
+
+    def tearDown(self):
+        self._db.close()
+
+    def test_find(self):
+        g_finder = self.__create_finder(self._binary)
+
+        g_candidates = g_finder.find(0x00, len(self._binary) - 1, byte_depth=4, instrs_depth=2)
+        g_candidates_db = self._db.find(g_finder, 0x00, len(self._binary) - 1, byte_depth=4, instrs_depth=2)
+
+        self.assertEquals(self.__dump(g_candidates), self.__dump(g_candidates_db))
+
+        # Gadgets are loaded from the database.
+        g_finder_db = self.__create_finder(self._binary)
+
+        g_candidates_db = self._db.find(g_finder_db, 0x00, len(self._binary) - 1, byte_depth=4, instrs_depth=2)
+
+        self.assertEquals(self.__dump(g_candidates), self.__dump(g_candidates_db))
+        self.assertEquals(len(g_finder_db.calls), 0)
+
+    def test_find_incremental(self):
+        g_finder = self.__create_finder(self._binary)
+
+        self._db.find(g_finder, 0x00, len(self._binary) - 1, byte_depth=4, instrs_depth=2)
+
+        # Patch the last gadget (mov eax, ecx -> mov eax, edx).
+        binary = self._binary[:0x21] + "\xd0" + self._binary[0x22:]
+
+        g_finder_db = self.__create_finder(binary)
+
+        g_candidates_db = self._db.find(g_finder_db, 0x00, len(binary) - 1, byte_depth=4, instrs_depth=2)
+
+        # Only the ranges that can contain a gadget spanning the patched
+        # byte are processed again (3 out of 5).
+        self.assertEquals(len(g_finder_db.calls), 3)
+
+        g_candidates = self.__create_finder(binary).find(0x00, len(binary) - 1, byte_depth=4, instrs_depth=2)
+
+        self.assertEquals(self.__dump(g_candidates), self.__dump(g_candidates_db))
+        self.assertTrue("nop ; mov eax, edx ; ret" in self.__dump(g_candidates_db))
+
+    def test_classification(self):
+        g_finder = self.__create_finder(self._binary)
+
+        g_candidates = self._db.find(g_finder, 0x00, len(self._binary) - 1, byte_depth=2, instrs_depth=1, binary_hash="bin")
+
+        for g_candidate in g_candidates:
+            self.assertEquals(self._db.load_classification(g_candidate), None)
+
+            g_classified = self._g_classifier.classify(g_candidate)
+
+            self._db.store_classification(g_candidate, g_classified)
+
+            for g_typed in g_classified:
+                self._db.store_verification(g_typed, g_typed.type == GadgetType.MoveRegister)
+
+            g_classified_db = self._db.load_classification(g_candidate)
+
+            self.assertEquals([g.fingerprint for g in g_classified], [g.fingerprint for g in g_classified_db])
+
+        g_move_register = self._db.query(gadget_type=GadgetType.MoveRegister, binary_hash="bin")
+
+        self.assertEquals(len(g_move_register), 2)
+        self.assertTrue(all(g.is_valid for g in g_move_register))
+
+        g_ecx = self._db.query(gadget_type=GadgetType.MoveRegister, register="ecx")
+
+        self.assertEquals(len(g_ecx), 1)
+        self.assertEquals(str(g_ecx[0].instrs[0]), "mov eax, ecx")
+
+        g_add = self._db.query(operation="+", valid=False)
+
+        self.assertTrue(len(g_add) > 0)
+        self.assertTrue(all(g.type == GadgetType.Arithmetic for g in g_add))
+
+        self.assertEquals(self._db.query(binary_hash="other"), [])
+
+    def __create_finder(self, binary):
+        return GadgetFinderMock(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+    def __dump(self, gadgets):
+        return [" ; ".join(str(instr) for instr in g.instrs) for g in sorted(gadgets, key=lambda g: (g.instrs[-1].address, g.address))]
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
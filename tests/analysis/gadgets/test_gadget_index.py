@@ -0,0 +1,138 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.analysis.gadgets import GadgetIndex
+from barf.analysis.gadgets import GadgetType
+from barf.analysis.gadgets import RawGadget
+from barf.analysis.gadgets import TypedGadget
+from barf.arch import ARCH_X86_MODE_64
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.core.reil import ReilEmptyOperand
+from barf.core.reil import ReilImmediateOperand
+from barf.core.reil import ReilRegisterOperand
+
+
+class GadgetIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_info = X86ArchitectureInformation(ARCH_X86_MODE_64)
+
+        # rdi <- mem[rsp] > {rsp}
+        self._load_rdi = self.__create_gadget(GadgetType.LoadMemory,
+                                              [self.__reg("rsp"), ReilImmediateOperand(0x0, 64)],
+                                              [self.__reg("rdi")],
+                                              [self.__reg("rsp")])
+
+        # rdi <- mem[rsp] > {rsp; esi}
+        self._load_rdi_clobber = self.__create_gadget(GadgetType.LoadMemory,
+                                                      [self.__reg("rsp"), ReilImmediateOperand(0x0, 64)],
+                                                      [self.__reg("rdi")],
+                                                      [self.__reg("rsp"), self.__reg("esi")])
+
+        # rdi <- 0x0 > {rsp}
+        self._const_rdi = self.__create_gadget(GadgetType.LoadConstant,
+                                               [ReilImmediateOperand(0x0, 64)],
+                                               [self.__reg("rdi")],
+                                               [self.__reg("rsp")])
+
+        # rax <- rax + rbx > {rsp}
+        self._add_rax = self.__create_gadget(GadgetType.Arithmetic,
+                                             [self.__reg("rax"), self.__reg("rbx")],
+                                             [self.__reg("rax")],
+                                             [self.__reg("rsp")],
+                                             "+")
+
+        # mem[0x1000] <- rsi > {rsp}
+        self._store_rsi = self.__create_gadget(GadgetType.StoreMemory,
+                                               [self.__reg("rsi")],
+                                               [ReilEmptyOperand(), ReilImmediateOperand(0x1000, 64)],
+                                               [self.__reg("rsp")])
+
+        self._gadgets = [
+            self._load_rdi,
+            self._load_rdi_clobber,
+            self._const_rdi,
+            self._add_rax,
+            self._store_rsi,
+        ]
+
+        self._index = GadgetIndex(self._gadgets, self._arch_info)
+
+    def test_query_all(self):
+        self.assertEquals(len(self._index), 5)
+        self.assertEquals(self._index.query(), self._gadgets)
+
+    def test_query_type(self):
+        self.assertEquals(self._index.query(gadget_type=GadgetType.LoadMemory), [self._load_rdi, self._load_rdi_clobber])
+        self.assertEquals(self._index.query(gadget_type=GadgetType.MoveRegister), [])
+
+    def test_query_destination(self):
+        gadgets = self._index.query(destination="rdi")
+
+        self.assertEquals(gadgets, [self._load_rdi, self._load_rdi_clobber, self._const_rdi])
+
+    def test_query_preserve(self):
+        gadgets = self._index.query(destination="rdi", preserve=["rsi"])
+
+        self.assertEquals(gadgets, [self._load_rdi, self._const_rdi])
+
+        gadgets = self._index.query(destination="rdi", preserve=["sil"])
+
+        self.assertEquals(gadgets, [self._load_rdi, self._const_rdi])
+
+        gadgets = self._index.query(gadget_type=GadgetType.LoadConstant, destination="rdi", preserve=["rsi"])
+
+        self.assertEquals(gadgets, [self._const_rdi])
+
+    def test_query_sources(self):
+        self.assertEquals(self._index.query(sources=["rax", "rbx"]), [self._add_rax])
+        self.assertEquals(self._index.query(sources=["rax", "rcx"]), [])
+        self.assertEquals(self._index.query(sources=["rsi"]), [self._store_rsi])
+
+    def test_query_operation(self):
+        self.assertEquals(self._index.query(operation="+"), [self._add_rax])
+        self.assertEquals(self._index.query(operation="-"), [])
+
+    def __create_gadget(self, gadget_type, sources, destination, modified, operation=None):
+        gadget = TypedGadget(RawGadget([]), gadget_type, [])
+
+        gadget.sources = sources
+        gadget.destination = destination
+        gadget.modified_registers = modified
+        gadget.operation = operation
+
+        return gadget
+
+    def __reg(self, name):
+        return ReilRegisterOperand(name, self._arch_info.registers_size[name])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,8 @@ import unittest
 
 from barf.analysis.codeanalyzer import CodeAnalyzer
 from barf.analysis.gadgets.gadget import GadgetType
+from barf.analysis.gadgets.gadget import RawGadget
+from barf.analysis.gadgets.gadget import TypedGadget
 from barf.analysis.gadgets.classifier import GadgetClassifier
 from barf.analysis.gadgets.finder import GadgetFinder
 from barf.analysis.gadgets.verifier import GadgetVerifier
@@ -949,6 +951,60 @@ class GadgetClassifierTests(unittest.TestCase):
         self.assertEquals(len(g_candidates), 3)
         self.assertEquals(len(g_classified), 0)
 
+    def test_fingerprint_1(self):
+        # testing : same gadget, different addresses
+        binary  = "\x89\xd8"                 # 0x00 : (2) mov eax, ebx
+        binary += "\xc3"                     # 0x02 : (1) ret
+        binary += "\x90"                     # 0x03 : (1) nop
+        binary += "\x89\xd8"                 # 0x04 : (2) mov eax, ebx
+        binary += "\xc3"                     # 0x06 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000006, instrs_depth=1)
+
+        self.assertEquals(len(g_candidates), 2)
+        self.assertNotEquals(g_candidates[0].address, g_candidates[1].address)
+        self.assertEquals(g_candidates[0].ir_fingerprint, g_candidates[1].ir_fingerprint)
+
+        g_classified_1 = self._g_classifier.classify(g_candidates[0])
+        g_classified_2 = self._g_classifier.classify(g_candidates[1])
+
+        self.assertEquals(len(g_classified_1), 1)
+        self.assertEquals(len(g_classified_2), 1)
+
+        self.assertEquals(g_classified_1[0].fingerprint, g_classified_2[0].fingerprint)
+        self.assertEquals(len(set(g_classified_1 + g_classified_2)), 1)
+
+    def test_fingerprint_encoding(self):
+        # testing : same instruction, different encodings
+        disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        translator = X86Translator(ARCH_X86_MODE_32)
+
+        asm_instr_1 = disassembler.disassemble("\x89\xd8", 0x00)     # mov eax, ebx
+        asm_instr_2 = disassembler.disassemble("\x8b\xc3", 0x10)     # mov eax, ebx
+
+        # Temporary registers numbering is not restarted.
+        asm_instr_1.ir_instrs = translator.translate(asm_instr_1)
+        asm_instr_2.ir_instrs = translator.translate(asm_instr_2)
+
+        self.assertEquals(RawGadget([asm_instr_1]).ir_fingerprint, RawGadget([asm_instr_2]).ir_fingerprint)
+
+    def test_fingerprint_2(self):
+        # testing : different gadgets
+        binary  = "\x89\xd8"                 # 0x00 : (2) mov eax, ebx
+        binary += "\xc3"                     # 0x02 : (1) ret
+        binary += "\x90"                     # 0x03 : (1) nop
+        binary += "\x89\xc8"                 # 0x04 : (2) mov eax, ecx
+        binary += "\xc3"                     # 0x06 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000006, instrs_depth=1)
+
+        self.assertEquals(len(g_candidates), 2)
+        self.assertNotEquals(g_candidates[0].ir_fingerprint, g_candidates[1].ir_fingerprint)
+
     def print_candidates(self, candidates):
         print "Candidates :"
 
@@ -1094,6 +1150,107 @@ class GadgetVerifierTests(unittest.TestCase):
         self.assertFalse(ReilRegisterOperand("eax", 32) in g_classified[0].modified_registers)
         self.assertTrue(ReilRegisterOperand("esp", 32) in g_classified[0].modified_registers)
 
+    def test_move_register_falsification(self):
+        binary  = "\x89\xd8"                  # 0x00 : (2) mov eax, ebx
+        binary += "\xc3"                      # 0x02 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000002)
+        g_classified = self._g_classifier.classify(g_candidates[0])
+
+        g_verifier = GadgetVerifier(self._code_analyzer, self._arch_info, self._ir_emulator)
+
+        # The classification cannot be disproved using concrete values.
+        self.assertFalse(g_verifier._falsify(g_classified[0]))
+        self.assertTrue(g_verifier.verify(g_classified[0]))
+
+        # Wrong classification (eax <- ecx).
+        g_classified[0].sources = [ReilRegisterOperand("ecx", 32)]
+
+        self.assertTrue(g_verifier._falsify(g_classified[0]))
+
+        # The solver is not called (there is no code analyzer).
+        g_verifier = GadgetVerifier(None, self._arch_info, self._ir_emulator)
+
+        self.assertFalse(g_verifier.verify(g_classified[0]))
+
+    def test_arithmetic_falsification(self):
+        binary  = "\x01\xd8"                  # 0x00 : (2) add eax, ebx
+        binary += "\xc3"                      # 0x02 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000002)
+        g_classified = self._g_classifier.classify(g_candidates[0])
+
+        g_verifier = GadgetVerifier(None, self._arch_info, self._ir_emulator)
+
+        self.assertEquals(g_classified[0].type, GadgetType.Arithmetic)
+        self.assertFalse(g_verifier._falsify(g_classified[0]))
+
+        # Wrong classification (eax <- eax - ebx).
+        g_classified[0].operation = "-"
+
+        self.assertTrue(g_verifier._falsify(g_classified[0]))
+
+    def test_load_memory_falsification(self):
+        binary  = "\x8b\x43\x08"              # 0x00 : (3) mov eax, dword ptr [ebx+0x8]
+        binary += "\xc3"                      # 0x03 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000003)
+        g_classified = self._g_classifier.classify(g_candidates[0])
+
+        g_verifier = GadgetVerifier(None, self._arch_info, self._ir_emulator)
+
+        self.assertEquals(g_classified[0].type, GadgetType.LoadMemory)
+        self.assertFalse(g_verifier._falsify(g_classified[0]))
+
+        # Wrong classification (eax <- mem[ebx + 0xc]).
+        g_classified[0].sources = [ReilRegisterOperand("ebx", 32), ReilImmediateOperand(0xc, 32)]
+
+        self.assertTrue(g_verifier._falsify(g_classified[0]))
+
+    def test_store_memory_falsification(self):
+        binary  = "\x89\x18"                  # 0x00 : (2) mov dword ptr [eax], ebx
+        binary += "\xc3"                      # 0x02 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000002)
+        g_classified = self._g_classifier.classify(g_candidates[0])
+
+        g_verifier = GadgetVerifier(None, self._arch_info, self._ir_emulator)
+
+        self.assertEquals(g_classified[0].type, GadgetType.StoreMemory)
+        self.assertFalse(g_verifier._falsify(g_classified[0]))
+
+        # Wrong classification (mem[eax + 0x4] <- ebx, and esp is not
+        # modified). As with the solver, both the stored value and the
+        # non-modified registers have to be wrong.
+        g_classified[0].destination = [ReilRegisterOperand("eax", 32), ReilImmediateOperand(0x4, 32)]
+        g_classified[0].modified_registers = []
+
+        self.assertTrue(g_verifier._falsify(g_classified[0]))
+
+    def test_no_operation_falsification(self):
+        binary  = "\x89\xd8"                  # 0x00 : (2) mov eax, ebx
+        binary += "\xc3"                      # 0x02 : (1) ret
+
+        g_finder = GadgetFinder(X86Disassembler(ARCH_X86_MODE_32), binary, X86Translator(ARCH_X86_MODE_32), ARCH_X86, ARCH_X86_MODE_32)
+
+        g_candidates = g_finder.find(0x00000000, 0x00000002)
+
+        g_verifier = GadgetVerifier(None, self._arch_info, self._ir_emulator)
+
+        # Wrong classification (eax changes).
+        g_nop = TypedGadget(g_candidates[0], GadgetType.NoOperation, g_candidates[0].instrs)
+
+        self.assertTrue(g_verifier._falsify(g_nop))
+        self.assertFalse(g_verifier.verify(g_nop))
+
     def test_load_memory_two_accesses_1(self):
         # testing : dst_reg <- m[dst_reg + offset]
         binary  = "\x58"                      # 0x00 : (1) pop eax
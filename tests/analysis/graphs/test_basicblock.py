@@ -23,11 +23,16 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import pickle
 import unittest
 
 from barf.analysis.graphs import CFGRecoverer, ControlFlowGraph, RecursiveDescent
 from barf.analysis.graphs.basicblock import BasicBlock
+from barf.arch import ARCH_ARM_MODE_ARM
 from barf.arch import ARCH_X86_MODE_32
+from barf.arch.arm import ArmArchitectureInformation
+from barf.arch.arm.disassembler import ArmDisassembler
+from barf.arch.arm.translator import ArmTranslator
 from barf.arch.x86 import X86ArchitectureInformation
 from barf.arch.x86.disassembler import X86Disassembler
 from barf.arch.x86.parser import X86Parser
@@ -97,6 +102,32 @@ class BinDiffTests(unittest.TestCase):
         # self.assertTrue(bb1 != bb2)
 
 
+class DisassemblerMock(object):
+
+    def __init__(self, disassembler):
+        self._disassembler = disassembler
+
+        self.calls = 0
+
+    def disassemble(self, data, address):
+        self.calls += 1
+
+        return self._disassembler.disassemble(data, address)
+
+
+class TranslatorMock(object):
+
+    def __init__(self, translator):
+        self._translator = translator
+
+        self.calls = 0
+
+    def translate(self, instruction):
+        self.calls += 1
+
+        return self._translator.translate(instruction)
+
+
 class X86CfgRecoveryTests(unittest.TestCase):
 
     def setUp(self):
@@ -175,6 +206,249 @@ class X86CfgRecoveryTests(unittest.TestCase):
         self.assertEquals(cfg.end_address, 0x0804846c)
         self.assertEquals(len(cfg.basic_blocks), 1)
 
+    def test_split_back_edge(self):
+        code  = "\x31\xc0"                 # 0x00 : (2) xor eax, eax
+        code += "\x40"                     # 0x02 : (1) inc eax
+        code += "\x83\xf8\x0a"             # 0x03 : (3) cmp eax, 0xa
+        code += "\x75\xfa"                 # 0x06 : (2) jne 0x2
+        code += "\xc3"                     # 0x08 : (1) ret
+
+        disassembler = DisassemblerMock(self._disassembler)
+
+        strategy = RecursiveDescent(disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x08)
+
+        cfg = ControlFlowGraph(bbs, name="loop")
+
+        self.assertEquals(len(cfg.basic_blocks), 3)
+
+        bb_entry = cfg.find_basic_block(0x00)
+        self.assertEquals(len(bb_entry.instrs), 1)
+        self.assertTrue(bb_entry.is_entry)
+        self.assertEquals(bb_entry.branches, [(0x02, 'direct')])
+
+        bb_loop = cfg.find_basic_block(0x02)
+        self.assertEquals(len(bb_loop.instrs), 3)
+        self.assertEquals(bb_loop.branches, [(0x02, 'taken'), (0x08, 'not-taken')])
+
+        bb_exit = cfg.find_basic_block(0x08)
+        self.assertEquals(len(bb_exit.instrs), 1)
+        self.assertTrue(bb_exit.is_exit)
+
+        # Each instruction is disassembled just once.
+        self.assertEquals(disassembler.calls, 5)
+
+        # Instructions are reused (from the cache) in further recoveries.
+        recoverer.build(0x02, 0x08)
+
+        self.assertEquals(disassembler.calls, 5)
+
+    def test_split_overlapping(self):
+        code  = "\xb8\x40\x90\x90\x90"     # 0x00 : (5) mov eax, 0x90909040
+        code += "\xc3"                     # 0x05 : (1) ret
+
+        strategy = RecursiveDescent(self._disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x05)
+
+        # 0x01 is not an instruction boundary: inc eax; nop; nop; nop; ret
+        bb_lower, bb_upper = strategy._split_bb(bbs[0], 0x01, {}, True)
+
+        self.assertEquals([instr.mnemonic for instr in bb_lower.instrs], ["inc", "nop", "nop", "nop", "ret"])
+        self.assertEquals(bb_lower.end_address, 0x05)
+        self.assertEquals(bb_upper.direct_branch, 0x01)
+
+    def test_adjacency(self):
+        code  = "\x31\xc0"                 # 0x00 : (2) xor eax, eax
+        code += "\x40"                     # 0x02 : (1) inc eax
+        code += "\x83\xf8\x0a"             # 0x03 : (3) cmp eax, 0xa
+        code += "\x75\xfa"                 # 0x06 : (2) jne 0x2
+        code += "\xc3"                     # 0x08 : (1) ret
+
+        strategy = RecursiveDescent(self._disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x08)
+
+        cfg = ControlFlowGraph(bbs, name="loop")
+
+        bb_entry = cfg.find_basic_block(0x00)
+        bb_loop = cfg.find_basic_block(0x02)
+        bb_exit = cfg.find_basic_block(0x08)
+
+        self.assertEquals(cfg.find_basic_block(0x03), None)
+
+        self.assertEquals(cfg.successors(0x00), [bb_loop])
+        self.assertEquals(cfg.successors(0x02), [bb_loop, bb_exit])
+        self.assertEquals(cfg.successors(0x08), [])
+
+        self.assertEquals(cfg.predecessors(0x00), [])
+        self.assertEquals(cfg.predecessors(0x02), [bb_entry, bb_loop])
+        self.assertEquals(cfg.predecessors(0x08), [bb_loop])
+
+        self.assertEquals(list(cfg.entry_basic_blocks), [bb_entry])
+        self.assertEquals(list(cfg.exit_basic_blocks), [bb_exit])
+
+        paths = list(cfg.all_simple_bb_paths(0x00, 0x08))
+
+        self.assertEquals(paths, [[bb_entry, bb_loop, bb_exit]])
+
+    def test_analyses(self):
+        code  = "\x31\xc9"                 # 0x00 : (2) xor ecx, ecx
+        code += "\x31\xc0"                 # 0x02 : (2) xor eax, eax
+        code += "\x40"                     # 0x04 : (1) inc eax
+        code += "\x83\xf8\x0a"             # 0x05 : (3) cmp eax, 0xa
+        code += "\x75\xfa"                 # 0x08 : (2) jne 0x4
+        code += "\x41"                     # 0x0a : (1) inc ecx
+        code += "\x83\xf9\x0a"             # 0x0b : (3) cmp ecx, 0xa
+        code += "\x75\xf2"                 # 0x0e : (2) jne 0x2
+        code += "\xc3"                     # 0x10 : (1) ret
+
+        strategy = RecursiveDescent(self._disassembler, code, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x10)
+
+        cfg = ControlFlowGraph(bbs, name="nested_loops")
+
+        addrs = lambda bbs: [bb.address for bb in bbs]
+
+        self.assertEquals(addrs(cfg.basic_blocks), [0x00, 0x02, 0x04, 0x0a, 0x10])
+
+        # Reverse post-order.
+        self.assertEquals(addrs(cfg.reverse_post_order()), [0x00, 0x02, 0x04, 0x0a, 0x10])
+
+        # Dominators.
+        self.assertEquals(cfg.immediate_dominator(0x00), None)
+        self.assertEquals(cfg.immediate_dominator(0x02).address, 0x00)
+        self.assertEquals(cfg.immediate_dominator(0x04).address, 0x02)
+        self.assertEquals(cfg.immediate_dominator(0x0a).address, 0x04)
+        self.assertEquals(cfg.immediate_dominator(0x10).address, 0x0a)
+
+        self.assertTrue(cfg.dominates(0x02, 0x10))
+        self.assertFalse(cfg.dominates(0x10, 0x02))
+
+        # Post-dominators.
+        self.assertEquals(cfg.immediate_post_dominator(0x00).address, 0x02)
+        self.assertEquals(cfg.immediate_post_dominator(0x02).address, 0x04)
+        self.assertEquals(cfg.immediate_post_dominator(0x04).address, 0x0a)
+        self.assertEquals(cfg.immediate_post_dominator(0x0a).address, 0x10)
+        self.assertEquals(cfg.immediate_post_dominator(0x10), None)
+
+        self.assertTrue(cfg.post_dominates(0x10, 0x00))
+        self.assertFalse(cfg.post_dominates(0x04, 0x0a))
+
+        # Natural loops.
+        outer, inner = cfg.natural_loops()
+
+        self.assertEquals(outer.header.address, 0x02)
+        self.assertEquals(addrs(outer.basic_blocks), [0x02, 0x04, 0x0a])
+        self.assertEquals(outer.parent, None)
+        self.assertEquals(outer.depth, 1)
+
+        self.assertEquals(inner.header.address, 0x04)
+        self.assertEquals(addrs(inner.basic_blocks), [0x04])
+        self.assertEquals(inner.parent, outer)
+        self.assertEquals(inner.depth, 2)
+
+        self.assertEquals([cfg.loop_depth(addr) for addr in [0x00, 0x02, 0x04, 0x0a, 0x10]], [0, 1, 2, 1, 0])
+
+        # Strongly connected components.
+        sccs = sorted([addrs(scc) for scc in cfg.strongly_connected_components()])
+
+        self.assertEquals(sccs, [[0x00], [0x02, 0x04, 0x0a], [0x10]])
+
+    def test_lazy_translation(self):
+        code  = "\x31\xc0"                 # 0x00 : (2) xor eax, eax
+        code += "\x40"                     # 0x02 : (1) inc eax
+        code += "\xc3"                     # 0x03 : (1) ret
+
+        translator = TranslatorMock(self._translator)
+
+        strategy = RecursiveDescent(self._disassembler, code, translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        # Without translation, instructions have no IR.
+        bbs, _ = recoverer.build(0x00, 0x03, translate=False)
+
+        self.assertEquals(translator.calls, 0)
+        self.assertEquals(bbs[0].instrs[0].ir_instrs, [])
+
+        # With translation, IR is computed on first access only.
+        bbs, _ = recoverer.build(0x00, 0x03)
+
+        self.assertEquals(translator.calls, 0)
+
+        instr = bbs[0].instrs[0]
+
+        self.assertEquals([ir.mnemonic for ir in instr.ir_instrs],
+                          [ir.mnemonic for ir in self._translator.translate(instr)])
+        self.assertEquals(translator.calls, 1)
+
+        instr.ir_instrs
+
+        self.assertEquals(translator.calls, 1)
+
+    def test_lazy_translation_pickle(self):
+        code  = "\x31\xc0"                 # 0x00 : (2) xor eax, eax
+        code += "\xc3"                     # 0x02 : (1) ret
+
+        translator = TranslatorMock(self._translator)
+
+        strategy = RecursiveDescent(self._disassembler, code, translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x02)
+
+        # Pending IR is translated before pickling.
+        bb = pickle.loads(pickle.dumps(bbs[0], pickle.HIGHEST_PROTOCOL))
+
+        self.assertEquals(translator.calls, 2)
+
+        for instr, instr_orig in zip(bb.instrs, bbs[0].instrs):
+            self.assertEquals(instr.ir_translator, None)
+            self.assertEquals([ir.mnemonic for ir in instr.ir_instrs],
+                              [ir.mnemonic for ir in self._translator.translate(instr_orig)])
+
+
+class ArmCfgRecoveryTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_mode = ARCH_ARM_MODE_ARM
+        self._arch_info = ArmArchitectureInformation(self._arch_mode)
+        self._disassembler = ArmDisassembler(architecture_mode=ARCH_ARM_MODE_ARM)
+        self._translator = ArmTranslator(architecture_mode=ARCH_ARM_MODE_ARM)
+
+    def test_lazy_translation_pickle(self):
+        code  = "\x00\x00\xa0\xe3"         # 0x00 : (4) mov r0, #0
+        code += "\x10\x80\xbd\xe8"         # 0x04 : (4) pop {r4, pc}
+
+        translator = TranslatorMock(self._translator)
+
+        strategy = RecursiveDescent(self._disassembler, code, translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs, _ = recoverer.build(0x00, 0x07)
+
+        self.assertEquals(translator.calls, 0)
+
+        # Pending IR is translated before pickling, the translator is not
+        # pickled.
+        bb = pickle.loads(pickle.dumps(bbs[0], pickle.HIGHEST_PROTOCOL))
+
+        self.assertEquals(translator.calls, 2)
+
+        for instr, instr_orig in zip(bb.instrs, bbs[0].instrs):
+            self.assertEquals(instr.ir_translator, None)
+            self.assertEquals(str(instr), str(instr_orig))
+            self.assertEquals([ir.mnemonic for ir in instr.ir_instrs],
+                              [ir.mnemonic for ir in self._translator.translate(instr_orig)])
+
+        self.assertTrue(self._arch_info.instr_is_ret(bb.instrs[-1]))
+
 
 def main():
     unittest.main()
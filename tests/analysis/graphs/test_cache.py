@@ -0,0 +1,119 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import unittest
+
+from barf.analysis.graphs import AnalysisCache
+from barf.analysis.graphs import CFGRecoverer, ControlFlowGraph, RecursiveDescent
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.disassembler import X86Disassembler
+from barf.arch.x86.translator import X86Translator
+from barf.core.binary import BinaryFile
+
+
+def get_full_path(filename):
+    return os.path.dirname(os.path.abspath(__file__)) + filename
+
+
+class DisassemblerMock(object):
+
+    def __init__(self, disassembler):
+        self._disassembler = disassembler
+
+        self.calls = 0
+
+    def disassemble(self, data, address):
+        self.calls += 1
+
+        return self._disassembler.disassemble(data, address)
+
+
+class AnalysisCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+        self._disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        self._translator = X86Translator(ARCH_X86_MODE_32)
+
+        self._binary = BinaryFile(get_full_path("/data/bin/x86_sample_2"))
+
+        self._cache = AnalysisCache(":memory:")
+
+    def tearDown(self):
+        self._cache.close()
+
+    def test_store_and_load(self):
+        strategy = RecursiveDescent(self._disassembler, self._binary.text_section, self._translator,
+                                    self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        # Recover "main" function.
+        bbs, calls = recoverer.build(0x0804846d, 0x080484a3)
+
+        self._cache.store("hash", 0x0804846d, "options", bbs, calls)
+
+        # Load it with a new recoverer (empty instruction cache).
+        disassembler = DisassemblerMock(self._disassembler)
+
+        strategy = RecursiveDescent(disassembler, self._binary.text_section, self._translator, self._arch_info)
+        recoverer = CFGRecoverer(strategy)
+
+        bbs_loaded, calls_loaded = self._cache.load("hash", 0x0804846d, "options", recoverer.disassemble_instr)
+
+        self.assertEquals(calls_loaded, calls)
+
+        # The layout of the CFG is available without decoding instructions.
+        cfg = ControlFlowGraph(bbs, name="main")
+        cfg_loaded = ControlFlowGraph(bbs_loaded, name="main")
+
+        self.assertEquals(cfg_loaded.start_address, cfg.start_address)
+        self.assertEquals(cfg_loaded.end_address, cfg.end_address)
+
+        for bb, bb_loaded in zip(cfg.basic_blocks, cfg_loaded.basic_blocks):
+            self.assertEquals(bb_loaded.address, bb.address)
+            self.assertEquals(bb_loaded.end_address, bb.end_address)
+            self.assertEquals(bb_loaded.is_entry, bb.is_entry)
+            self.assertEquals(bb_loaded.is_exit, bb.is_exit)
+            self.assertEquals(bb_loaded.branches, bb.branches)
+
+        self.assertEquals(disassembler.calls, 0)
+
+        # Instructions are decoded on first access.
+        for bb, bb_loaded in zip(cfg.basic_blocks, cfg_loaded.basic_blocks):
+            self.assertEquals(bb_loaded.instrs, bb.instrs)
+
+        self.assertEquals(disassembler.calls, sum([len(bb) for bb in bbs]))
+
+    def test_miss(self):
+        self.assertEquals(self._cache.load("hash", 0x0804846d, "options", None), None)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
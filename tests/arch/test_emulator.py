@@ -77,6 +77,59 @@ class EmulatorTests(unittest.TestCase):
 
         emu.emulate(0x4004d6, 0x400507, {}, None, False)
 
+    def test_execute_x86(self):
+        arch_mode = ARCH_X86_MODE_32
+        arch_info = X86ArchitectureInformation(arch_mode)
+        ir_emulator = ReilEmulator(arch_info)
+        disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        ir_translator = X86Translator(ARCH_X86_MODE_32)
+
+        translations = []
+
+        def translate(instruction):
+            translations.append(instruction.address)
+
+            return X86Translator.translate(ir_translator, instruction)
+
+        ir_translator.translate = translate
+
+        emu = Emulator(arch_info, ir_emulator, ir_translator, disassembler)
+
+        code = "\x40"          # 0x00 : inc eax
+        code += "\x49"         # 0x01 : dec ecx
+        code += "\x75\xfc"     # 0x02 : jnz 0x0
+
+        emu.set_registers({"eax": 0x0, "ecx": 0x3})
+
+        next_addr = 0x1000
+
+        while next_addr != 0x1004:
+            asm_instr = disassembler.disassemble(code[next_addr - 0x1000:], next_addr)
+
+            next_addr = emu.execute(asm_instr)
+
+        self.assertEquals(emu.registers["eax"], 0x3)
+        self.assertEquals(emu.registers["ecx"], 0x0)
+
+        # Each instruction is translated once.
+        self.assertEquals(translations, [0x1000, 0x1001, 0x1002])
+
+    def test_separate_temporaries(self):
+        arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+        disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        ir_translator = X86Translator(ARCH_X86_MODE_32)
+
+        # The REIL emulator is not changed unless requested.
+        ir_emulator = ReilEmulator(arch_info)
+
+        Emulator(arch_info, ir_emulator, ir_translator, disassembler)
+
+        self.assertFalse(ir_emulator.cpu.separate_temporaries)
+
+        Emulator(arch_info, ir_emulator, ir_translator, disassembler, separate_temporaries=True)
+
+        self.assertTrue(ir_emulator.cpu.separate_temporaries)
+
     def test_emulate_arm(self):
         binary = BinaryFile(get_full_path("./samples/bin/loop-simple.arm"))
         arch_mode = ARCH_ARM_MODE_ARM
@@ -0,0 +1,161 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.arch import ARCH_ARM_MODE_ARM
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.arm.disassembler import ArmDisassembler
+from barf.arch.arm.translator import ArmTranslator
+from barf.arch.translator import TranslationCache
+from barf.arch.x86.disassembler import X86Disassembler
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil import ReilRegisterOperand
+
+
+class TranslationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.x86_disassembler = X86Disassembler(ARCH_X86_MODE_32)
+        self.arm_disassembler = ArmDisassembler(ARCH_ARM_MODE_ARM)
+
+    def test_x86_hit(self):
+        cache = TranslationCache()
+
+        translator = X86Translator(ARCH_X86_MODE_32, translation_cache=cache)
+
+        for address in [0x1000, 0x2000, 0x3000]:
+            instr = self.x86_disassembler.disassemble("\x55", address)     # push ebp
+
+            translator.translate(instr)
+
+        self.assertEquals(cache.misses, 1)
+        self.assertEquals(cache.hits, 2)
+        self.assertEquals(len(cache), 1)
+
+    def test_x86_equivalence(self):
+        encodings = [
+            "\x55",                     # push ebp
+            "\x89\xe5",                 # mov ebp, esp
+            "\x8b\x45\x08",             # mov eax, dword ptr [ebp + 8]
+            "\x01\xd8",                 # add eax, ebx
+            "\xd3\xe0",                 # shl eax, cl
+            "\xf3\xa4",                 # rep movsb
+            "\x74\x05",                 # je $+7
+            "\xe2\xfc",                 # loop $-2
+            "\xe8\x10\x00\x00\x00",     # call $+0x15
+            "\xff\xd0",                 # call eax
+            "\x68\x05\x10\x40\x00",     # push 0x401005
+            "\xc3",                     # ret
+        ]
+
+        self.__check_equivalence(self.x86_disassembler, X86Translator, ARCH_X86_MODE_32,
+                                 encodings, [0x401000, 0x401000, 0x8048123, 0xfffffff0])
+
+    def test_arm_equivalence(self):
+        encodings = [
+            "\x04\xe0\x2d\xe5",     # push {lr}
+            "\x01\x00\x80\xe0",     # add r0, r0, r1
+            "\x01\x00\x80\x10",     # addne r0, r0, r1
+            "\xfe\xff\xff\xea",     # b $
+            "\x05\x00\x00\x0b",     # bleq $+0x1c
+        ]
+
+        self.__check_equivalence(self.arm_disassembler, ArmTranslator, ARCH_ARM_MODE_ARM,
+                                 encodings, [0x8000, 0x8000, 0x12340])
+
+    def test_temporal_registers_renumbered(self):
+        cache = TranslationCache()
+
+        translator = X86Translator(ARCH_X86_MODE_32, translation_cache=cache)
+
+        instr1 = self.x86_disassembler.disassemble("\x01\xd8", 0x1000)     # add eax, ebx
+        instr2 = self.x86_disassembler.disassemble("\x01\xd8", 0x1002)     # add eax, ebx
+
+        temps1 = self.__get_temporal_registers(translator.translate(instr1))
+        temps2 = self.__get_temporal_registers(translator.translate(instr2))
+
+        self.assertEquals(cache.hits, 1)
+        self.assertEquals(len(temps1), len(temps2))
+        self.assertEquals(temps1.intersection(temps2), set())
+
+    def test_no_cache(self):
+        translator = X86Translator(ARCH_X86_MODE_32, translation_cache=None)
+
+        instr = self.x86_disassembler.disassemble("\x55", 0x1000)      # push ebp
+
+        self.assertTrue(len(translator.translate(instr)) > 0)
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __check_equivalence(self, disassembler, translator_cls, arch_mode, encodings, addresses):
+        translator = translator_cls(arch_mode, translation_cache=None)
+        translator_cached = translator_cls(arch_mode, translation_cache=TranslationCache())
+
+        for encoding in encodings:
+            for address in addresses:
+                instr = disassembler.disassemble(encoding, address)
+                instr_cached = disassembler.disassemble(encoding, address)
+
+                reil_instrs = translator.translate(instr)
+                reil_instrs_cached = translator_cached.translate(instr_cached)
+
+                self.assertEquals(self.__normalize(reil_instrs), self.__normalize(reil_instrs_cached),
+                                  "%s @ %#x" % (instr, address))
+
+    def __normalize(self, reil_instrs):
+        temps = {}
+
+        instrs = []
+
+        for reil_instr in reil_instrs:
+            oprnds = []
+
+            for oprnd in reil_instr.operands:
+                if isinstance(oprnd, ReilRegisterOperand) and oprnd.name.startswith("t"):
+                    oprnds.append(("t%d" % temps.setdefault(oprnd.name, len(temps)), oprnd.size))
+                else:
+                    oprnds.append((str(oprnd), oprnd.size))
+
+            instrs.append((reil_instr.mnemonic, reil_instr.address, oprnds))
+
+        return instrs
+
+    def __get_temporal_registers(self, reil_instrs):
+        temps = set()
+
+        for reil_instr in reil_instrs:
+            for oprnd in reil_instr.operands:
+                if isinstance(oprnd, ReilRegisterOperand) and oprnd.name.startswith("t"):
+                    temps.add(oprnd.name)
+
+        return temps
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86.parser import X86Parser
+from barf.arch.x86.trace import BinaryTraceError
+from barf.arch.x86.trace import BinaryTraceReader
+from barf.arch.x86.trace import convert_trace
+from barf.arch.x86.trace import is_binary_trace
+from barf.arch.x86.trace import parse_binary_trace
+from barf.arch.x86.trace import parse_trace
+from barf.arch.x86.trace import zstandard
+
+
+TRACE = [
+    "0x08048000:test | push ebp | 55 | | eax=00000001,ebp=00000000,esp=bfff0000,eflags=00000202\n",
+    "0x08048001:test | mov ebp, esp | 89e5 | | eax=00000001,ebp=00000000,esp=bffefffc,eflags=00000202\n",
+    "0x08048003:test | mov eax, dword ptr [ebp+0x8] | 8b4508 | bfff0004=78563412 | eax=00000001,ebp=bffefffc,esp=bffefffc,eflags=00000202\n",
+    "0x08048006:test | rep stosb byte ptr es:[edi], al | f3aa | | eax=12345678,ebp=bffefffc,esp=bffefffc,eflags=00000202\n",
+    "0x08048006:test | rep stosb byte ptr es:[edi], al | f3aa | bfff0010=00 | eax=12345678,ebp=bffefffc,esp=bffefffc,eflags=00000202\n",
+    "0x08048008:test | inc ecx | 41 | | eax=12345678,ebp=bffefffc,esp=bffefffc,eflags=00000202\n",
+    "0x08048009:test | int 0x80 | cd80 | | eax=00000004,ebp=bffefffc,esp=bffefffc,eflags=00000202\n",
+    "0x0804800a:libc | push ebp | 55 | | eax=0000000d,ebp=bffefffc,esp=bffefffc,eflags=00000246\n",
+    "0x0804800b:libc | pop ebp | 5d | | eax=0000000d,ebp=bffefffc,esp=bffefff8,eflags=00000246,xmm0=00112233445566778899aabbccddeeff\n",
+    "0x0804800c:libc | ret | c3 | | eax=0000000d,ebp=bffefffc,esp=bffefffc,eflags=00000246\n",
+]
+
+
+class BinaryTraceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = X86Parser(ARCH_X86_MODE_32)
+
+        fd, self.text_filename = tempfile.mkstemp()
+
+        with os.fdopen(fd, "w") as f:
+            f.writelines(TRACE)
+
+        fd, self.binary_filename = tempfile.mkstemp()
+
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.text_filename)
+        os.remove(self.binary_filename)
+
+    def test_equivalence(self):
+        for compression in [None, "gzip"] + (["zstd"] if zstandard else []):
+            for block_size in [1, 2, 4096]:
+                convert_trace(self.text_filename, self.binary_filename, compression=compression,
+                              block_size=block_size)
+
+                self.__check_equivalence(None)
+
+    def test_start_address(self):
+        convert_trace(self.text_filename, self.binary_filename, block_size=2)
+
+        self.__check_equivalence(0x0804800a)
+
+    def test_reader(self):
+        convert_trace(self.text_filename, self.binary_filename, compression="gzip")
+
+        self.assertTrue(is_binary_trace(self.binary_filename))
+        self.assertFalse(is_binary_trace(self.text_filename))
+
+        reader = BinaryTraceReader(self.binary_filename)
+
+        entries = list(reader.entries())
+
+        reader.close()
+
+        self.assertEquals(len(entries), len(TRACE))
+
+        address, image, encoding, disasm, mem_reads, regs = entries[2]
+
+        self.assertEquals(address, 0x08048003)
+        self.assertEquals(image, "test")
+        self.assertEquals(encoding, "\x8b\x45\x08")
+        self.assertEquals(disasm, "mov eax, dword ptr [ebp+0x8]")
+        self.assertEquals(mem_reads, {0xbfff0004: "78563412"})
+        self.assertEquals(regs["esp"], 0xbffefffc)
+
+        # Registers missing from an entry are not carried over.
+        self.assertEquals(entries[8][5]["xmm0"], 0xffeeddccbbaa99887766554433221100)
+        self.assertTrue("xmm0" not in entries[9][5])
+
+    def test_instructions_parsed_once(self):
+        convert_trace(self.text_filename, self.binary_filename)
+
+        reader = BinaryTraceReader(self.binary_filename)
+
+        instrs = [asm for asm, _, _, _ in reader.instructions(self.parser)]
+
+        reader.close()
+
+        self.assertEquals(instrs[0].address, 0x08048000)
+        self.assertEquals(instrs[7].address, 0x0804800a)
+        self.assertEquals(instrs[0].bytes, instrs[7].bytes)
+        self.assertTrue(instrs[0] is not instrs[7])
+        self.assertTrue(instrs[0].operands is instrs[7].operands)
+
+    def test_convert_malformed_line(self):
+        with open(self.text_filename, "w") as f:
+            f.writelines(TRACE[:2] + ["0x08048003:test | mov eax, ebx\n"] + TRACE[2:])
+
+        convert_trace(self.text_filename, self.binary_filename)
+
+        self.__check_equivalence(None)
+
+    def test_convert_too_many_registers(self):
+        regs = ",".join("r{}=00000001".format(i) for i in xrange(0x101))
+
+        with open(self.text_filename, "w") as f:
+            f.writelines(TRACE + ["0x0804800d:libc | nop | 90 | | {}\n".format(regs)])
+
+        with self.assertRaises(BinaryTraceError):
+            convert_trace(self.text_filename, self.binary_filename)
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __check_equivalence(self, start_address):
+        text = list(parse_trace(self.text_filename, self.parser, start_address=start_address))
+        binary = list(parse_binary_trace(self.binary_filename, self.parser, start_address=start_address))
+
+        self.assertEquals(len(text), len(binary))
+
+        for (asm1, image1, reads1, regs1), (asm2, image2, reads2, regs2) in zip(text, binary):
+            self.assertEquals(asm1, asm2)
+            self.assertEquals(image1, image2)
+            self.assertEquals(reads1, reads2)
+            self.assertEquals(regs1, regs2)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
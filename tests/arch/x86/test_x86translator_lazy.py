@@ -0,0 +1,196 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.parser import X86Parser
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil.container import ReilContainer
+from barf.core.reil.container import ReilSequence
+from barf.core.reil.emulator import ReilEmulator
+from barf.core.reil.optimizer import ReilOptimizer
+
+
+class X86LazyFlagsTranslationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.arch_mode = ARCH_X86_MODE_32
+        self.arch_info = X86ArchitectureInformation(self.arch_mode)
+        self.x86_parser = X86Parser(self.arch_mode)
+        self.eager_translator = X86Translator(self.arch_mode)
+        self.lazy_translator = X86Translator(self.arch_mode, lazy_flags=True)
+
+        self.registers = ["eax", "ebx", "ecx", "edx", "esi", "edi", "ebp", "esp", "eflags"]
+
+        self.context = {
+            "eax": 0x7fffffff,
+            "ebx": 0x00000001,
+            "ecx": 0x00000003,
+            "edx": 0xdeadbeef,
+            "esi": 0x12345678,
+            "edi": 0x80000000,
+            "ebp": 0x00000000,
+            "esp": 0x00008000,
+            "eflags": 0x00000202,
+        }
+
+    def test_dead_flags_removed(self):
+        asm = ["add eax, ebx", "sub eax, ecx", "xor eax, edx", "inc esi"]
+
+        instrs = self.__parse(asm)
+
+        eager = [self.eager_translator.translate(instr) for instr in instrs]
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        self.assertEquals(len(lazy), len(asm))
+        self.assertTrue(sum(map(len, lazy)) < sum(map(len, eager)))
+
+        self.__check_equivalence(instrs, eager, lazy)
+
+    def test_flags_materialized_at_block_end(self):
+        asm = ["add eax, ebx", "mov ecx, edx"]
+
+        instrs = self.__parse(asm)
+
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        written = set()
+        for reil_instr in lazy[-1]:
+            if reil_instr.operands[2].name is not None:
+                written.add(reil_instr.operands[2].name)
+
+        for flag in ["af", "cf", "of", "pf", "sf", "zf"]:
+            self.assertTrue(flag in written)
+
+    def test_flag_readers(self):
+        asm = ["cmp eax, ebx", "cmovz ecx, edx", "adc esi, edi", "setb al", "sbb ebx, ecx"]
+
+        instrs = self.__parse(asm)
+
+        eager = [self.eager_translator.translate(instr) for instr in instrs]
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        self.__check_equivalence(instrs, eager, lazy)
+
+    def test_conditional_jump(self):
+        asm = ["add eax, ebx", "dec ecx", "jz 0x1010", "or edx, esi"]
+
+        instrs = self.__parse(asm)
+
+        eager = [self.eager_translator.translate(instr) for instr in instrs]
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        self.__check_equivalence(instrs, eager, lazy)
+
+    def test_instruction_with_internal_branches(self):
+        asm = ["add eax, ebx", "shl edx, cl", "rol esi, cl", "neg edi"]
+
+        instrs = self.__parse(asm)
+
+        eager = [self.eager_translator.translate(instr) for instr in instrs]
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        self.__check_equivalence(instrs, eager, lazy)
+
+    def test_translate_single_instruction(self):
+        instrs = self.__parse(["add eax, ebx"])
+
+        eager = [self.eager_translator.translate(instrs[0])]
+        lazy = [self.lazy_translator.translate(instrs[0])]
+
+        self.__check_equivalence(instrs, eager, lazy)
+
+    def test_optimized_block(self):
+        asm = ["add eax, ebx", "mov ecx, edx"]
+
+        instrs = self.__parse(asm)
+
+        eager = [self.eager_translator.translate(instr) for instr in instrs]
+        lazy = self.lazy_translator.translate_block(instrs)
+
+        # Deferred flag updates read temporaries of previous
+        # instructions, they must survive the optimization.
+        optimized = ReilOptimizer(self.arch_info).optimize_block(lazy)
+
+        self.context["eax"] = 0xffffffff
+
+        self.__check_equivalence(instrs, eager, optimized)
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __parse(self, asm):
+        instrs = []
+        address = 0x1000
+
+        for text in asm:
+            instr = self.x86_parser.parse(text)
+            instr.address = address
+            instr.size = 4
+
+            instrs.append(instr)
+
+            address += 4
+
+        return instrs
+
+    def __execute(self, instrs, reil_block):
+        container = ReilContainer()
+        prev_sequence = None
+
+        for reil_instrs in reil_block:
+            sequence = ReilSequence()
+
+            for reil_instr in reil_instrs:
+                sequence.append(reil_instr)
+
+            if prev_sequence:
+                prev_sequence.next_sequence_address = sequence.address
+
+            container.add(sequence)
+
+            prev_sequence = sequence
+
+        end = (instrs[-1].address + instrs[-1].size) << 8
+
+        prev_sequence.next_sequence_address = end
+
+        emulator = ReilEmulator(self.arch_info)
+
+        context_out, _ = emulator.execute(container, start=instrs[0].address << 8,
+                                          end=end, registers=dict(self.context))
+
+        return dict((reg, context_out.get(reg)) for reg in self.registers)
+
+    def __check_equivalence(self, instrs, eager, lazy):
+        self.assertEquals(self.__execute(instrs, eager), self.__execute(instrs, lazy))
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
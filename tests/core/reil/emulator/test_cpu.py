@@ -315,3 +315,25 @@ class ReilCpuTests(unittest.TestCase):
         cpu.execute(instr)
 
         self.assertEquals((t0 % t1) & 2**32-1, cpu.registers['t2'])
+
+    def test_separate_temporaries(self):
+        mem = ReilMemoryEx(self.__address_size)
+        cpu = ReilCpu(mem)
+
+        instr = self.__parser.parse(["add [DWORD t0, DWORD eax, DWORD t1]"])[0]
+        instr.address = 0xcafecafe00
+
+        cpu.registers['t0'] = 0x1
+        cpu.registers['eax'] = 0x2
+
+        cpu.separate_temporaries = True
+
+        cpu.execute(instr)
+
+        self.assertEquals({'eax': 0x2}, cpu.registers)
+        self.assertEquals({'t0': 0x1, 't1': 0x3}, cpu.temporaries)
+
+        cpu.clear_temporaries()
+
+        self.assertEquals({'eax': 0x2}, cpu.registers)
+        self.assertEquals({}, cpu.temporaries)
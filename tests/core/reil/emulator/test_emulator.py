@@ -161,6 +161,47 @@ class ReilEmulatorTests(unittest.TestCase):
 
         self.assertTrue(len(paramter) > 0)
 
+    def test_no_taint(self):
+        def post_hanlder(emulator, instruction, parameter):
+            parameter.append(instruction)
+
+        asm = ["add eax, ebx"]
+
+        x86_instrs = map(self._asm_parser.parse, asm)
+        self.__set_address(0xdeadbeef, x86_instrs)
+        reil_instrs = map(self._translator.translate, x86_instrs)
+
+        regs_initial = {
+            "eax" : 0x1,
+            "ebx" : 0x2,
+        }
+
+        emulator = ReilEmulator(self._arch_info, taint=False)
+
+        emulator.set_register_taint("ebx", True)
+
+        regs_final, _ = emulator.execute_lite(reil_instrs[0], context=regs_initial)
+
+        self.assertEqual(regs_final["eax"], 0x3)
+        self.assertEqual(emulator.get_register_taint("eax"), False)
+
+        # Handlers are run with taint disabled.
+        parameter = []
+
+        emulator.set_instruction_post_handler(post_hanlder, parameter)
+
+        emulator.execute_lite(reil_instrs[0], context=regs_initial)
+
+        self.assertEqual(parameter, reil_instrs[0])
+        self.assertEqual(emulator.get_register_taint("eax"), False)
+
+        # Enable taint.
+        emulator.taint = True
+
+        emulator.execute_lite(reil_instrs[0], context=regs_initial)
+
+        self.assertEqual(emulator.get_register_taint("eax"), True)
+
     def test_zero_division_error_1(self):
         asm_instrs  = [self._asm_parser.parse("div ebx")]
 
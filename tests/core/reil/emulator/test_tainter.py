@@ -29,6 +29,7 @@ from barf.arch.x86 import X86ArchitectureInformation
 from barf.arch.x86.parser import X86Parser
 from barf.arch.x86.translator import X86Translator
 from barf.core.reil.emulator import ReilEmulator
+from barf.core.reil.emulator import ReilTaintMemory
 
 
 class ReilEmulatorTaintTests(unittest.TestCase):
@@ -146,6 +147,116 @@ class ReilEmulatorTaintTests(unittest.TestCase):
 
         self.assertEqual(self._emulator.get_register_taint("eax"), True)
 
+    def test_sub_register_1(self):
+        asm_instrs  = self._asm_parser.parse("mov al, bl")
+
+        self.__set_address(0xdeadbeef, [asm_instrs])
+
+        reil_instrs = self._translator.translate(asm_instrs)
+
+        regs_initial = {
+            "eax" : 0x0,
+            "ebx" : 0x1,
+        }
+
+        self._emulator.set_register_taint("bl", True)
+
+        self._emulator.execute_lite(reil_instrs, context=regs_initial)
+
+        self.assertEqual(self._emulator.get_register_taint("al"), True)
+        self.assertEqual(self._emulator.get_register_taint("ah"), False)
+        self.assertEqual(self._emulator.get_register_taint("eax"), True)
+        self.assertEqual(self._emulator.get_register_taint_mask("eax"), 0x1)
+
+    def test_sub_register_2(self):
+        asm_instrs  = self._asm_parser.parse("mov al, 0x1")
+
+        self.__set_address(0xdeadbeef, [asm_instrs])
+
+        reil_instrs = self._translator.translate(asm_instrs)
+
+        regs_initial = {
+            "eax" : 0x0,
+        }
+
+        self._emulator.set_register_taint("eax", True)
+
+        self._emulator.execute_lite(reil_instrs, context=regs_initial)
+
+        self.assertEqual(self._emulator.get_register_taint("al"), False)
+        self.assertEqual(self._emulator.get_register_taint("ah"), True)
+        self.assertEqual(self._emulator.get_register_taint_mask("eax"), 0xe)
+
+    def test_sub_register_3(self):
+        asm_instrs = [self._asm_parser.parse(instr) for instr in [
+            "add eax, ebx",
+            "and ecx, ebx",
+        ]]
+
+        self.__set_address(0xdeadbeef, asm_instrs)
+
+        reil_instrs = []
+
+        for asm_instr in asm_instrs:
+            reil_instrs += self._translator.translate(asm_instr)
+
+        regs_initial = {
+            "eax" : 0x0,
+            "ebx" : 0x0,
+            "ecx" : 0x0,
+        }
+
+        self._emulator.set_register_taint("bh", True)
+
+        self._emulator.execute_lite(reil_instrs, context=regs_initial)
+
+        # Carries propagate taint to the upper bytes.
+        self.assertEqual(self._emulator.get_register_taint_mask("eax"), 0xe)
+        self.assertEqual(self._emulator.get_register_taint_mask("ecx"), 0x2)
+
+    def test_labels(self):
+        asm_instrs = [self._asm_parser.parse(instr) for instr in [
+            "mov eax, dword ptr [ebx]",
+            "mov ecx, dword ptr [ebx+4]",
+            "add eax, ecx",
+            "mov dword ptr [ebx+8], eax",
+            "mov edx, 0x1",
+        ]]
+
+        self.__set_address(0xdeadbeef, asm_instrs)
+
+        reil_instrs = []
+
+        for asm_instr in asm_instrs:
+            reil_instrs += self._translator.translate(asm_instr)
+
+        regs_initial = {
+            "eax" : 0x0,
+            "ebx" : 0xcafe0000,
+            "ecx" : 0x0,
+            "edx" : 0x0,
+        }
+
+        self._emulator.tainter.labeled = True
+
+        self._emulator.set_memory_taint(regs_initial["ebx"] + 0, 2, "a")
+        self._emulator.set_memory_taint(regs_initial["ebx"] + 2, 2, "b")
+        self._emulator.set_memory_taint(regs_initial["ebx"] + 4, 4, "c")
+        self._emulator.set_register_taint("edx", "d")
+
+        self._emulator.execute_lite(reil_instrs, context=regs_initial)
+
+        self.assertEqual(self._emulator.get_register_taint("eax"), frozenset(["a", "b", "c"]))
+        self.assertEqual(self._emulator.get_register_taint("ecx"), frozenset(["c"]))
+        self.assertEqual(self._emulator.get_register_taint("edx"), frozenset())
+        self.assertEqual(self._emulator.get_memory_taint(regs_initial["ebx"] + 8, 4), frozenset(["a", "b", "c"]))
+        self.assertEqual(self._emulator.get_memory_taint(regs_initial["ebx"] + 8, 1), frozenset(["a", "c"]))
+        self.assertEqual(self._emulator.get_memory_taint(regs_initial["ebx"] + 12, 4), frozenset())
+
+        # Label sets are interned.
+        self.assertTrue(self._emulator.get_register_taint("eax") is
+                        self._emulator.get_memory_taint(regs_initial["ebx"] + 8, 4))
+
     def __set_address(self, address, asm_instrs):
         addr = address
 
@@ -154,6 +265,44 @@ class ReilEmulatorTaintTests(unittest.TestCase):
             addr += 1
 
 
+class ReilTaintMemoryTests(unittest.TestCase):
+
+    def test_set_range(self):
+        taint_mem = ReilTaintMemory()
+
+        taint_mem.set(0x1000, 0x100000, True)
+
+        self.assertEqual(len(taint_mem), 1)
+        self.assertEqual(taint_mem.get(0xfff, 1), None)
+        self.assertEqual(taint_mem.get(0xffc, 8), True)
+        self.assertEqual(taint_mem.get(0x101000, 4), None)
+
+    def test_clear_range(self):
+        taint_mem = ReilTaintMemory()
+
+        taint_mem.set(0x1000, 0x1000, True)
+        taint_mem.set(0x1800, 0x10, None)
+
+        self.assertEqual(taint_mem.intervals(), [(0x1000, 0x800, True), (0x1810, 0x7f0, True)])
+        self.assertEqual(taint_mem.get(0x1800, 0x10), None)
+        self.assertEqual(taint_mem.get(0x1800, 0x11), True)
+
+        taint_mem.set(0x1800, 0x10, True)
+
+        self.assertEqual(taint_mem.intervals(), [(0x1000, 0x1000, True)])
+
+    def test_values(self):
+        taint_mem = ReilTaintMemory()
+
+        taint_mem.set(0x1000, 4, "a")
+        taint_mem.set(0x1004, 4, "a")
+        taint_mem.set(0x1002, 4, "b")
+
+        self.assertEqual(taint_mem.intervals(), [(0x1000, 2, "a"), (0x1002, 4, "b"), (0x1006, 2, "a")])
+        self.assertEqual(taint_mem.get_values(0x1000, 8), ["a", "b", "a"])
+        self.assertEqual(taint_mem.get_values(0x1003, 2), ["b"])
+
+
 def main():
     unittest.main()
 
@@ -0,0 +1,171 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import random
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.parser import X86Parser
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil.emulator import ReilEmulator
+from barf.core.reil.emulator import ReilVectorEmulator
+from barf.core.reil.parser import ReilParser
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class ReilVectorEmulatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+
+        self._emulator = ReilEmulator(self._arch_info)
+        self._vector_emulator = ReilVectorEmulator(self._arch_info)
+
+        self._asm_parser = X86Parser(ARCH_X86_MODE_32)
+        self._reil_parser = ReilParser()
+
+        self._translator = X86Translator(ARCH_X86_MODE_32)
+
+    def test_add(self):
+        contexts = [
+            {"eax": 0x1, "ebx": 0x2},
+            {"eax": 0xffffffff, "ebx": 0x1},
+        ]
+
+        regs_final, _ = self._vector_emulator.execute_lite(self.__translate(["add eax, ebx"]), contexts)
+
+        self.assertEqual(list(regs_final["eax"]), [0x3, 0x0])
+        self.assertEqual(list(regs_final["ebx"]), [0x2, 0x1])
+
+    def test_division_by_zero(self):
+        instrs = self._reil_parser.parse([
+            "div [DWORD eax, DWORD ebx, DWORD ecx]",
+        ])
+
+        contexts = [
+            {"eax": 0x10, "ebx": 0x2},
+            {"eax": 0x10, "ebx": 0x0},
+        ]
+
+        regs_final, _ = self._vector_emulator.execute_lite(instrs, contexts)
+
+        self.assertEqual(regs_final["ecx"][0], 0x8)
+        self.assertEqual(list(self._vector_emulator.faults), [False, True])
+
+    def test_memory(self):
+        instrs = self.__translate([
+            "mov [eax], ebx",
+            "mov ecx, [eax]",
+        ])
+
+        contexts = [
+            {"eax": 0x1000, "ebx": 0xdeadbeef},
+            {"eax": 0x2000, "ebx": 0xcafecafe},
+        ]
+
+        regs_final, mems_final = self._vector_emulator.execute_lite(instrs, contexts)
+
+        self.assertEqual(list(regs_final["ecx"]), [0xdeadbeef, 0xcafecafe])
+        self.assertEqual(mems_final[0].read(0x1000, 4), 0xdeadbeef)
+        self.assertEqual(mems_final[1].read(0x2000, 4), 0xcafecafe)
+
+    def test_wide_operands(self):
+        instrs = self._reil_parser.parse([
+            "mul [DWORD eax, DWORD ebx, QWORD t0]",
+            "bsh [QWORD t0, DWORD 0xffffffe0, DWORD edx]",
+            "sext [DWORD edx, QWORD t1]",
+            "mul [QWORD t1, QWORD t1, DQWORD t2]",
+            "bsh [DQWORD t2, DWORD 0xffffffa0, DWORD ecx]",
+        ])
+
+        self.__compare(instrs)
+
+    def test_compare_scalar(self):
+        asm_instrs = [
+            "add eax, ebx",
+            "sub ecx, edx",
+            "xor esi, edi",
+            "imul eax, ecx",
+            "shl ebx, 3",
+            "sar edx, 5",
+            "shr esi, 31",
+            "cmp eax, ebx",
+            "adc ecx, esi",
+            "neg edi",
+            "movsx eax, bl",
+            "setl cl",
+        ]
+
+        self.__compare(self.__translate(asm_instrs))
+
+    def test_compare_scalar_signed_div(self):
+        instrs = self._reil_parser.parse([
+            "or [DWORD ebx, DWORD 0x1, DWORD ebx]",
+            "sdiv [DWORD eax, DWORD ebx, DWORD ecx]",
+            "smod [DWORD eax, DWORD ebx, DWORD edx]",
+        ])
+
+        self.__compare(instrs)
+
+    def __compare(self, instrs):
+        regs = ["eax", "ebx", "ecx", "edx", "esi", "edi"]
+
+        contexts = [dict((reg, random.randint(0, 2**32 - 1)) for reg in regs) for _ in xrange(32)]
+
+        self._vector_emulator.execute_lite(instrs, contexts)
+
+        for lane, context in enumerate(contexts):
+            self._emulator.reset()
+
+            regs_final, _ = self._emulator.execute_lite(instrs, context=dict(context))
+
+            regs_final_vector = self._vector_emulator.get_context(lane)
+
+            for reg in regs:
+                self.assertEqual(regs_final[reg], regs_final_vector[reg])
+
+    def __translate(self, asm_instrs_str):
+        reil_instrs = []
+
+        for addr, asm_instr_str in enumerate(asm_instrs_str):
+            asm_instr = self._asm_parser.parse(asm_instr_str)
+            asm_instr.address = 0xdeadbeef + addr
+
+            reil_instrs += self._translator.translate(asm_instr)
+
+        return reil_instrs
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86.parser import X86Parser
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil.container import ReilContainer
+from barf.core.reil.container import ReilContainerFileError
+from barf.core.reil.container import ReilContainerInvalidAddressError
+from barf.core.reil.container import ReilSequence
+from barf.core.reil.container import load_container
+from barf.core.reil.container import save_container
+from barf.core.reil.helpers import to_reil_address
+from barf.core.reil.parser import ReilParser
+
+
+class ReilContainerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._parser = ReilParser()
+
+    def test_add(self):
+        container = ReilContainer()
+
+        for address in [0x1010, 0x1000, 0x1020, 0x1008]:
+            container.add(self.__build_sequence(address, 2))
+
+        self.assertEqual([sequence.address for sequence in container.sequences],
+                         [to_reil_address(address) for address in [0x1000, 0x1008, 0x1010, 0x1020]])
+        self.assertEqual([instr.address for instr in container][:3],
+                         [to_reil_address(0x1000, 0), to_reil_address(0x1000, 1), to_reil_address(0x1008, 0)])
+
+        self.assertRaises(Exception, container.add, self.__build_sequence(0x1008, 1))
+
+    def test_fetch(self):
+        container = ReilContainer()
+
+        container.add(self.__build_sequence(0x1000, 2))
+
+        self.assertEqual(container.fetch(to_reil_address(0x1000, 1)).address, to_reil_address(0x1000, 1))
+        self.assertEqual(container.fetch_sequence(to_reil_address(0x1000, 1)).address, to_reil_address(0x1000))
+
+        self.assertRaises(ReilContainerInvalidAddressError, container.fetch, to_reil_address(0x1001))
+        self.assertRaises(ReilContainerInvalidAddressError, container.fetch_sequence, to_reil_address(0x1001))
+
+    def test_fetch_sequences(self):
+        container = ReilContainer()
+
+        for address in [0x1000, 0x1008, 0x1010, 0x1020]:
+            container.add(self.__build_sequence(address, 1))
+
+        sequences = container.fetch_sequences(to_reil_address(0x1000, 1), to_reil_address(0x1020))
+
+        self.assertEqual([sequence.address for sequence in sequences],
+                         [to_reil_address(0x1008), to_reil_address(0x1010)])
+
+    def test_get_next_address(self):
+        container = ReilContainer()
+
+        sequence_1 = self.__build_sequence(0x1000, 2)
+        sequence_2 = self.__build_sequence(0x1008, 1)
+
+        container.add(sequence_1)
+        container.add(sequence_2)
+
+        # Links between sequences might be set after adding them.
+        sequence_1.next_sequence_address = sequence_2.address
+
+        self.assertEqual(container.get_next_address(to_reil_address(0x1000, 0)), to_reil_address(0x1000, 1))
+        self.assertEqual(container.get_next_address(to_reil_address(0x1000, 1)), to_reil_address(0x1008))
+        self.assertEqual(container.get_next_address(to_reil_address(0x1008)), None)
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __build_sequence(self, address, size):
+        sequence = ReilSequence()
+
+        for index, instr in enumerate(self._parser.parse(["nop [EMPTY, EMPTY, EMPTY]"] * size)):
+            instr.address = to_reil_address(address, index)
+
+            sequence.append(instr)
+
+        return sequence
+
+
+class ReilContainerFileTests(unittest.TestCase):
+
+    def setUp(self):
+        self._asm_parser = X86Parser(ARCH_X86_MODE_32)
+        self._translator = X86Translator(ARCH_X86_MODE_32)
+
+        fd, self._filename = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self._filename)
+
+    def test_save_load(self):
+        container = self.__build_container([
+            "add eax, ebx",
+            "mov al, byte ptr [ecx+0x10]",
+            "imul eax, ebx, -3",
+            "jmp 0x1000",
+        ])
+
+        save_container(container, self._filename)
+
+        container_file = load_container(self._filename)
+
+        instrs = list(container)
+        instrs_file = list(container_file)
+
+        self.assertEqual(len(instrs), len(instrs_file))
+
+        for instr, instr_file in zip(instrs, instrs_file):
+            self.assertEqual(str(instr), str(instr_file))
+            self.assertEqual(instr.address, instr_file.address)
+            self.assertEqual([oprnd.size for oprnd in instr.operands],
+                             [oprnd.size for oprnd in instr_file.operands])
+
+            self.assertEqual(container.get_next_address(instr.address),
+                             container_file.get_next_address(instr.address))
+
+        container_file.close()
+
+    def test_lazy_decoding(self):
+        container = self.__build_container(["add eax, ebx", "sub eax, ebx"])
+
+        save_container(container, self._filename)
+
+        container_file = load_container(self._filename)
+
+        sequence = container_file.fetch_sequence(to_reil_address(0x1003))
+
+        self.assertEqual(len(sequence), len(container.fetch_sequence(to_reil_address(0x1003))))
+        self.assertTrue(container_file.fetch_sequence(to_reil_address(0x1003)) is sequence)
+
+        self.assertRaises(ReilContainerInvalidAddressError, container_file.fetch, to_reil_address(0x1001))
+
+        self.assertEqual(container_file.fetch_sequences(to_reil_address(0x1000), to_reil_address(0x1006)),
+                         [container_file.fetch_sequence(to_reil_address(0x1000)), sequence])
+
+        container_file.close()
+
+    def test_operands(self):
+        instrs = ReilParser().parse([
+            "str [DWORD eax, EMPTY, DWORD t0]",
+            "add [DWORD t0, DWORD 0xffffffff, QWORD t1]",
+            "str [eax, EMPTY, t0]",
+            "jcc [BIT 0x1, EMPTY, DWORD 0x2000]",
+        ])
+
+        sequence = ReilSequence()
+
+        for index, instr in enumerate(instrs):
+            instr.address = to_reil_address(0x1000, index)
+            instr.comment = "comment" if index == 0 else None
+
+            sequence.append(instr)
+
+        container = ReilContainer()
+        container.add(sequence)
+
+        save_container(container, self._filename)
+
+        container_file = load_container(self._filename)
+
+        instrs_file = list(container_file)
+
+        for instr, instr_file in zip(instrs, instrs_file):
+            self.assertEqual(instr.mnemonic, instr_file.mnemonic)
+            self.assertEqual(instr.operands, instr_file.operands)
+            self.assertEqual(instr.comment, instr_file.comment)
+
+        self.assertEqual(container_file.get_next_address(instrs[-1].address), None)
+
+        container_file.close()
+
+    def test_invalid_file(self):
+        with open(self._filename, "wb") as f:
+            f.write("\x00" * 64)
+
+        self.assertRaises(ReilContainerFileError, load_container, self._filename)
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __build_container(self, asm_instrs):
+        container = ReilContainer()
+
+        address = 0x1000
+
+        for asm_instr_str in asm_instrs:
+            asm_instr = self._asm_parser.parse(asm_instr_str)
+            asm_instr.address = address
+            asm_instr.size = 3
+
+            sequence = ReilSequence()
+
+            for instr in self._translator.translate(asm_instr):
+                sequence.append(instr)
+
+            sequence.next_sequence_address = to_reil_address(address + 3)
+
+            container.add(sequence)
+
+            address += 3
+
+        return container
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
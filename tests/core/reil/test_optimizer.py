@@ -0,0 +1,230 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.parser import X86Parser
+from barf.arch.x86.translator import X86Translator
+from barf.core.reil import ReilMnemonic
+from barf.core.reil.container import ReilContainer
+from barf.core.reil.container import ReilSequence
+from barf.core.reil.emulator import ReilEmulator
+from barf.core.reil.optimizer import ReilOptimizer
+from barf.core.reil.parser import ReilParser
+
+
+class ReilOptimizerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+
+        self._asm_parser = X86Parser(ARCH_X86_MODE_32)
+        self._reil_parser = ReilParser()
+
+        self._translator = X86Translator(ARCH_X86_MODE_32)
+
+        self._optimizer = ReilOptimizer(self._arch_info)
+
+    def test_constant_folding(self):
+        block = self.__translate(["mov eax, 0x1", "add eax, 0x2", "shl eax, 0x4"])
+
+        block_opt = self._optimizer.optimize_block(block)
+
+        # Flags are live at the end of the block, so they are folded
+        # but not removed.
+        instrs = [instr for instrs in block_opt for instr in instrs]
+
+        self.assertTrue(all(instr.mnemonic in [ReilMnemonic.STR, ReilMnemonic.NOP] for instr in instrs))
+        self.assertEquals(str(block_opt[2][-1]), "str   [DWORD 0x30, EMPTY, DWORD eax]")
+
+        self.__check_equivalence(block, block_opt)
+
+    def test_copy_propagation(self):
+        instrs  = ["str [DWORD eax, EMPTY, DWORD t0]"]
+        instrs += ["str [DWORD ebx, EMPTY, DWORD t1]"]
+        instrs += ["add [DWORD t0, DWORD t1, DWORD t2]"]
+        instrs += ["str [DWORD t2, EMPTY, DWORD eax]"]
+
+        block_opt = self._optimizer.optimize_block([self.__parse(0x1000, instrs)])
+
+        self.assertEquals(len(block_opt[0]), 2)
+        self.assertEquals(str(block_opt[0][0]), "add   [DWORD eax, DWORD ebx, DWORD t2]")
+        self.assertEquals(str(block_opt[0][1]), "str   [DWORD t2, EMPTY, DWORD eax]")
+
+    def test_str_chain_collapsing(self):
+        instrs  = ["str [DWORD ebx, EMPTY, QWORD t0]"]
+        instrs += ["str [QWORD t0, EMPTY, DWORD t1]"]
+        instrs += ["str [DWORD t1, EMPTY, BYTE t2]"]
+        instrs += ["str [BYTE t2, EMPTY, DWORD eax]"]
+
+        block_opt = self._optimizer.optimize_block([self.__parse(0x1000, instrs)])
+
+        # The value is truncated to 8 bits before being written to eax.
+        self.assertEquals(len(block_opt[0]), 2)
+        self.assertEquals(str(block_opt[0][0]), "str   [DWORD ebx, EMPTY, BYTE t2]")
+        self.assertEquals(str(block_opt[0][1]), "str   [BYTE t2, EMPTY, DWORD eax]")
+
+    def test_dead_flags(self):
+        block = self.__translate(["add eax, ebx", "sub eax, ecx", "xor edx, eax"])
+
+        block_opt = self._optimizer.optimize_block(block)
+
+        # Flags written by 'add' and 'sub' are overwritten by 'xor'.
+        self.assertEquals(str(block_opt[0][0]), "add   [DWORD eax, DWORD ebx, QWORD t1]")
+        self.assertEquals(str(block_opt[0][1]), "str   [QWORD t1, EMPTY, DWORD eax]")
+        self.assertEquals(len(block_opt[0]), 2)
+        self.assertEquals(len(block_opt[1]), 2)
+
+        self.assertTrue(sum(map(len, block_opt)) < sum(map(len, block)) / 2)
+
+        self.__check_equivalence(block, block_opt)
+
+    def test_live_out(self):
+        block = self.__translate(["cmp eax, ebx"])
+
+        block_opt = self._optimizer.optimize_block(block, live_out=["zf"])
+
+        written = [instr.operands[2].name for instr in block_opt[0] if instr.mnemonic != ReilMnemonic.JCC]
+
+        self.assertTrue("zf" in written)
+        self.assertFalse("cf" in written)
+
+    def test_dead_sequence(self):
+        block = self.__translate(["mov eax, 0x1", "mov eax, 0x2"])
+
+        block_opt = self._optimizer.optimize_block(block)
+
+        # Sequences keep at least one instruction.
+        self.assertEquals(str(block_opt[0][0]), "nop   [EMPTY, EMPTY, EMPTY]")
+        self.assertEquals(block_opt[0][0].address, 0x1000 << 8)
+
+        self.__check_equivalence(block, block_opt)
+
+    def test_local_jumps(self):
+        block = self.__translate(["mov ecx, 0x4", "rep stosb", "cmovz eax, ebx", "add edi, 0x1"])
+
+        block_opt = self._optimizer.optimize_block(block)
+
+        self.assertTrue(sum(map(len, block_opt)) < sum(map(len, block)))
+
+        for context in [{"eflags": 0x000, "eax": 0x1, "ebx": 0x2}, {"eflags": 0x440, "eax": 0x1, "ebx": 0x2}]:
+            self.__check_equivalence(block, block_opt, context)
+
+    def test_optimize_container(self):
+        block = self.__translate(["add eax, ebx", "sub eax, ecx"])
+
+        container = self.__build_container(block, 0x1008)
+        container_opt = self._optimizer.optimize_container(container)
+
+        # Each sequence is optimized on its own.
+        self.assertEquals(len(list(container_opt)), len(list(container)))
+
+        self.assertEquals(container_opt.fetch_sequence(0x1004 << 8).next_sequence_address, 0x1008 << 8)
+
+    # Auxiliary functions
+    # ======================================================================== #
+    def __translate(self, asm_instrs_str):
+        block = []
+
+        addr = 0x1000
+
+        for asm_instr_str in asm_instrs_str:
+            asm_instr = self._asm_parser.parse(asm_instr_str)
+            asm_instr.address = addr
+            asm_instr.size = 4
+
+            block.append(self._translator.translate(asm_instr))
+
+            addr += 4
+
+        return block
+
+    def __parse(self, address, instrs_str):
+        instrs = self._reil_parser.parse(instrs_str)
+
+        for index, instr in enumerate(instrs):
+            instr.address = (address << 8) | index
+
+        return instrs
+
+    def __build_container(self, block, end):
+        container = ReilContainer()
+
+        instr_seq_prev = None
+
+        for instrs in block:
+            instr_seq = ReilSequence()
+
+            for instr in instrs:
+                instr_seq.append(instr)
+
+            if instr_seq_prev:
+                instr_seq_prev.next_sequence_address = instr_seq.address
+
+            container.add(instr_seq)
+
+            instr_seq_prev = instr_seq
+
+        instr_seq_prev.next_sequence_address = end << 8
+
+        return container
+
+    def __check_equivalence(self, block, block_opt, context=None):
+        end = 0x1000 + 4 * len(block)
+
+        context_init = {
+            "eax": 0x11223344,
+            "ebx": 0x55667788,
+            "ecx": 0x99aabbcc,
+            "edx": 0xddeeff00,
+            "edi": 0x00002000,
+            "eflags": 0x00000202,
+        }
+
+        context_init.update(context or {})
+
+        results = []
+
+        for instrs in [block, block_opt]:
+            emulator = ReilEmulator(self._arch_info)
+
+            for addr in xrange(0x2000, 0x2010, 4):
+                emulator.write_memory(addr, 4, 0x0)
+
+            regs, memory = emulator.execute(self.__build_container(instrs, end), start=0x1000 << 8, end=end << 8,
+                                            registers=context_init)
+
+            results.append((dict([(reg, regs[reg]) for reg in context_init]), memory.read(0x2000, 16)))
+
+        self.assertEquals(results[0], results[1])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
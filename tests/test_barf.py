@@ -0,0 +1,111 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import unittest
+
+import barf.barf as barf_module
+
+from barf import BARF
+from barf.core.symbols import load_symbols
+
+
+def get_full_path(filename):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+
+
+class RecoverCfgAllTests(unittest.TestCase):
+
+    def test_recover_cfg_all_arm(self):
+        filename = get_full_path("./arch/samples/bin/loop-simple.arm")
+
+        barf = BARF(filename)
+        symbols = load_symbols(filename)
+
+        cfgs = dict((cfg.name, cfg) for cfg in barf.recover_cfg_all(sorted(symbols), symbols=symbols))
+
+        cfg = cfgs["main"]
+
+        self.assertEquals(cfg.start_address, 0x10400)
+        self.assertEquals(len(cfg.basic_blocks), 4)
+        self.assertEquals(sum(len(bb.instrs) for bb in cfg.basic_blocks), 37)
+
+        # The function returns through a "pop {..., pc}" instruction.
+        rets = [bb.instrs[-1] for bb in cfg.basic_blocks if barf.arch_info.instr_is_ret(bb.instrs[-1])]
+
+        self.assertEquals([instr.mnemonic for instr in rets], ["pop"])
+
+    def test_recover_cfg_all_parallel_x86(self):
+        self.__test_recover_cfg_all_parallel(get_full_path("./arch/samples/bin/loop-simple.x86"))
+
+    def test_recover_cfg_all_parallel_arm(self):
+        self.__test_recover_cfg_all_parallel(get_full_path("./arch/samples/bin/loop-simple.arm"))
+
+    def test_recover_cfg_all_parallel_error(self):
+        filename = get_full_path("./arch/samples/bin/loop-simple.x86")
+
+        barf = BARF(filename)
+
+        worker_recover = barf_module._cfg_worker_recover
+
+        # The pool is created (and its workers forked) after patching.
+        barf_module._cfg_worker_recover = _cfg_worker_recover_error
+
+        try:
+            with self.assertRaises(ValueError):
+                barf.recover_cfg_all([barf.binary.entry_point], jobs=2)
+        finally:
+            barf_module._cfg_worker_recover = worker_recover
+
+    # Auxiliary methods
+    # ======================================================================== #
+    def __test_recover_cfg_all_parallel(self, filename):
+        barf = BARF(filename)
+        symbols = load_symbols(filename)
+
+        cfgs_seq = barf.recover_cfg_all(sorted(symbols), symbols=symbols)
+        cfgs_par = barf.recover_cfg_all(sorted(symbols), symbols=symbols, jobs=2)
+
+        self.assertEquals(self.__summarize(cfgs_par), self.__summarize(cfgs_seq))
+
+    def __summarize(self, cfgs):
+        summary = {}
+
+        for cfg in cfgs:
+            bbs = sorted((bb.start_address, bb.end_address, len(bb.instrs)) for bb in cfg.basic_blocks)
+
+            summary[cfg.name] = bbs
+
+        return summary
+
+
+def _cfg_worker_recover_error(start, end):
+    raise ValueError("Error while recovering CFG @ {:#x}".format(start))
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Copyright (c) 2017, Fundacion Dr. Manuel Sadosky
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from barf.arch import ARCH_X86_MODE_32
+from barf.arch.x86 import X86ArchitectureInformation
+from barf.arch.x86.disassembler import X86Disassembler
+from barf.tools.replay.replay import init_parser
+from barf.tools.replay.replay import replay_segments
+
+
+class SegmentReplayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.arch_info = X86ArchitectureInformation(ARCH_X86_MODE_32)
+        self.disassembler = X86Disassembler(ARCH_X86_MODE_32)
+
+        code = [
+            (0x1000, "\xb8\x01\x00\x00\x00", {}, {"eax": 0x1}),                       # mov eax, 0x1
+            (0x1005, "\x8d\x58\x02", {}, {"ebx": 0x3}),                               # lea ebx, [eax+0x2]
+            (0x1008, "\x53", {}, {"esp": 0x7ffc}),                                    # push ebx
+            (0x1009, "\x8b\x0c\x24", {0x7ffc: "03000000"}, {"ecx": 0x3}),             # mov ecx, dword ptr [esp]
+            (0x100c, "\x5a", {0x7ffc: "03000000"}, {"edx": 0x3, "esp": 0x8000}),      # pop edx
+            (0x100d, "\x8b\x35\x00\x20\x00\x00", {0x2000: "78563412"}, {"esi": 0x12345678}),  # mov esi, dword ptr [0x2000]
+            (0x1013, "\x90", {}, {}),                                                 # nop
+        ]
+
+        regs = {
+            "eax": 0x0,
+            "ebx": 0x0,
+            "ecx": 0x0,
+            "edx": 0x0,
+            "esi": 0x0,
+            "esp": 0x8000,
+            "eflags": 0x202,
+        }
+
+        self.trace = []
+
+        for address, encoding, reads, regs_update in code:
+            asm_instr = self.disassembler.disassemble(encoding, address)
+
+            self.trace.append((asm_instr, "test", reads, dict(regs)))
+
+            regs.update(regs_update)
+
+    def test_no_divergences(self):
+        for segment_size in [1, 2, 3, 100]:
+            divergences = list(replay_segments(self.arch_info, iter(self.trace), segment_size=segment_size))
+
+            self.assertEquals(divergences, [])
+
+    def test_divergence(self):
+        # Corrupt the context after *mov ecx, dword ptr [esp]*.
+        self.trace[4][3]["ecx"] = 0x4
+
+        for segment_size in [1, 2, 3, 100]:
+            divergences = list(replay_segments(self.arch_info, iter(self.trace), segment_size=segment_size))
+
+            self.assertEquals([(index, address) for index, address, _, _ in divergences],
+                              [(3, 0x1009), (4, 0x100c)])
+
+    def test_parallel(self):
+        self.trace[6][3]["esi"] = 0x0
+
+        divergences = list(replay_segments(self.arch_info, iter(self.trace), jobs=2, segment_size=2))
+
+        self.assertEquals([(index, address) for index, address, _, _ in divergences], [(5, 0x100d)])
+
+    def test_full_check(self):
+        # Corrupt a register not written by *mov esi, dword ptr [0x2000]*
+        # (it is only detected by a full context comparison).
+        self.trace[6][3]["ebx"] = 0x5
+
+        for full_check, expected in [(100, []), (5, [(5, 0x100d)]), (1, [(5, 0x100d)])]:
+            divergences = list(replay_segments(self.arch_info, iter(self.trace), full_check=full_check))
+
+            self.assertEquals([(index, address) for index, address, _, _ in divergences], expected)
+
+    def test_full_check_invalid(self):
+        with self.assertRaises(ValueError):
+            list(replay_segments(self.arch_info, iter(self.trace), full_check=0))
+
+        with self.assertRaises(SystemExit):
+            init_parser().parse_args(["--full-check", "0", "binary", "trace"])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()